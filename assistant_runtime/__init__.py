@@ -0,0 +1,42 @@
+# Shared runtime pieces for the Streamlit assistant apps
+from assistant_runtime.app import ASSISTANT_KEY, NO_KEYS, OPENAI_AND_ASSISTANT_KEYS, AppConfig, log_feedback, run_app
+from assistant_runtime.assets import build_assets, picture_html
+from assistant_runtime.commands import Command, RunTemplate, route_command, run_instructions
+from assistant_runtime.compaction import Compaction, compact_thread, thread_tokens
+from assistant_runtime.core import CoreClient, format_article, rank_articles
+from assistant_runtime.dispatch import (
+    append_cached_turn,
+    classify_and_search,
+    discard_assistant_turn,
+    prepare_assistant_turn,
+)
+from assistant_runtime.executor import RunExecutor, RunHandle
+from assistant_runtime.feedback import FeedbackWriter, FileBackend, S3Backend, feedback_event
+from assistant_runtime.feedback_index import FeedbackIndex, compact
+from assistant_runtime.intent import is_search_query, local_is_search_query, remote_is_search_query
+from assistant_runtime.render import message_markdown, render_transcript
+from assistant_runtime.resources import (
+    get_asset_manifest,
+    get_core_client,
+    get_dispatch_pool,
+    get_feedback_writer,
+    get_metrics_server,
+    get_openai_client,
+    get_request_scheduler,
+    get_response_cache,
+    get_run_executor,
+    get_s3_client,
+    get_session_store,
+    get_thread_pool,
+    get_upload_cache,
+    get_upload_pool,
+    retrieve_assistant,
+)
+from assistant_runtime.response_cache import MemoryBackend, ResponseCache, SQLiteBackend, normalise
+from assistant_runtime.scheduler import BACKGROUND, INTERACTIVE, POLL, RequestScheduler, priority, prioritized
+from assistant_runtime.sessions import MemorySessionBackend, SessionStore, SQLiteSessionBackend
+from assistant_runtime.state import SessionNamespace
+from assistant_runtime.threads import WarmThreadPool
+from assistant_runtime.tracing import TRACER, Tracer, log_event, serve_metrics
+from assistant_runtime.transcript import fetch_new_messages, reset_transcript, sync_transcript
+from assistant_runtime.uploads import Upload, UploadCache, UploadProgress, convert_spreadsheet
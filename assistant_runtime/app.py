@@ -0,0 +1,709 @@
+# The shared assistant page: session init, upload, chat, runs and feedback for one configured assistant
+import logging
+import uuid
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
+
+import streamlit as st
+from openai.types.beta.threads import Run
+
+from assistant_runtime import tracing
+from assistant_runtime.assets import picture_html
+from assistant_runtime.commands import format_settings, is_local, local_message, route_command, run_instructions
+from assistant_runtime.compaction import (
+    CONTEXT_BUDGET,
+    apply_compaction,
+    catch_up,
+    compact_thread,
+    compaction_current,
+    keep_tokens,
+    latest_config,
+    reset_compaction,
+    thread_tokens,
+)
+from assistant_runtime.core import format_article
+from assistant_runtime.dispatch import (
+    append_cached_turn,
+    classify_and_search,
+    discard_assistant_turn,
+    prepare_assistant_turn,
+)
+from assistant_runtime.feedback import feedback_event
+from assistant_runtime.intent import local_is_search_query, remote_is_search_query
+from assistant_runtime.render import message_markdown, render_transcript
+from assistant_runtime.resources import (
+    get_asset_manifest,
+    get_core_client,
+    get_dispatch_pool,
+    get_feedback_writer,
+    get_metrics_server,
+    get_openai_client,
+    get_request_scheduler,
+    get_response_cache,
+    get_run_executor,
+    get_session_store,
+    get_thread_pool,
+    get_upload_cache,
+    get_upload_pool,
+    retrieve_assistant,
+)
+from assistant_runtime.executor import TERMINAL_STATUSES
+from assistant_runtime.scheduler import BACKGROUND, prioritized
+from assistant_runtime.sessions import SESSION_COOKIE, SESSION_PARAM, SESSION_TOKEN_KEY, new_token
+from assistant_runtime.state import SessionNamespace
+from assistant_runtime.transcript import reset_transcript, sync_transcript
+from assistant_runtime.uploads import UploadProgress, file_digest
+
+# Which API keys a page lets the visitor override from the sidebar
+NO_KEYS = None
+ASSISTANT_KEY = "assistant"
+OPENAI_AND_ASSISTANT_KEYS = "openai_and_assistant"
+
+
+@dataclass
+class AppConfig:
+    """Everything that differs between the assistant apps."""
+
+    name: str
+    page_title: str
+    title: str
+    # Name of the secret holding the assistant id
+    assistant_secret: str
+    image: str = None
+    # Extra keyword arguments for st.image (caption, width, ...)
+    image_options: dict = field(default_factory=dict)
+    intro_markdown: str = None
+    key_inputs: str = NO_KEYS
+    # Route article requests to CORE search instead of the assistant
+    core_search: bool = False
+    # S3 bucket for 👍/👎 and general feedback; None disables feedback
+    feedback_bucket: str = None
+    # Stream assistant tokens into the chat as they arrive instead of polling the run
+    stream_runs: bool = True
+    # Prepare the assistant turn while an ambiguous prompt is still being classified
+    speculative_dispatch: bool = True
+    # Show this session's per-turn trace (also enabled by ?debug=1) and the process's run executor in the sidebar
+    debug_panel: bool = False
+    # Estimated thread tokens past which older turns are summarised into a fresh thread; 0 disables
+    context_budget: int = CONTEXT_BUDGET
+    # Answer stateless study prompts (/plan, practice questions) from the shared response cache
+    response_cache: bool = False
+    # Save the session (thread, uploads, transcript, run) so a refresh or reconnect resumes it
+    durable_sessions: bool = True
+    # Answer /config and /help in-app and run /plan from its template (see assistant_runtime.commands)
+    slash_commands: bool = False
+
+
+def run_app(config):
+    state = SessionNamespace(config.name)
+
+    # A refreshed or reconnected browser picks its saved session back up
+    if config.durable_sessions and "session_token" not in state:
+        _resume_session(config, state)
+    if "session_token" in state:
+        _keep_session_token(state)
+
+    # Initialize session state variables
+    if "session_id" not in state:
+        state.session_id = str(uuid.uuid4())
+
+    if "run" not in state:
+        state.run = {"status": None}
+
+    if "messages" not in state:
+        state.messages = []
+
+    if "retry_error" not in state:
+        state.retry_error = 0
+
+    if "openai_api_key" not in state:
+        state.openai_api_key = st.secrets["OPENAI_API_KEY"]
+
+    if "turn" not in state:
+        state.turn = 0
+        state.script_runs = 0
+
+    get_metrics_server()
+    _count_script_run(config, state)
+    with tracing.context(state.session_id, state.turn):
+        _render_page(config, state)
+        _save_session(config, state)
+
+
+def _session_token():
+    # A cookie set by a proxy in front of Streamlit wins; otherwise the token rides in the page URL. Pages
+    # of a multipage app share the browser's token, so one whose URL lost it (a page switch) still resumes
+    token = (st.context.cookies.get(SESSION_COOKIE) or st.query_params.get(SESSION_PARAM)
+             or st.session_state.get(SESSION_TOKEN_KEY))
+    if not token:
+        token = new_token()
+    st.session_state[SESSION_TOKEN_KEY] = token
+    return token
+
+
+def _keep_session_token(state):
+    # Streamlit clears the query string when st.navigation switches pages; put the token back on every
+    # run, so a refresh on any page resumes instead of orphaning the saved session
+    if not st.context.cookies.get(SESSION_COOKIE) and st.query_params.get(SESSION_PARAM) != state.session_token:
+        st.query_params[SESSION_PARAM] = state.session_token
+
+
+def _resume_session(config, state):
+    state.session_token = _session_token()
+    try:
+        saved = get_session_store().load(state.session_token, config.name)
+    except Exception as e:
+        # An unreadable store just means a fresh session
+        tracing.log_event("session.load_error", logging.WARNING, error=str(e))
+        saved = None
+    if saved is None:
+        return
+    # Only sessions on the app's own OpenAI key are saved
+    client = get_openai_client(st.secrets["OPENAI_API_KEY"])
+    assistant_id = saved.pop("assistant_id")
+    try:
+        if assistant_id:
+            saved["assistant"] = retrieve_assistant(st.secrets["OPENAI_API_KEY"], assistant_id)
+        if saved.pop("streaming", False) and "thread" in saved:
+            # The page went away mid-stream: take over the thread's latest run, finished or not
+            runs = client.beta.threads.runs.list(thread_id=saved["thread"].id, order="desc", limit=1).data
+            if runs:
+                saved["run"] = runs[0]
+            saved.pop("synced_run_id", None)
+    except Exception as e:
+        # A deleted assistant or thread, or the API being down, must not break every load of this URL:
+        # the visitor starts afresh, and the next save replaces the saved session
+        tracing.log_event("session.resume_error", logging.WARNING, error=str(e))
+        return
+    for name, value in saved.items():
+        setattr(state, name, value)
+    state.script_runs = 0
+    state.openai_api_key = st.secrets["OPENAI_API_KEY"]
+    if hasattr(state.run, "status") and state.run.status not in TERMINAL_STATUSES:
+        state.run_handle = get_run_executor().submit(client, state.session_id, state.run)
+    tracing.log_event("session.resumed", app=config.name, thread_id=getattr(state.get("thread"), "id", None),
+                      messages=len(state.messages), run_status=getattr(state.run, "status", None))
+
+
+def _save_session(config, state):
+    if "session_token" not in state:
+        return
+    store = get_session_store()
+    if not _own_key(state):
+        # A visitor's own key is never stored, and its threads cannot be resumed without it
+        if state.pop("saved_session", None) is not None:
+            store.delete(state.session_token, config.name)
+        return
+    if "thread" not in state and not state.get("file_ids") and not state.messages and "saved_session" not in state:
+        # Nothing worth resuming yet
+        return
+    try:
+        store.save(state.session_token, config.name, state)
+    except Exception as e:
+        # The session carries on; it just would not survive a reconnect
+        tracing.log_event("session.save_error", logging.WARNING, error=str(e))
+
+
+def _own_key(state):
+    # True while the session uses the app's OpenAI key from its secrets, not one a visitor typed in
+    return state.openai_api_key == st.secrets["OPENAI_API_KEY"]
+
+
+def _count_script_run(config, state):
+    tracing.TRACER.script_runs.inc(config.name)
+    state.script_runs += 1
+
+
+def _render_page(config, state):
+    # Initialize OpenAI client (one pooled client per API key, shared by every session and assistant)
+    client = get_openai_client(state.openai_api_key)
+
+    # Set up the page
+    st.set_page_config(page_title=config.page_title)
+    st.title(config.title)
+
+    if config.image:
+        _show_image(config)
+
+    if config.intro_markdown:
+        st.markdown(config.intro_markdown)
+
+    if config.key_inputs is not NO_KEYS:
+        client = _key_inputs(config, state, client)
+
+    if config.feedback_bucket:
+        # Create a separate column for general feedback
+        with st.sidebar:
+            st.subheader("General Feedback")
+            general_feedback = st.text_area("Your feedback:", value="", max_chars=500, help="Enter any feedback you have here.")
+            if st.button("Submit Feedback"):
+                # Log the general feedback to the same JSON file
+                log_feedback(config, state, general_feedback, 'n/a', feedback_type='general_feedback')
+                st.success("Thank you for your feedback!")
+
+    _file_upload(state, client)
+
+    def render_message(message):
+        if message.role not in ["user", "assistant"]:
+            return
+        with st.chat_message(message.role):
+            if not config.feedback_bucket:
+                st.markdown(message_markdown(message, state))
+                return
+            with st.container():
+                col1, col2, col3 = st.columns([0.8, 0.1, 0.1])
+                message_text = message_markdown(message, state)
+                with col1:
+                    st.markdown(message_text)
+                with col2:
+                    if st.button("👍", key=f"up_{message.id}"):
+                        log_feedback(config, state, message_text, 'up', message_id=message.id)
+                        st.success("Feedback recorded!")
+                with col3:
+                    if st.button("👎", key=f"down_{message.id}"):
+                        log_feedback(config, state, message_text, 'down', message_id=message.id)
+                        st.error("Feedback recorded!")
+
+    # Paging (and feedback clicks) rerun only the transcript, not the whole page
+    @st.fragment
+    def show_transcript():
+        with tracing.context(state.session_id, state.turn):
+            render_transcript(state.messages, render_message, state=state)
+
+    # Initialize OpenAI assistant
+    if "assistant" not in state:
+        state.assistant = retrieve_assistant(state.openai_api_key, st.secrets[config.assistant_secret])
+        # The thread itself is only taken from the warm pool once the first prompt arrives
+        get_thread_pool().warm(client, state.assistant.id)
+
+    # Display chat messages
+    elif hasattr(state.run, 'status') and state.run.status == "completed":
+        # Only messages newer than the last one we have seen are fetched
+        _finish_cached_turn(state)
+        sync_transcript(client, state)
+        show_transcript()
+        _start_compaction(config, state, client)
+
+    # Commands answered in-app before the first run still belong on screen
+    elif state.messages and not hasattr(state.run, 'status'):
+        show_transcript()
+
+    # Chat input and message creation with file ID
+    if prompt := st.chat_input("How can I help you?"):
+        with st.chat_message('user'):
+            st.write(prompt)
+        state.turn += 1
+        state.retry_error = 0
+        tracing.TRACER.turns.inc(config.name)
+        with tracing.context(state.session_id, state.turn):
+            _handle_prompt(config, state, client, prompt)
+
+    _handle_run_status(config, state, client)
+
+    if config.debug_panel:
+        # Process-wide: how many runs and sessions this process is carrying. Only the app's config turns
+        # this on, since any visitor can add ?debug=1 to the URL
+        with st.sidebar.expander("Run executor"):
+            st.json(get_run_executor().stats())
+            st.json(get_request_scheduler(state.openai_api_key).stats())
+    if config.debug_panel or st.query_params.get("debug") == "1":
+        # The session's own trace is safe to show to whoever is using it
+        _debug_panel(state)
+
+
+def _show_image(config):
+    # Prebuilt variants are fetched (and cached) by the browser; st.image would resend the source on every rerun
+    entry = get_asset_manifest().get(config.image) if st.get_option("server.enableStaticServing") else None
+    if entry is None:
+        st.image(config.image, **config.image_options)
+        return
+    options = config.image_options
+    st.markdown(picture_html(entry, options.get("width"), options.get("caption")), unsafe_allow_html=True)
+
+
+def _debug_panel(state):
+    spans = tracing.TRACER.session_trace(state.session_id)
+    with st.sidebar.expander("Debug: turn trace"):
+        st.caption(f"Turn {state.turn}, {state.script_runs} script runs in this session, "
+                   f"{state.get('compactions', 0)} thread compactions")
+        turns = sorted({span["turn"] for span in spans})
+        if not turns:
+            st.write("No calls traced yet.")
+            return
+        totals = "\n".join(
+            f"| {turn} | {sum(1 for s in spans if s['turn'] == turn)} "
+            f"| {sum(s['ms'] for s in spans if s['turn'] == turn):.0f} |"
+            for turn in turns
+        )
+        st.markdown("| turn | calls | ms |\n|---|---|---|\n" + totals)
+        last = "\n".join(
+            f"| {s['service']} | {s['operation']} | {s['ms']} | {s['bytes']} | {s['outcome']} |"
+            for s in spans if s["turn"] == turns[-1]
+        )
+        st.markdown(f"Turn {turns[-1]}\n\n| service | operation | ms | bytes | outcome |\n|---|---|---|---|---|\n" + last)
+
+
+def log_feedback(config, state, message_content, feedback, feedback_type='assistant_message', message_id=None):
+    # Queue the event; a background writer batches it into gzipped JSON Lines objects in S3
+    writer = get_feedback_writer(
+        config.feedback_bucket,
+        st.secrets["aws"]["aws_access_key_id"],
+        st.secrets["aws"]["aws_secret_access_key"],
+    )
+    writer.submit(feedback_event(
+        message_content,
+        feedback,
+        feedback_type=feedback_type,
+        message_id=message_id,
+        session_id=state.session_id,
+    ))
+
+
+def _key_inputs(config, state, client):
+    # Add input fields for the OpenAI API Key and the Assistant's API Key
+    openai_api_key = None
+    if config.key_inputs == OPENAI_AND_ASSISTANT_KEYS:
+        openai_api_key = st.sidebar.text_input("Enter your OpenAI API Key", type="password")
+    assistant_api_key = st.sidebar.text_input("Enter your Assistant's API Key", type="password")
+
+    # Button to trigger the update function
+    if st.sidebar.button("Update API Keys"):
+        if config.key_inputs == OPENAI_AND_ASSISTANT_KEYS and not openai_api_key:
+            st.sidebar.error("Please enter both API keys.")
+        elif not assistant_api_key:
+            st.sidebar.error("Please enter your assistant key first.")
+        else:
+            if openai_api_key:
+                state.openai_api_key = openai_api_key
+                client = get_openai_client(openai_api_key)
+            state.assistant = retrieve_assistant(state.openai_api_key, assistant_api_key)
+            # Start a fresh conversation; its thread is acquired on the next prompt
+            state.pop("thread", None)
+            state.run = {"status": None}
+            reset_transcript(state)
+            reset_compaction(state)
+            if _own_key(state):
+                get_thread_pool().warm(client, state.assistant.id)
+            if openai_api_key:
+                st.sidebar.success("API Keys updated successfully!")
+            else:
+                st.sidebar.success("Assistant key updated successfully!")
+    return client
+
+
+def _file_upload(state, client):
+    # File uploader for CSV, XLS, XLSX; several files are converted and uploaded side by side
+    uploaded_files = st.file_uploader("Upload your files", type=["csv", "xls", "xlsx"], accept_multiple_files=True)
+    if not uploaded_files:
+        state.pop("upload_digests", None)
+        return
+
+    # Converted and uploaded once per distinct file; reruns and other sessions reuse the result
+    cache = get_upload_cache()
+    pool = get_upload_pool()
+    reporters = [UploadProgress() for _ in uploaded_files]
+    # Files already converted are looked up right here; only misses queue for the shared upload workers,
+    # so a rerun never waits behind another session's conversions
+    # Each upload is hashed once; its digest is remembered by the uploader's file id for later reruns
+    digests = {uploaded_file.file_id: state.get("upload_digests", {}).get(uploaded_file.file_id)
+               or file_digest(uploaded_file) for uploaded_file in uploaded_files}
+    state.upload_digests = digests
+    results = []
+    for uploaded_file, reporter in zip(uploaded_files, reporters):
+        digest = digests[uploaded_file.file_id]
+        upload = cache.get(client, digest)
+        if upload is not None:
+            reporter("cached", 1.0)
+            results.append(upload)
+        else:
+            results.append(pool.submit(tracing.bind(cache.get_or_upload), client, uploaded_file, uploaded_file.type,
+                                       reporter, digest))
+    futures = [result for result in results if isinstance(result, Future)]
+
+    # Progress bars only while something is still converting or uploading
+    _, pending = wait(futures, timeout=0.05)
+    if pending:
+        bars_area = st.empty()
+        with bars_area.container():
+            bars = [st.progress(0.0, text=f"{f.name}: queued") for f in uploaded_files]
+        while pending:
+            _, pending = wait(futures, timeout=0.2)
+            for bar, uploaded_file, reporter in zip(bars, uploaded_files, reporters):
+                bar.progress(reporter.fraction, text=f"{uploaded_file.name}: {reporter.stage}")
+        bars_area.empty()
+
+    file_ids, shown = [], set()
+    for uploaded_file, result in zip(uploaded_files, results):
+        try:
+            upload = result.result() if isinstance(result, Future) else result
+        except Exception as e:
+            st.error(f"An error occurred with {uploaded_file.name}: {e}")
+            continue
+        if upload.digest in shown:
+            continue
+        shown.add(upload.digest)
+        file_ids.append(upload.file_id)
+
+        # Optional: Display a preview of the first rows and Download JSON Lines for smaller files
+        st.text_area(f"{uploaded_file.name}: JSON Output (first rows of {upload.rows})", upload.preview, height=300,
+                     key=f"preview_{upload.digest}")
+        if upload.download is not None:
+            st.download_button(label=f"Download {uploaded_file.name} as JSON Lines", data=upload.download,
+                               file_name=f"{uploaded_file.name.rsplit('.', 1)[0]}.jsonl", mime="application/jsonl",
+                               key=f"download_{upload.digest}")
+
+    if file_ids:
+        state.file_ids = file_ids
+        st.success(f"{len(file_ids)} file{'s' if len(file_ids) > 1 else ''} uploaded successfully to OpenAI!")
+
+
+def _build_message_data(state, client, prompt):
+    # A cached exchange still being written goes onto the thread before this message
+    _finish_cached_turn(state)
+    # Threads are only created for visitors who actually send a message
+    if "thread" not in state and _own_key(state):
+        state.thread = get_thread_pool().acquire(client, state.assistant.id, state.session_id)
+    elif "thread" not in state:
+        # A visitor's own key never gets pooled threads made in its account
+        state.thread = client.beta.threads.create(metadata={'session_id': state.session_id})
+    else:
+        # A compaction that ran while the student was reading swaps in its shorter thread
+        apply_compaction(state)
+
+    message_data = {
+        "thread_id": state.thread.id,
+        "role": "user",
+        "content": prompt
+    }
+
+    # Attach every uploaded file, readable by the assistant's code interpreter
+    if state.get("file_ids"):
+        message_data["attachments"] = [
+            {"file_id": file_id, "tools": [{"type": "code_interpreter"}]} for file_id in state.file_ids
+        ]
+    return message_data
+
+
+def _start_compaction(config, state, client):
+    # Summarise in the background while the student reads the reply; the next prompt switches threads
+    if not config.context_budget or state.run.status != "completed":
+        # Failed runs are retried on this thread first
+        return
+    pending = state.get("compaction")
+    if pending is not None and not compaction_current(state):
+        # This run went to the old thread while the summary was written: copy its messages over once it is done
+        state.compaction_run_id = state.run.id
+        state.compaction = get_dispatch_pool().submit(tracing.bind(catch_up), client, pending, state.thread.id)
+        return
+    if pending is not None or state.get("compaction_run_id") == state.run.id:
+        return
+    # Commands answered in-app never reached the thread, so they are neither summarised nor copied
+    messages = [message for message in state.messages[state.get("thread_start", 0):] if not is_local(message)]
+    if thread_tokens(messages, state.get("memory")) <= config.context_budget:
+        return
+    state.compaction_run_id = state.run.id
+    state.compaction = get_dispatch_pool().submit(
+        tracing.bind(compact_thread),
+        client,
+        state.session_id,
+        state.thread.id,
+        messages,
+        state.get("last_message_id"),
+        state.get("memory"),
+        state.get("carried_config"),
+        state.get("file_ids", []),
+        keep_tokens(config.context_budget),
+    )
+
+
+def _handle_prompt(config, state, client, prompt):
+    # Slash commands are routed before any API call; /config costs no run at all
+    command = route_command(prompt, state.get("settings")) if config.slash_commands else None
+    if command is not None:
+        state.settings = command.settings
+        if command.reply is not None:
+            _answer_locally(state, prompt, command.reply)
+            return
+    run_options = _run_options(state, command.instructions if command else None)
+
+    is_search, search_terms, results, speculative_turn = False, None, None, None
+    if config.core_search:
+        # Clear-cut prompts are classified locally; only ambiguous ones go to gpt-3.5-turbo
+        is_search, search_terms = local_is_search_query(prompt)
+        if is_search is None and config.speculative_dispatch:
+            # Prepare the assistant turn while the classifier (and any CORE search) runs
+            core_client = get_core_client(st.secrets["CORE_API"])
+            dispatch_pool = get_dispatch_pool()
+            speculative_turn = dispatch_pool.submit(
+                tracing.bind(prepare_assistant_turn),
+                client,
+                _build_message_data(state, client, prompt),
+                None if config.stream_runs else state.assistant.id,
+                run_options,
+            )
+            classified = dispatch_pool.submit(
+                tracing.bind(classify_and_search), client, prompt,
+                lambda terms: core_client.fan_out_search("works", terms, limit=5),
+            )
+            try:
+                is_search, search_terms, results = classified.result()
+            except Exception:
+                # The turn fails as it would without speculation, but its message (and run) must not stay behind
+                dispatch_pool.submit(
+                    prioritized(tracing.bind(discard_assistant_turn), BACKGROUND), client, speculative_turn
+                )
+                raise
+        elif is_search is None:
+            is_search, search_terms = remote_is_search_query(client, prompt)
+
+    if is_search:
+        if speculative_turn is not None:
+            # Take the speculative message (and run) back off the thread in the background
+            get_dispatch_pool().submit(
+                prioritized(tracing.bind(discard_assistant_turn), BACKGROUND), client, speculative_turn
+            )
+
+        # Each extracted term is searched on its own and together; the merged results are re-ranked
+        if results is None:
+            results = get_core_client(st.secrets["CORE_API"]).fan_out_search("works", search_terms, limit=5)
+        if results:
+            response = "\n\n".join([format_article(article) for article in results])
+            st.write(response)
+        else:
+            st.write("No articles found. Please try a different query.")
+        return
+
+    settings = _active_settings(state)
+    cacheable = config.response_cache and not state.get("file_ids") and (command is None or command.cacheable)
+    if cacheable and speculative_turn is None:
+        reply = get_response_cache().get(state.assistant.id, settings, prompt)
+        if reply is not None:
+            _answer_from_cache(state, client, prompt, reply)
+            return
+
+    # Kept for retries of this turn's run
+    state.run_options = run_options
+    run = None
+    if speculative_turn is not None:
+        _, run = speculative_turn.result()
+    else:
+        # Proceed with sending the prompt to the OpenAI API as before
+        client.beta.threads.messages.create(**_build_message_data(state, client, prompt))
+
+    if config.stream_runs:
+        # Saved before the stream, so a page that goes away mid-reply resumes the run on reconnect
+        state.streaming = True
+        _save_session(config, state)
+        # The stream ends once the run reaches a terminal state, so no rerun is needed
+        with st.chat_message('assistant'), tracing.span("openai", "runs.stream") as span:
+            with client.beta.threads.runs.stream(
+                thread_id=state.thread.id,
+                assistant_id=state.assistant.id,
+                **run_options,
+            ) as stream:
+                reply = st.write_stream(stream.text_deltas)
+                span.bytes = len(str(reply).encode())
+                state.run = stream.get_final_run()
+            tracing.TRACER.record_run(state.run, 0)
+        state.pop("streaming", None)
+        # Only streamed replies are stored: a polled run's reply arrives with a later transcript sync
+        if cacheable and isinstance(reply, str) and state.run.status == "completed":
+            get_response_cache().put(state.assistant.id, settings, prompt, reply)
+        # Nothing reruns the page after a stream, so compaction starts here rather than on the next prompt
+        _start_compaction(config, state, client)
+    else:
+        state.run = run or client.beta.threads.runs.create(
+            thread_id=state.thread.id,
+            assistant_id=state.assistant.id,
+            **run_options,
+        )
+        state.run_handle = get_run_executor().submit(client, state.session_id, state.run)
+
+
+def _run_options(state, template_instructions=None):
+    # Settings from an in-app /config ride on every run as run-level instructions, not as thread messages
+    instructions = run_instructions(state.get("settings"), template_instructions)
+    return {"additional_instructions": instructions} if instructions else {}
+
+
+def _active_settings(state):
+    # The student's settings are part of the cache key: the same prompt gets a different reply. In-app
+    # settings come first; otherwise a /config exchange the assistant answered on the thread
+    if state.get("settings"):
+        return format_settings(state.settings)
+    return latest_config([message for message in state.messages if not is_local(message)]) or state.get("carried_config")
+
+
+def _answer_locally(state, prompt, reply):
+    with st.chat_message('assistant'):
+        st.markdown(reply)
+    # The exchange lives in the transcript only; the thread never sees it
+    state.messages.extend([local_message("user", prompt), local_message("assistant", reply)])
+
+
+def _answer_from_cache(state, client, prompt, reply):
+    # Shown at once; the exchange is written to the thread in the background so the conversation stays coherent
+    with st.chat_message('assistant'):
+        st.markdown(reply)
+    state.cached_turn = get_dispatch_pool().submit(
+        tracing.bind(append_cached_turn), client, _build_message_data(state, client, prompt), reply
+    )
+    # A finished "run" of its own, so the next rerun syncs and shows the transcript (and never retries an
+    # earlier failed run) just as it does after a real one
+    state.run = Run.model_construct(id=f"cached_{uuid.uuid4().hex}", object="thread.run", status="completed",
+                                    thread_id=state.thread.id, assistant_id=state.assistant.id)
+    state.retry_error = 0
+
+
+def _finish_cached_turn(state):
+    pending = state.pop("cached_turn", None)
+    if pending is None:
+        return
+    try:
+        pending.result()
+    except Exception as e:
+        tracing.log_event("cache.append_error", logging.WARNING, error=str(e))
+    # Let the next transcript sync pick the exchange up even though no new run finished
+    state.pop("synced_run_id", None)
+
+
+def _handle_run_status(config, state, client):
+    if "run_handle" in state:
+        # The shared executor polls the run; only this fragment reruns while we wait
+        @st.fragment(run_every=1)
+        def wait_for_run():
+            _count_script_run(config, state)
+            handle = state.run_handle
+            if handle.done():
+                state.run = handle.run
+                del state.run_handle
+                st.rerun()
+            with st.chat_message('assistant'):
+                st.write("Thinking ......")
+
+        wait_for_run()
+
+    elif hasattr(state.run, 'status'):
+        if state.run.status == "failed":
+            state.retry_error += 1
+            last_error = getattr(state.run, "last_error", None)
+            rate_limited = getattr(last_error, "code", None) == "rate_limit_exceeded"
+            if rate_limited:
+                # Every session's next run waits out the same backoff instead of retrying at once
+                get_request_scheduler(state.openai_api_key).throttled("runs")
+            with st.chat_message('assistant'):
+                if state.retry_error < 3:
+                    st.write("The assistant is busy, retrying ......" if rate_limited else "Run failed, retrying ......")
+                    state.run = client.beta.threads.runs.create(
+                        thread_id=state.thread.id,
+                        assistant_id=state.assistant.id,
+                        **state.get("run_options", {}),
+                    )
+                    state.run_handle = get_run_executor().submit(client, state.session_id, state.run)
+                    st.rerun()
+                else:
+                    st.error("FAILED: The OpenAI API is currently processing too many requests. Please try again later ......")
+
+        elif state.run.status != "completed":
+            with st.chat_message('assistant'):
+                st.error(f"The run did not complete (status: {state.run.status}). Please try again ......")
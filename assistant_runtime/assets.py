@@ -0,0 +1,119 @@
+"""Build-time image variants (resized AVIF/WebP/JPEG) served from Streamlit's static folder.
+
+The pages show their images as a <picture> of these variants instead of st.image, so a
+rerun sends a few hundred bytes of markup and the browser fetches (and caches) only the
+size and format it needs. Rebuild after changing an image:
+
+    python -m assistant_runtime.assets
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Streamlit serves <app dir>/static at /app/static when server.enableStaticServing is on
+STATIC_DIR = os.path.join(ROOT, "static")
+STATIC_URL = "app/static"
+MANIFEST = "assets.json"
+
+# Page images are built from these sources
+SOURCES = ["companion.png", "science.png"]
+# Variant widths in pixels (never wider than the source), covering phones up to 2x desktop columns
+WIDTHS = (320, 480, 640, 800, 1024)
+# Best first; the browser takes the first <source> it supports, and the fallback is for the rest
+FORMATS = [("avif", "image/avif", {"quality": 55}), ("webp", "image/webp", {"quality": 80, "method": 6})]
+FALLBACK = ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True})
+
+
+def source_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def build_assets(sources=SOURCES, out_dir=STATIC_DIR, widths=WIDTHS, root=ROOT):
+    """Write resized variants of each source image to `out_dir` and describe them in its assets.json.
+
+    File names carry the source's content digest, so a variant's URL never serves
+    different bytes and may be cached for as long as a browser or CDN likes. Sources
+    whose digest matches the existing manifest are skipped. Returns the manifest.
+    """
+    from PIL import Image, features
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    formats = [fmt for fmt in FORMATS if features.check(fmt[0])]
+    for name in sources:
+        digest = source_digest(os.path.join(root, name))
+        if manifest.get(name, {}).get("digest") == digest:
+            continue
+        stem = os.path.splitext(name)[0]
+        with Image.open(os.path.join(root, name)) as image:
+            image = image.convert("RGB")
+            sizes = sorted({min(width, image.width) for width in widths})
+            entry = {"digest": digest, "width": image.width, "height": image.height, "sources": [], "fallback": None}
+            for width in sizes:
+                resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                for ext, mime, options in formats:
+                    filename = f"{stem}-{width}.{digest}.{ext}"
+                    resized.save(os.path.join(out_dir, filename), **options)
+                    entry["sources"].append({"type": mime, "width": width, "file": filename})
+                ext, fmt, options = FALLBACK
+                filename = f"{stem}-{width}.{digest}.{ext}"
+                resized.save(os.path.join(out_dir, filename), fmt, **options)
+                entry["sources"].append({"type": "image/jpeg", "width": width, "file": filename})
+                entry["fallback"] = filename
+        # Variants of an earlier version of the source are no longer referenced
+        for old in manifest.get(name, {}).get("sources", []):
+            if old["file"] not in {variant["file"] for variant in entry["sources"]}:
+                try:
+                    os.remove(os.path.join(out_dir, old["file"]))
+                except FileNotFoundError:
+                    pass
+        manifest[name] = entry
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(out_dir=STATIC_DIR):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def picture_html(entry, width=None, caption=None, alt=""):
+    """A <picture> for a manifest entry, shown at most `width` CSS pixels wide (the column width if None)."""
+    sizes = f"{width}px" if width else "(max-width: 736px) 100vw, 704px"
+    sources = []
+    for mime in dict.fromkeys(variant["type"] for variant in entry["sources"]):
+        srcset = ", ".join(f"{STATIC_URL}/{variant['file']} {variant['width']}w"
+                           for variant in entry["sources"] if variant["type"] == mime)
+        sources.append(f'<source type="{mime}" srcset="{srcset}" sizes="{sizes}">')
+    style = f"width: 100%; max-width: {width}px; height: auto;" if width else "width: 100%; height: auto;"
+    img = (f'<img src="{STATIC_URL}/{entry["fallback"]}" alt="{html.escape(alt or caption or "")}" '
+           f'width="{entry["width"]}" height="{entry["height"]}" style="{style}" decoding="async">')
+    figure = f"<picture>{''.join(sources)}{img}</picture>"
+    if caption:
+        figure += f'<figcaption style="font-size: 0.875rem; opacity: 0.6;">{html.escape(caption)}</figcaption>'
+    return f"<figure style=\"margin: 0 0 1rem 0;\">{figure}</figure>"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the resized page-image variants served from static/")
+    parser.add_argument("images", nargs="*", default=SOURCES, help="source images, relative to the repository root")
+    parser.add_argument("--out", default=STATIC_DIR)
+    args = parser.parse_args()
+
+    manifest = build_assets(args.images, args.out)
+    for name in args.images:
+        entry = manifest[name]
+        size = sum(os.path.getsize(os.path.join(args.out, variant["file"])) for variant in entry["sources"])
+        print(f"{name}: {len(entry['sources'])} variants, {size / 1024:.0f} KB in total")
+
+
+if __name__ == "__main__":
+    main()
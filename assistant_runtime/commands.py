@@ -0,0 +1,151 @@
+# Slash commands routed before any API call: /config and /help are answered in-app, /plan runs from a template
+import re
+import time
+import uuid
+from collections import namedtuple
+
+from openai.types.beta.threads import Message
+
+# The settings the assistant's /config understands, with the names students also use for them
+SETTINGS = {
+    "depth": ("depth", "level"),
+    "learning style": ("learning style", "learning", "learning styles"),
+    "communication style": ("communication style", "communication", "communication styles"),
+    "tone style": ("tone style", "tone", "tone styles"),
+    "reasoning framework": ("reasoning framework", "reasoning", "reasoning frameworks", "framework"),
+    "emojis": ("emojis", "emoji"),
+    "language": ("language",),
+}
+ALIASES = {alias: name for name, aliases in SETTINGS.items() for alias in aliases}
+EXAMPLES = {
+    "depth": "Elementary, Middle School, High School, IB Chemistry SL/HL, Undergraduate, Graduate",
+    "learning style": "Visual, Verbal, Active, Intuitive, Reflective, Global",
+    "communication style": "Formal, Textbook, Layman, Story Telling, Socratic",
+    "tone style": "Encouraging, Neutral, Informative, Friendly, Humorous",
+    "reasoning framework": "Deductive, Inductive, Abductive, Analogical, Causal",
+    "emojis": "On, Off",
+    "language": "English, Español, Français, ...",
+}
+
+COMMAND = re.compile(r"^/(\w+)\b\s*(.*)$", re.DOTALL)
+SETTING = re.compile(r"^\s*([a-z][a-z ]*?)\s*[:=]\s*(.+?)\s*$", re.IGNORECASE)
+
+# A prepared run for a slash command: the prompt goes to the assistant unchanged, with `instructions`
+# added to that run only; cacheable ones are answered from the shared response cache when they repeat
+RunTemplate = namedtuple("RunTemplate", ["usage", "instructions", "cacheable"])
+RUN_TEMPLATES = {
+    "plan": RunTemplate(
+        "/plan <topic>",
+        "The student typed /plan: reply with a study plan for the topic after /plan. Lay it out as numbered "
+        "sessions, each with its goal, the key concepts, one worked example or activity and a short self-check, "
+        "and end with how the student will know they have mastered the topic.",
+        True,
+    ),
+}
+
+# A routed command. With `reply` set it was answered in-app and nothing goes to the API; otherwise
+# the prompt is sent with the template's run-level `instructions`. `settings` are the student's
+# settings after the command.
+Command = namedtuple("Command", ["name", "reply", "settings", "instructions", "cacheable"])
+
+
+def parse_settings(text):
+    """{setting: value} from "depth: university, tone=friendly; language: English"; unknown keys apart."""
+    settings, unknown = {}, []
+    for part in re.split(r"[,;\n]", text):
+        match = SETTING.match(part)
+        name = ALIASES.get(match.group(1).lower()) if match else None
+        if name is None:
+            if part.strip():
+                unknown.append(part.strip())
+            continue
+        settings[name] = match.group(2)
+    return settings, unknown
+
+
+def format_settings(settings):
+    return "; ".join(f"{name.capitalize()}: {settings[name]}" for name in SETTINGS if name in settings)
+
+
+def run_instructions(settings, template_instructions=None):
+    """Run-level additional instructions carrying the student's settings (and a template's), or None."""
+    parts = []
+    if settings:
+        parts.append(f"The student's /config settings, which override your defaults: {format_settings(settings)}.")
+    if template_instructions:
+        parts.append(template_instructions)
+    return "\n\n".join(parts) or None
+
+
+def config_help(settings):
+    current = [f"- **{name.capitalize()}:** {settings[name]}" for name in SETTINGS if name in settings]
+    options = [f"- **{name.capitalize()}:** {EXAMPLES[name]}" for name in SETTINGS]
+    return "\n\n".join([
+        "Your current settings:\n\n" + "\n".join(current) if current else "You are using the default settings.",
+        "Change any of them with `/config setting: value, ...`, e.g. `/config depth: Undergraduate, tone: Friendly`, "
+        "or type `/config reset`. The options are:",
+        "\n".join(options),
+    ])
+
+
+def commands_help():
+    lines = ["- `/config` shows your settings; `/config setting: value, ...` changes them"]
+    lines += [f"- `{template.usage}`" for template in RUN_TEMPLATES.values()]
+    lines.append("- `/help` shows this list")
+    return "Commands:\n\n" + "\n".join(lines)
+
+
+def route_command(prompt, settings=None):
+    """The Command for a slash-command prompt, or None if it should go to the assistant as it is.
+
+    /config with settings it cannot parse (free text such as "/config make it simpler")
+    is left to the assistant, as are commands without a template.
+    """
+    settings = dict(settings or {})
+    match = COMMAND.match(prompt.strip())
+    if not match:
+        return None
+    name, args = match.group(1).lower(), match.group(2).strip()
+
+    if name == "config":
+        if not args:
+            return Command(name, config_help(settings), settings, None, False)
+        if args.lower() == "reset":
+            return Command(name, "Settings reset to the defaults.", {}, None, False)
+        changes, unknown = parse_settings(args)
+        if not changes:
+            return None
+        settings.update(changes)
+        reply = "Settings updated. I will use them from your next message:\n\n" + "\n".join(
+            f"- **{key.capitalize()}:** {value}" for key, value in changes.items())
+        if unknown:
+            reply += f"\n\nI did not recognise: {', '.join(unknown)}. Type `/config` to see the settings."
+        return Command(name, reply, settings, None, False)
+
+    if name == "help":
+        return Command(name, commands_help(), settings, None, False)
+
+    template = RUN_TEMPLATES.get(name)
+    if template is None:
+        return None
+    if not args:
+        return Command(name, f"Usage: `{template.usage}`", settings, None, False)
+    return Command(name, None, settings, template.instructions, template.cacheable)
+
+
+def local_message(role, text):
+    """A transcript message that only exists in the session (a command answered in-app), never on the thread."""
+    return Message.model_construct(
+        id=f"local_{uuid.uuid4().hex}",
+        object="thread.message",
+        created_at=int(time.time()),
+        role=role,
+        status="completed",
+        content=[{"type": "text", "text": {"value": text, "annotations": []}}],
+        attachments=None,
+        metadata={"local": "true"},
+    )
+
+
+def is_local(message):
+    return message.id.startswith("local_")
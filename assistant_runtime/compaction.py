@@ -0,0 +1,218 @@
+# Context compaction: long threads are summarised into a memory message at the head of a fresh thread
+import logging
+import os
+from collections import namedtuple
+
+from assistant_runtime import tracing
+from assistant_runtime.commands import is_local
+from assistant_runtime.transcript import fetch_new_messages
+
+# Prompt tokens a thread may reach before its older turns are summarised; 0 disables compaction
+CONTEXT_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "8000"))
+# Share of the budget a compacted thread starts from, so the next compaction waits until the
+# conversation has grown by the rest of it instead of firing again after every long reply
+COMPACT_TARGET = 0.5
+SUMMARY_MODEL = "gpt-3.5-turbo"
+SUMMARY_TOKENS = 600
+
+SUMMARY_PROMPT = ("You maintain the memory of a tutoring conversation. Merge the earlier memory (if any) and the "
+                  "conversation below into one concise summary: the topics covered, what the student understood "
+                  "or struggled with, open questions, exercises in progress and any preferences they stated. "
+                  "Write it as notes for the tutor, in under 300 words.")
+MEMORY_HEADER = "Memory of our conversation so far (the earlier messages were summarised to keep this thread short):"
+# Only for /config messages the assistant answered itself (free text, or apps without the slash-command
+# router); settings set in-app ride on every run as additional instructions and need no carrying
+CONFIG_HEADER = "The student's /config settings, which still apply:"
+
+# A finished compaction: the new thread, its newest message id, what was carried into it, how
+# many of the old thread's last messages were copied and the newest old-thread message it holds
+Compaction = namedtuple("Compaction", ["thread", "last_message_id", "memory", "config", "file_ids", "kept", "tokens",
+                                       "source_message_id"])
+
+
+def message_text(message):
+    return "\n\n".join(part.text.value for part in message.content if part.type == "text")
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def thread_tokens(messages, memory=None):
+    """Estimated tokens of a thread holding `messages` after a memory message of `memory`.
+
+    Run usage is not used here: its prompt_tokens also count the assistant's
+    instructions and tools, which no amount of compaction can shrink.
+    """
+    return sum(estimate_tokens(message_text(message)) for message in messages) + (estimate_tokens(memory) if memory else 0)
+
+
+def keep_tokens(budget, target=COMPACT_TARGET):
+    """Tokens of recent messages copied verbatim, so memory (at most SUMMARY_TOKENS) plus copies fit `target` of `budget`."""
+    return max(int(budget * target) - SUMMARY_TOKENS, 0)
+
+
+def latest_config(messages):
+    """The student's last /config exchange on the thread (their request and the assistant's answer), or None.
+
+    `messages` must not include commands answered in-app, which never reached the thread.
+    """
+    for i in range(len(messages) - 1, -1, -1):
+        message = messages[i]
+        if message.role == "user" and message_text(message).lstrip().startswith("/config"):
+            exchange = [f"Student: {message_text(message)}"]
+            reply = next((m for m in messages[i + 1:] if m.role == "assistant"), None)
+            if reply is not None:
+                exchange.append(f"Assistant: {message_text(reply)}")
+            return "\n\n".join(exchange)
+    return None
+
+
+def copied_message(message):
+    """A thread message's text and attachments, as a new thread message."""
+    copy = {"role": message.role, "content": message_text(message) or "(no text)"}
+    attachments = [attachment.model_dump(exclude_none=True) for attachment in (getattr(message, "attachments", None) or ())]
+    if attachments:
+        copy["attachments"] = attachments
+    return copy
+
+
+def attached_file_ids(messages, extra=()):
+    """File ids attached to `messages`, plus `extra`, in first-seen order."""
+    file_ids = [attachment.file_id for message in messages for attachment in (getattr(message, "attachments", None) or ())]
+    return list(dict.fromkeys(file_id for file_id in [*file_ids, *extra] if file_id))
+
+
+def summarise(client, messages, memory=None, model=SUMMARY_MODEL):
+    transcript = "\n\n".join(f"{message.role.capitalize()}: {message_text(message)}" for message in messages)
+    if memory:
+        transcript = f"Earlier memory:\n{memory}\n\nConversation:\n{transcript}"
+    completion = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": transcript},
+        ],
+        max_tokens=SUMMARY_TOKENS,
+    )
+    return completion.choices[0].message.content
+
+
+def compact_thread(client, session_id, thread_id, messages, after=None, memory=None, config=None, file_ids=(),
+                   keep=keep_tokens(CONTEXT_BUDGET), model=SUMMARY_MODEL):
+    """Start a new thread holding a summary of the thread's messages and a verbatim copy of the newest ones.
+
+    `messages` are the thread's messages the session has seen, oldest first; any added
+    after message id `after` are fetched first, so this can start straight after a
+    streamed reply. `memory` and `config` are what an earlier compaction carried over,
+    so summaries accumulate rather than forget. The copied messages are the newest that fit
+    in `keep` estimated tokens. The student's latest /config exchange with the assistant is
+    repeated in the memory message and every attached file stays available to the new thread.
+    The old thread is left as it is. Returns a Compaction.
+    """
+    messages = list(messages) + fetch_new_messages(client, thread_id, after)
+    cut, tail = len(messages), 0
+    while cut and tail + estimate_tokens(message_text(messages[cut - 1])) <= keep:
+        cut -= 1
+        tail += estimate_tokens(message_text(messages[cut]))
+    # Never start the copied tail on an assistant reply whose question was summarised away
+    while cut < len(messages) and messages[cut].role != "user":
+        cut += 1
+    older, recent = messages[:cut], messages[cut:]
+    with tracing.span("compaction", "summarise") as span:
+        memory = summarise(client, older, memory, model) if older else memory
+        span.bytes = len(memory or "")
+    config = latest_config(messages) or config
+    file_ids = attached_file_ids(messages, file_ids)
+
+    memory_text = f"{MEMORY_HEADER}\n\n{memory}"
+    if config:
+        memory_text += f"\n\n{CONFIG_HEADER}\n\n{config}"
+    thread_messages = [{"role": "user", "content": memory_text}] + [copied_message(message) for message in recent]
+
+    params = {"messages": thread_messages, "metadata": {"session_id": session_id, "compacted_from": thread_id}}
+    if file_ids:
+        params["tool_resources"] = {"code_interpreter": {"file_ids": file_ids}}
+    thread = client.beta.threads.create(**params)
+    # The copies get new ids; the transcript continues after the newest of them
+    newest = client.beta.threads.messages.list(thread_id=thread.id, order="desc", limit=1).data
+    tokens = estimate_tokens(memory_text) + sum(estimate_tokens(m["content"]) for m in thread_messages[1:])
+    tracing.log_event("compaction.done", old_thread=thread_id, new_thread=thread.id,
+                      summarised=len(older), kept=len(recent), tokens=tokens)
+    return Compaction(thread, newest[0].id if newest else None, memory, config, file_ids, len(recent), tokens,
+                      messages[-1].id if messages else after)
+
+
+def catch_up(client, pending, thread_id):
+    """The `pending` compaction, once done, with the messages added to the old thread since copied onto its new thread.
+
+    Runs when turns went to the old thread while the summary was being written, so the
+    summary is kept rather than thrown away and started again.
+    """
+    compaction = pending.result()
+    messages = fetch_new_messages(client, thread_id, compaction.source_message_id)
+    if not messages:
+        return compaction
+    last_message_id = compaction.last_message_id
+    for message in messages:
+        last_message_id = client.beta.threads.messages.create(thread_id=compaction.thread.id, **copied_message(message)).id
+    tracing.log_event("compaction.catch_up", old_thread=thread_id, new_thread=compaction.thread.id, copied=len(messages))
+    return compaction._replace(
+        last_message_id=last_message_id,
+        file_ids=attached_file_ids(messages, compaction.file_ids),
+        kept=compaction.kept + len(messages),
+        tokens=compaction.tokens + sum(estimate_tokens(message_text(message)) for message in messages),
+        source_message_id=messages[-1].id,
+    )
+
+
+def apply_compaction(session_state):
+    """Switch the session to the thread of its finished background compaction, if it has one.
+
+    Never waits: a compaction still summarising is left to finish, and this turn goes to the
+    old thread. So is one started before the session's latest run, which lacks that run's
+    messages until `catch_up` has copied them over.
+    """
+    pending = session_state.get("compaction")
+    if pending is None or not pending.done():
+        return False
+    if pending.exception() is not None:
+        # The old thread still works; compaction is retried after the next run
+        tracing.log_event("compaction.error", logging.WARNING, thread_id=session_state.thread.id,
+                          error=str(pending.exception()))
+        session_state.pop("compaction")
+        session_state.pop("compaction_run_id", None)
+        return False
+    if not compaction_current(session_state):
+        return False
+    compaction = session_state.pop("compaction").result()
+    session_state.thread = compaction.thread
+    # Transcript messages from here on are the ones the new thread holds
+    session_state.thread_start = thread_start(session_state.messages, compaction.kept)
+    session_state.last_message_id = compaction.last_message_id
+    session_state.memory = compaction.memory
+    session_state.carried_config = compaction.config
+    session_state.compactions = session_state.get("compactions", 0) + 1
+    return True
+
+
+def thread_start(messages, kept):
+    """Index of the first of the last `kept` thread messages in a transcript that also holds session-only ones."""
+    start = len(messages)
+    while start and kept:
+        start -= 1
+        if not is_local(messages[start]):
+            kept -= 1
+    return start
+
+
+def compaction_current(session_state):
+    # The pending compaction holds every message of the session's latest run
+    return session_state.get("compaction_run_id") == getattr(session_state.run, "id", None)
+
+
+def reset_compaction(session_state):
+    """Forget compaction state, e.g. when the session switches to a new thread."""
+    for key in ("compaction", "compaction_run_id", "thread_start", "memory", "carried_config"):
+        session_state.pop(key, None)
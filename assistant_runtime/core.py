@@ -0,0 +1,239 @@
+# Pooled, cached client for the CORE academic search API
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from assistant_runtime import tracing
+
+# Overridable so the apps can run against a local stub (see benchmarks/fake_api.py)
+CORE_API_URL = os.environ.get("CORE_API_URL", "https://api.core.ac.uk/v3")
+DEFAULT_FIELDS = 'title,authors,publishedDate,sourceFulltextUrls,description,abstract,doi'  # Adjust based on actual API field names
+# Seconds a fan-out search waits for its queries before ranking whatever has arrived
+SEARCH_DEADLINE = float(os.environ.get("CORE_SEARCH_DEADLINE", "3.0"))
+# Results requested per fan-out query, as material for the merged ranking
+FAN_OUT_LIMIT = 10
+# Share of the deadline after which a per-term query that has not answered is sent once more
+HEDGE_AFTER = 1 / 3
+# Reciprocal-rank-fusion damping: higher values flatten the advantage of a query's top hits
+RRF_K = 60
+
+
+def normalise_query(query):
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+def split_terms(query):
+    """The search terms of an "a OR b OR c" query (the remote classifier's format), deduplicated."""
+    terms = [term.strip().strip('"') for term in re.split(r"\s+OR\s+", query or "")]
+    return list(dict.fromkeys(term for term in terms if term))
+
+
+def fan_out_queries(terms):
+    # One query per term, plus the combined query when there are several
+    return terms + [" OR ".join(terms)] if len(terms) > 1 else terms
+
+
+def article_key(article):
+    """DOI when the record has one, else its title reduced to letters and digits."""
+    doi = (article.get('doi') or "").lower().removeprefix("https://doi.org/").strip()
+    if doi:
+        return "doi:" + doi
+    return "title:" + re.sub(r"[^a-z0-9]+", "", (article.get('title') or "").lower())
+
+
+def _words(text):
+    return set(re.findall(r"[a-z0-9]+", (text or "").lower()))
+
+
+def rank_articles(results, terms, limit):
+    """Merge per-query result lists, drop duplicates and order by local relevance.
+
+    `results` maps each query to its articles in CORE's order. An article scores
+    reciprocal-rank fusion over every list it appears in, plus the share of each
+    term's words found in its title (and, at a third of the weight, its abstract),
+    so records matching several terms or found by several queries rise to the top.
+    The ranking then takes the best remaining article of each term in turn, so one
+    term's works cannot crowd the others out of the top `limit`.
+    """
+    scores, matches, articles = {}, {}, {}
+    for ranked in results.values():
+        for rank, article in enumerate(ranked):
+            key = article_key(article)
+            articles.setdefault(key, article)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+    term_words = [_words(term) for term in terms if _words(term)]
+    for key, article in articles.items():
+        title, abstract = _words(article.get('title')), _words(article.get('abstract') or article.get('description'))
+        match = [(len(words & title) + len(words & abstract) / 3) / len(words) for words in term_words]
+        scores[key] += sum(match) / max(len(term_words), 1)
+        # The term the article is mostly about; None if it matches none of them
+        matches[key] = max(range(len(match)), key=match.__getitem__) if any(match) else None
+        if article.get('sourceFulltextUrls'):
+            # Students need something to open
+            scores[key] += 0.05
+    by_score = sorted(articles, key=lambda key: scores[key], reverse=True)
+    queues = [[key for key in by_score if matches[key] == i] for i in range(len(term_words))]
+    ranked = []
+    while any(queues):
+        # One round: each term's best remaining article, best first
+        ranked.extend(sorted((queue.pop(0) for queue in queues if queue), key=lambda key: scores[key], reverse=True))
+    ranked.extend(key for key in by_score if matches[key] is None)
+    return [articles[key] for key in ranked[:limit]]
+
+
+class CoreClient:
+    """CORE search over one pooled `requests.Session` with timeouts and a TTL/LRU result cache.
+
+    `base_url` can point at a local stub server. With `prefetch` set, a successful
+    search also fetches the next page in the background so paging is served from cache.
+    """
+
+    def __init__(self, api_key, base_url=CORE_API_URL, timeout=(3.05, 10), pool_size=10,
+                 cache_size=256, cache_ttl=3600, prefetch=False):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.prefetch = prefetch
+        # requests is only imported once a page actually builds a CORE client
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f'Bearer {api_key}'
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._prefetcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="core-prefetch") if prefetch else None
+        self._fan_out = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="core-search")
+
+    def search(self, entity_type, query, limit=10, offset=0, stats=False, fields=DEFAULT_FIELDS):
+        articles = self._search(entity_type, query, limit, offset, stats, fields)
+        if articles and self._prefetcher is not None and len(articles) == limit:
+            # Only one page ahead; the prefetched page does not prefetch again
+            self._prefetcher.submit(self._search, entity_type, query, limit, offset + limit, stats, fields)
+        return articles
+
+    def fan_out_search(self, entity_type, query, limit=5, deadline=SEARCH_DEADLINE, fields=DEFAULT_FIELDS):
+        """Search each term of an "a OR b" query and the combined query at once; return the best `limit`.
+
+        Queries run concurrently over the pooled session. A per-term query still out
+        after HEDGE_AFTER of the deadline is sent a second time and the first answer
+        wins, so one slow shard does not hold the search up. Results are ranked as
+        soon as every term has an answer (the slower combined query only adds ranking
+        evidence) or `deadline` seconds have passed, whichever is first; what has come
+        back by then is merged, deduplicated by DOI or title and re-ranked locally.
+        Later answers still land in the cache for the next search.
+        """
+        terms = split_terms(query)
+        if not terms:
+            return []
+
+        def submit(q):
+            return self._fan_out.submit(tracing.bind(self._search), entity_type, q, FAN_OUT_LIMIT, 0, False, fields)
+
+        def answered(q):
+            return next((f for f, fq in futures.items() if fq == q and f.done() and f.exception() is None), None)
+
+        with tracing.span("core", f"fan_out.{entity_type}") as span:
+            futures = {submit(q): q for q in fan_out_queries(terms)}
+            started = time.monotonic()
+            hedge_at, ends = started + deadline * HEDGE_AFTER, started + deadline
+            hedged = False
+            while (missing := [q for q in terms if answered(q) is None]) and time.monotonic() < ends:
+                if not hedged and time.monotonic() >= hedge_at:
+                    futures.update({submit(q): q for q in missing})
+                    hedged = True
+                outstanding = [f for f in futures if not f.done()]
+                if not outstanding:
+                    # Only failed queries are left; waiting longer cannot help
+                    break
+                timeout = (ends if hedged else hedge_at) - time.monotonic()
+                wait(outstanding, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+            if missing:
+                span.outcome = "partial"
+                tracing.log_event("core.deadline", logging.WARNING, missing=len(missing), terms=len(terms))
+            results = {q: f.result() for q in set(futures.values()) if (f := answered(q)) is not None}
+            return rank_articles(results, terms, limit)
+
+    def _search(self, entity_type, query, limit, offset, stats, fields):
+        key = (entity_type, normalise_query(query), limit, offset, stats, fields)
+        articles = self._cached(key)
+        if articles is None:
+            articles = self._fetch(entity_type, query, limit, offset, stats, fields)
+            if articles is None:
+                return []
+            self._store(key, articles)
+        return articles
+
+    def _fetch(self, entity_type, query, limit, offset, stats, fields):
+        params = {
+            'q': query,
+            'limit': limit,
+            'offset': offset,
+            'stats': stats,
+            'fields': fields,
+        }
+        tracing.log_event("core.search", params=params)
+        import requests
+
+        with tracing.span("core", f"search.{entity_type}") as span:
+            try:
+                response = self.session.get(f"{self.base_url}/search/{entity_type}", params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                span.outcome = "error"
+                tracing.log_event("core.error", logging.WARNING, error=str(e))
+                return None
+            span.bytes = len(response.content)
+            if response.status_code == 200:
+                return response.json().get('results', [])
+            span.outcome = f"http_{response.status_code}"
+            tracing.log_event("core.error", logging.WARNING, status=response.status_code, body=response.text[:500])
+            return None
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            stored, articles = entry
+            if time.monotonic() - stored > self.cache_ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return articles
+
+    def _store(self, key, articles):
+        with self._lock:
+            self._cache[key] = (time.monotonic(), articles)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+def format_article(article):
+    title = article.get('title', 'N/A')
+    authors = ", ".join([author.get('name', 'N/A') for author in article.get('authors', [])])
+    published_date = article.get('publishedDate', 'N/A')
+    urls = article.get('sourceFulltextUrls', ['N/A'])[0]
+    abstract = article.get('abstract', 'N/A')
+
+    # Cap the abstract length to 150 characters
+    if len(abstract) > 250:
+        abstract = abstract[:250] + '...'
+
+    # Use Markdown formatting for better readability
+    formatted_str = f"**Title:** {title}\n" \
+                    f"**Authors:** {authors}\n" \
+                    f"**Published Date:** {published_date}\n" \
+                    f"**URL:** [Link]({urls})\n" \
+                    f"**Abstract:** {abstract}"
+    return formatted_str
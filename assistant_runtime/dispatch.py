@@ -0,0 +1,49 @@
+# Speculative dispatch: prepare the assistant turn while the search classifier is still deciding
+import logging
+
+from assistant_runtime import tracing
+from assistant_runtime.executor import TERMINAL_STATUSES
+from assistant_runtime.intent import remote_is_search_query
+
+
+def prepare_assistant_turn(client, message_data, assistant_id=None, run_options=None):
+    """Post the user message and, if `assistant_id` is given, start the run (with `run_options`). Returns (message, run)."""
+    message = client.beta.threads.messages.create(**message_data)
+    run = None
+    if assistant_id is not None:
+        run = client.beta.threads.runs.create(thread_id=message_data["thread_id"], assistant_id=assistant_id,
+                                              **(run_options or {}))
+    return message, run
+
+
+def classify_and_search(client, prompt, search):
+    """Ask the remote classifier and run `search(terms)` straight away if it is a search."""
+    is_search, search_terms = remote_is_search_query(client, prompt)
+    results = search(search_terms) if is_search else None
+    return is_search, search_terms, results
+
+
+def discard_assistant_turn(client, prepared):
+    """Undo a speculative turn: cancel its run and delete its message so the thread stays clean."""
+    if prepared.cancel():
+        return
+    try:
+        message, run = prepared.result()
+    except Exception as e:
+        tracing.log_event("dispatch.speculative_error", logging.WARNING, error=str(e))
+        return
+    try:
+        if run is not None:
+            if run.status not in TERMINAL_STATUSES:
+                client.beta.threads.runs.cancel(run_id=run.id, thread_id=run.thread_id)
+            # Messages cannot be deleted while the run that reads them is still active
+            client.beta.threads.runs.poll(run.id, thread_id=run.thread_id, poll_interval_ms=500)
+        client.beta.threads.messages.delete(message.id, thread_id=message.thread_id)
+    except Exception as e:
+        tracing.log_event("dispatch.discard_error", logging.WARNING, error=str(e))
+
+
+def append_cached_turn(client, message_data, reply):
+    """Write a prompt answered from the response cache, and its reply, to the thread as a normal exchange."""
+    client.beta.threads.messages.create(**message_data)
+    return client.beta.threads.messages.create(thread_id=message_data["thread_id"], role="assistant", content=reply)
@@ -0,0 +1,159 @@
+# Shared background executor that drives in-flight Assistants runs
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from assistant_runtime import tracing
+from assistant_runtime.scheduler import POLL, prioritized
+
+# Statuses after which a run no longer changes without outside action
+TERMINAL_STATUSES = {"completed", "failed", "cancelled", "expired", "incomplete", "requires_action"}
+
+
+class RunHandle:
+    """Non-blocking view of a run that the executor is polling in the background."""
+
+    def __init__(self, client, session_id, run, interval):
+        self.client = client
+        self.session_id = session_id
+        self.run = run
+        self.interval = interval
+        self.polls = 0
+        # Polls are traced against the session and turn that submitted the run
+        self.trace = tracing.current()
+        self.errors = 0
+        self.error = None
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        return self.run.status
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, fn):
+        # Call fn(handle) once the run reaches a terminal state (immediately if it already has)
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                tracing.log_event("executor.callback_error", logging.WARNING, error=str(e))
+
+
+class RunExecutor:
+    """Polls every in-flight run of the process with `runs.retrieve` on a small worker pool.
+
+    A single scheduler thread keeps runs ordered by their next poll time, so a waiting
+    session costs a heap entry rather than a sleeping thread. Each run starts at
+    `min_interval` and backs off towards `max_interval` while it keeps running.
+    """
+
+    def __init__(self, max_workers=8, min_interval=0.25, max_interval=3.0, backoff=1.5, max_errors=3):
+        self.max_workers = max_workers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_errors = max_errors
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="run-poll")
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._in_flight = set()
+        self._latency = None
+        self._completed = 0
+        threading.Thread(target=self._loop, name="run-scheduler", daemon=True).start()
+
+    def submit(self, client, session_id, run):
+        handle = RunHandle(client, session_id, run, self.min_interval)
+        if run.status in TERMINAL_STATUSES:
+            tracing.TRACER.record_run(run, 0)
+            handle._finish()
+            return handle
+        with self._cond:
+            self._in_flight.add(handle)
+            self._schedule(handle, self.min_interval)
+        return handle
+
+    def stats(self):
+        # Each poll holds a worker for roughly one retrieve latency, so the pool can keep
+        # about max_workers * interval / latency runs going at the mean poll interval
+        with self._cond:
+            in_flight = len(self._in_flight)
+            sessions = len({h.session_id for h in self._in_flight})
+            intervals = [h.interval for h in self._in_flight] or [self.min_interval]
+        latency = self._latency
+        capacity = None
+        if latency:
+            capacity = int(self.max_workers * (sum(intervals) / len(intervals)) / latency)
+        return {
+            "in_flight_runs": in_flight,
+            "sessions": sessions,
+            "completed_runs": self._completed,
+            "workers": self.max_workers,
+            "retrieve_latency": latency,
+            "run_capacity": capacity,
+        }
+
+    def _schedule(self, handle, delay):
+        heapq.heappush(self._queue, (time.monotonic() + delay, next(self._seq), handle))
+        self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._queue or self._queue[0][0] > time.monotonic():
+                    timeout = self._queue[0][0] - time.monotonic() if self._queue else None
+                    self._cond.wait(timeout)
+                _, _, handle = heapq.heappop(self._queue)
+            self._pool.submit(prioritized(self._poll, POLL), handle)
+
+    def _poll(self, handle):
+        with tracing.context(*handle.trace):
+            self._retrieve(handle)
+
+    def _retrieve(self, handle):
+        started = time.monotonic()
+        try:
+            handle.run = handle.client.beta.threads.runs.retrieve(
+                thread_id=handle.run.thread_id,
+                run_id=handle.run.id,
+            )
+            handle.errors = 0
+        except Exception as e:
+            handle.errors += 1
+            handle.error = e
+            tracing.log_event("executor.poll_error", logging.WARNING, run_id=handle.run.id, error=str(e))
+        elapsed = time.monotonic() - started
+        self._latency = elapsed if self._latency is None else 0.8 * self._latency + 0.2 * elapsed
+        handle.polls += 1
+
+        if handle.run.status in TERMINAL_STATUSES or handle.errors >= self.max_errors:
+            with self._cond:
+                self._in_flight.discard(handle)
+                self._completed += 1
+            tracing.TRACER.record_run(handle.run, handle.polls)
+            handle._finish()
+            return
+        handle.interval = min(handle.interval * self.backoff, self.max_interval)
+        with self._cond:
+            self._schedule(handle, handle.interval)
+
@@ -0,0 +1,244 @@
+# Background, batched writer for student feedback events
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from assistant_runtime import tracing
+
+# Where batches that could not be written are kept until the next process picks them up
+SPOOL_DIR = os.environ.get("FEEDBACK_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "feedback-spool"))
+# A spooled batch is renamed to <name>.claimed-<pid>-<id> by the process resending it; claims older
+# than this were left by a process that died mid-resend and may be taken over
+CLAIM_MARKER = ".claimed-"
+CLAIM_TIMEOUT = 600
+
+
+def feedback_event(message_content, feedback, feedback_type='assistant_message', message_id=None, session_id=None):
+    return {
+        'event_id': uuid.uuid4().hex,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'message_id': message_id,
+        'session_id': session_id,
+        'message_content': message_content,
+        'feedback': feedback,
+        'feedback_type': feedback_type,
+    }
+
+
+def batch_key(prefix="feedback/batches"):
+    # Date-partitioned and collision-free: a timestamp for ordering plus a random suffix
+    now = datetime.now(timezone.utc)
+    return f"{prefix}/dt={now:%Y-%m-%d}/{now:%H%M%S%f}-{uuid.uuid4().hex[:12]}.jsonl.gz"
+
+
+def encode_batch(events):
+    return gzip.compress("".join(json.dumps(e) + "\n" for e in events).encode())
+
+
+def decode_batch(body):
+    return [json.loads(line) for line in gzip.decompress(body).decode().splitlines() if line]
+
+
+class S3Backend:
+    def __init__(self, s3_client, bucket):
+        self.s3_client = s3_client
+        self.bucket = bucket
+
+    def put(self, key, body):
+        extra = {'ContentEncoding': 'gzip'} if key.endswith(".gz") else {}
+        with tracing.span("s3", "put_object") as span:
+            span.bytes = len(body)
+            self.s3_client.put_object(Bucket=self.bucket, Key=key, Body=body, **extra)
+
+    def get(self, key):
+        with tracing.span("s3", "get_object") as span:
+            body = self.s3_client.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+            span.bytes = len(body)
+        return body
+
+    def list(self, prefix):
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(Bucket=self.bucket, Prefix=prefix)
+        while True:
+            with tracing.span("s3", "list_objects_v2"):
+                page = next(pages, None)
+            if page is None:
+                return
+            for obj in page.get('Contents', []):
+                yield obj['Key']
+
+    def delete(self, key):
+        with tracing.span("s3", "delete_object"):
+            self.s3_client.delete_object(Bucket=self.bucket, Key=key)
+
+
+class FileBackend:
+    """Stores objects under a local directory using the same keys; for development and tests."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key, body):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(body)
+        os.replace(path + ".tmp", path)
+
+    def get(self, key):
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def list(self, prefix):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                key = os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, "/")
+                if key.startswith(prefix) and not key.endswith(".tmp"):
+                    yield key
+
+    def delete(self, key):
+        os.remove(self._path(key))
+
+
+class FeedbackWriter:
+    """Queues feedback events and writes them as gzipped JSON Lines batches from a background thread.
+
+    A batch is flushed once it holds `batch_size` events or its oldest event is
+    `flush_interval` seconds old. Failed writes are retried with jittered exponential
+    backoff; batches that still fail, and anything queued at shutdown that cannot be
+    written, go to `spool_dir` and are retried when the next writer starts.
+    """
+
+    def __init__(self, backend, batch_size=200, flush_interval=30, max_retries=5, spool_dir=SPOOL_DIR):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.spool_dir = spool_dir
+        self.batches_written = 0
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="feedback-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, event):
+        # Never blocks the caller; the click returns as soon as the event is queued
+        self._queue.put_nowait(event)
+
+    def close(self, timeout=10):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join(timeout)
+
+    def _loop(self):
+        try:
+            self._resend_spooled()
+        except Exception as e:
+            # Spooled batches wait for the next writer; new feedback must still get through
+            tracing.log_event("feedback.resend_error", logging.WARNING, error=str(e))
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                batch.append(self._queue.get(timeout=0.5 if timeout is None else min(timeout, 0.5)))
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            except queue.Empty:
+                pass
+
+            stopping = self._stopped.is_set()
+            if stopping:
+                while not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline or stopping):
+                try:
+                    self._write(batch, retries=0 if stopping else self.max_retries)
+                except Exception as e:
+                    # Even the spool failed; the batch is lost but the writer keeps serving later feedback
+                    tracing.log_event("feedback.batch_lost", logging.ERROR, events=len(batch), error=str(e))
+                batch = []
+                deadline = None
+            if stopping:
+                return
+
+    def _write(self, events, retries):
+        key = batch_key()
+        body = encode_batch(events)
+        for attempt in range(retries + 1):
+            try:
+                self.backend.put(key, body)
+                self.batches_written += 1
+                return True
+            except Exception as e:
+                tracing.log_event("feedback.write_error", logging.WARNING, key=key, attempt=attempt + 1, error=str(e))
+                if attempt < retries:
+                    time.sleep(min(0.5 * 2 ** attempt, 30) * random.uniform(0.5, 1.5))
+        self._spool(key, body)
+        return False
+
+    def _spool(self, key, body):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, key.replace("/", "__"))
+        # Written under a temporary name so a resending process never reads half a batch
+        with open(path + ".tmp", "wb") as f:
+            f.write(body)
+        os.replace(path + ".tmp", path)
+
+    def _claim(self, name):
+        """Atomically take a spooled batch for this process; None if another process got it first."""
+        if name.endswith(".tmp"):
+            return None
+        path = os.path.join(self.spool_dir, name)
+        if CLAIM_MARKER in name:
+            try:
+                if time.time() - os.path.getmtime(path) < CLAIM_TIMEOUT:
+                    return None
+            except FileNotFoundError:
+                return None
+        claimed = os.path.join(self.spool_dir, f"{name.split(CLAIM_MARKER)[0]}{CLAIM_MARKER}{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            # Another writer on the host already claimed (or resent) it
+            return None
+        return claimed
+
+    def _resend_spooled(self):
+        if not os.path.isdir(self.spool_dir):
+            return
+        for name in sorted(os.listdir(self.spool_dir)):
+            claimed = self._claim(name)
+            if claimed is None:
+                continue
+            key = os.path.basename(claimed).split(CLAIM_MARKER)[0].replace("__", "/")
+            try:
+                with open(claimed, "rb") as f:
+                    body = f.read()
+                self.backend.put(key, body)
+            except Exception as e:
+                tracing.log_event("feedback.resend_error", logging.WARNING, name=name, error=str(e))
+                # Hand it back for a later writer; the backend is probably down, so stop for now
+                try:
+                    os.rename(claimed, os.path.join(self.spool_dir, key.replace("/", "__")))
+                except FileNotFoundError:
+                    pass
+                return
+            try:
+                os.remove(claimed)
+            except FileNotFoundError:
+                pass
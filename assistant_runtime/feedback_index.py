@@ -0,0 +1,163 @@
+"""Compaction of the chem-feedback bucket into partitioned Parquet files, and a reader over them.
+
+The compaction job folds the raw one-object-per-event files (feedback/{type}/{timestamp}.json)
+and the writer's gzipped JSON Lines batches (feedback/batches/...) into
+feedback/compacted/feedback_type={type}/dt={date}/part-*.parquet and records every part in
+feedback/compacted/manifest.json. Queries read the manifest and then only the parts whose
+type, date or message ids can match.
+
+    python -m assistant_runtime.feedback_index compact --bucket chem-feedback
+    python -m assistant_runtime.feedback_index ratio --root ./feedback-copy
+"""
+import argparse
+import io
+import json
+import re
+import uuid
+from datetime import datetime, timezone
+
+from assistant_runtime.feedback import FileBackend, S3Backend, decode_batch
+
+RAW_PREFIX = "feedback/"
+COMPACTED_PREFIX = "feedback/compacted/"
+MANIFEST_KEY = COMPACTED_PREFIX + "manifest.json"
+COLUMNS = ['event_id', 'timestamp', 'date', 'message_id', 'session_id', 'message_content', 'feedback', 'feedback_type']
+
+# Raw objects written by the old log_feedback: feedback/{type}/{%Y-%m-%d_%H-%M-%S}.json
+RAW_KEY = re.compile(r"^feedback/(?P<type>[^/]+)/(?P<date>\d{4}-\d{2}-\d{2})_(?P<time>\d{2}-\d{2}-\d{2})\.json$")
+
+
+def load_manifest(backend):
+    if MANIFEST_KEY not in set(backend.list(MANIFEST_KEY)):
+        return {'parts': [], 'sources': []}
+    return json.loads(backend.get(MANIFEST_KEY))
+
+
+def read_source(backend, key):
+    """Events stored in one raw or batch object, normalised to COLUMNS."""
+    body = backend.get(key)
+    if key.endswith(".jsonl.gz"):
+        events = decode_batch(body)
+    else:
+        loaded = json.loads(body)
+        events = loaded if isinstance(loaded, list) else [loaded]
+        match = RAW_KEY.match(key)
+        for i, event in enumerate(events):
+            if match:
+                event.setdefault('feedback_type', match.group('type'))
+                event.setdefault('timestamp', f"{match.group('date')}T{match.group('time').replace('-', ':')}")
+            event.setdefault('event_id', f"{key}#{i}")
+    for event in events:
+        event.setdefault('feedback_type', 'assistant_message')
+        timestamp = event.get('timestamp')
+        event['date'] = timestamp[:10] if timestamp else None
+    return events
+
+
+def compact(backend, delete_sources=False):
+    """Fold every not-yet-compacted raw/batch object into new Parquet parts. Returns the number of events."""
+    manifest = load_manifest(backend)
+    done = set(manifest['sources'])
+    sources = [
+        key for key in backend.list(RAW_PREFIX)
+        if not key.startswith(COMPACTED_PREFIX) and key not in done
+        and (key.endswith(".jsonl.gz") or key.endswith(".json"))
+    ]
+    events = [event for key in sources for event in read_source(backend, key)]
+    if events:
+        # Imported here so the apps can import the runtime package without pandas
+        import pandas as pd
+
+        df = pd.DataFrame(events).reindex(columns=COLUMNS)
+        df['date'] = df['date'].fillna('unknown')
+        for (feedback_type, date), part in df.groupby(['feedback_type', 'date']):
+            key = f"{COMPACTED_PREFIX}feedback_type={feedback_type}/dt={date}/part-{uuid.uuid4().hex[:12]}.parquet"
+            buffer = io.BytesIO()
+            part.to_parquet(buffer, index=False)
+            backend.put(key, buffer.getvalue())
+            manifest['parts'].append({
+                'key': key,
+                'feedback_type': feedback_type,
+                'date': date,
+                'rows': len(part),
+                'message_ids': sorted(part['message_id'].dropna().unique().tolist()),
+            })
+
+    # The manifest is written last, so an interrupted run only leaves unreferenced parts behind
+    manifest['sources'] = sorted(done | set(sources))
+    manifest['compacted_at'] = datetime.now(timezone.utc).isoformat()
+    backend.put(MANIFEST_KEY, json.dumps(manifest).encode())
+    if delete_sources:
+        for key in sources:
+            backend.delete(key)
+    return len(events)
+
+
+class FeedbackIndex:
+    """Query compacted feedback, reading only the partitions a question can touch."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.manifest = load_manifest(backend)
+        self.parts_read = 0
+
+    def read(self, feedback_type=None, start=None, end=None, message_id=None):
+        parts = [
+            part for part in self.manifest['parts']
+            if (feedback_type is None or part['feedback_type'] == feedback_type)
+            and (start is None or part['date'] >= start)
+            and (end is None or part['date'] <= end)
+            and (message_id is None or message_id in part['message_ids'])
+        ]
+        import pandas as pd
+
+        frames = []
+        for part in parts:
+            frames.append(pd.read_parquet(io.BytesIO(self.backend.get(part['key']))))
+            self.parts_read += 1
+        if not frames:
+            return pd.DataFrame(columns=COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        if message_id is not None:
+            df = df[df['message_id'] == message_id]
+        return df
+
+    def up_down_by_day(self, start=None, end=None):
+        """Up votes, down votes and up/down ratio of assistant messages per day."""
+        df = self.read('assistant_message', start, end)
+        counts = df.groupby(['date', 'feedback']).size().unstack(fill_value=0)
+        counts = counts.reindex(columns=['up', 'down'], fill_value=0)
+        counts['ratio'] = counts['up'] / counts['down'].where(counts['down'] > 0)
+        return counts
+
+    def down_votes(self, message_id):
+        df = self.read('assistant_message', message_id=message_id)
+        return df[df['feedback'] == 'down']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact and query chem-helper feedback")
+    parser.add_argument("command", choices=["compact", "ratio", "down"])
+    parser.add_argument("--bucket", help="S3 bucket (uses the default AWS credentials)")
+    parser.add_argument("--root", help="local directory laid out like the bucket")
+    parser.add_argument("--message-id")
+    parser.add_argument("--delete-sources", action="store_true")
+    args = parser.parse_args()
+
+    if args.root:
+        backend = FileBackend(args.root)
+    else:
+        import boto3
+
+        backend = S3Backend(boto3.client('s3'), args.bucket or 'chem-feedback')
+
+    if args.command == "compact":
+        print(f"Compacted {compact(backend, delete_sources=args.delete_sources)} events")
+    elif args.command == "ratio":
+        print(FeedbackIndex(backend).up_down_by_day().to_string())
+    else:
+        print(FeedbackIndex(backend).down_votes(args.message_id).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Tiered search-intent classifier for the EE Companion: local rules first, remote model when unsure
+import math
+import re
+
+from assistant_runtime import tracing
+
+# Weighted cues; the sum (plus BIAS) goes through a logistic to give P(search)
+SEARCH_CUES = [
+    (re.compile(r"\b(find|search|look up|looking for|locate|get|give|show|recommend|suggest|list|need|want)\b.*"
+                r"\b(articles?|papers?|studies|sources|journals?|publications?|literature|readings?)\b"), 3.5),
+    (re.compile(r"\b(articles?|papers?|studies|sources|publications?|literature|readings?)\s+"
+                r"(on|about|regarding|related to|concerning|covering|discussing|for|into)\b"), 3.5),
+    (re.compile(r"\b(academic|scholarly|peer[- ]reviewed|research)\s+(articles?|papers?|sources|studies|journals?)\b"), 2.0),
+    (re.compile(r"\b(any|some|more|recent|good)\s+(articles?|papers?|studies|sources|publications?)\b"), 1.5),
+    (re.compile(r"^(articles?|papers?|sources|studies|literature)\b"), 2.0),
+    (re.compile(r"\b(core|database|google scholar|jstor)\b"), 1.0),
+]
+SUPPORT_CUES = [
+    (re.compile(r"\b(how (do|can|should|would) i|what (is|are|does|should)|why|explain|help me|can you help|is it ok)\b"), -1.5),
+    (re.compile(r"\b(research question|topic|subject|outline|structure|plan|planning|deadline|word count|"
+                r"criteri(a|on)|assessment|grade|marks?|supervisor|reflections?|rppf|viva)\b"), -1.5),
+    (re.compile(r"\b(cite|citing|citation|reference|referencing|bibliography|mla|apa|chicago|format)\b"), -2.5),
+    (re.compile(r"\b(write|writing|draft|introduction|conclusion|paragraph|evaluate|analyse|analyze)\b"), -1.0),
+]
+BIAS = -2.0
+
+# P(search) outside this band is settled locally; inside it the remote classifier decides. A prompt
+# is only settled as "not a search" when at least one support cue matched: no evidence either way
+# (e.g. "search for coral reefs", which names no articles) always goes to the remote classifier
+LOCAL_NEGATIVE = 0.15
+LOCAL_POSITIVE = 0.8
+
+TOPIC_PATTERN = re.compile(
+    r"\b(?:articles?|papers?|studies|sources|publications?|literature|readings?)\b.*?"
+    r"\b(?:on|about|regarding|related to|concerning|covering|discussing|into|for)\s+(?:the topic of\s+)?(.+)$"
+)
+FILLER = re.compile(r"\b(please|thanks|thank you|for my (ee|extended essay)|for my essay)\b")
+
+
+def search_probability(prompt):
+    text = prompt.lower()
+    score = BIAS + sum(weight for pattern, weight in SEARCH_CUES + SUPPORT_CUES if pattern.search(text))
+    return 1 / (1 + math.exp(-score))
+
+
+def has_support_cue(prompt):
+    text = prompt.lower()
+    return any(pattern.search(text) for pattern, _ in SUPPORT_CUES)
+
+
+def extract_topic(prompt):
+    """Search terms from a prompt the rules classified as a search, or None if it names no topic."""
+    text = FILLER.sub("", prompt.lower()).strip(" ?.!")
+    match = TOPIC_PATTERN.search(text)
+    if not match:
+        # "give me sources" has nothing to search for; the remote classifier reads the conversation
+        return None
+    topic = re.sub(r"^(the|a|an)\s+", "", re.sub(r"\s+", " ", match.group(1))).strip(" ?.!,")
+    return topic or None
+
+
+def local_is_search_query(prompt):
+    """Return (True/False, search terms) for clear-cut prompts, or (None, None) when unsure."""
+    probability = search_probability(prompt)
+    if probability >= LOCAL_POSITIVE:
+        topic = extract_topic(prompt)
+        if topic:
+            return True, topic
+        return None, None
+    if probability <= LOCAL_NEGATIVE and has_support_cue(prompt):
+        return False, None
+    return None, None
+
+
+def remote_is_search_query(client, prompt):
+    ai_prompt = (f"Please analyze whether the following user input is specifically asking for academic articles "
+                 f"from a database and not a general support question related to the IB Extended Essay. If it is a request for articles, identify that it is a search query"
+                 f"and extract the key search terms. Otherwise, indicate it's not a search query")
+
+    completion = client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": ai_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=200,
+    )
+
+    tracing.log_event("intent.remote", response=completion.choices[0].message.content)
+    # Assuming the last message in the completion will be the AI's response
+    response_message = completion.choices[0].message.content  # Access the content attribute directly
+
+    # Adjust this to correctly identify the start of the key terms list in the response
+    search_terms_start_phrase = "terms are:"
+    search_terms_lines = response_message.split('\n')
+    search_terms = []
+    extracting = False
+    for line in search_terms_lines:
+        line = line.strip()
+        if extracting and line.startswith("-"):
+            term = line.strip('- ').strip()
+            if term:  # Ensure the line isn't empty
+                search_terms.append(term)
+        elif search_terms_start_phrase.lower() in line.lower():
+            extracting = True  # Start extracting terms from the next line
+
+    if search_terms:
+        # Concatenate extracted terms with "OR" for broader searches, or "AND" for more specific searches
+        formatted_search_terms = " OR ".join(search_terms)
+        tracing.log_event("intent.search_terms", terms=formatted_search_terms)
+        return True, formatted_search_terms
+    else:
+        tracing.log_event("intent.no_search_terms")
+        return False, None
+
+
+def is_search_query(client, prompt):
+    # Clear-cut prompts are settled locally in microseconds; only ambiguous ones pay for a model call
+    is_search, search_terms = local_is_search_query(prompt)
+    if is_search is not None:
+        return is_search, search_terms
+    return remote_is_search_query(client, prompt)
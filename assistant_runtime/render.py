@@ -0,0 +1,36 @@
+# Windowed, memoised transcript rendering for long chats
+import streamlit as st
+
+from assistant_runtime import tracing
+
+# Messages shown initially and added per "load earlier" click
+PAGE_SIZE = 20
+
+
+def message_markdown(message, state=st.session_state):
+    """Markdown for a message, built once per message id and reused on every rerun."""
+    cache = state.setdefault("rendered_markdown", {})
+    markdown = cache.get(message.id)
+    if markdown is None:
+        with tracing.span("render", "markdown") as span:
+            markdown = "\n\n".join(part.text.value for part in message.content if part.type == "text")
+            span.bytes = len(markdown)
+        cache[message.id] = markdown
+    return markdown
+
+
+def render_transcript(messages, render_message, page_size=PAGE_SIZE, state=st.session_state):
+    """Render only the most recent window of `messages`, with on-demand paging back.
+
+    Older messages are not sent to the browser until asked for, so render time and
+    payload stay flat as the conversation grows.
+    """
+    shown = state.get("transcript_window", page_size)
+    hidden = len(messages) - shown
+    if hidden > 0:
+        if st.button(f"Load {min(page_size, hidden)} earlier messages ({hidden} hidden)", key="load_earlier"):
+            shown += page_size
+            state.transcript_window = shown
+    with tracing.span("render", "transcript"):
+        for message in messages[-shown:]:
+            render_message(message)
@@ -0,0 +1,180 @@
+# Process-wide clients and caches shared by every session of a Streamlit server
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from openai import DefaultHttpxClient, OpenAI
+
+from assistant_runtime import tracing
+from assistant_runtime.assets import load_manifest
+from assistant_runtime.core import CoreClient
+from assistant_runtime.executor import RunExecutor
+from assistant_runtime.feedback import FeedbackWriter, S3Backend
+from assistant_runtime.response_cache import RESPONSE_CACHE_PATH, MemoryBackend, ResponseCache, SQLiteBackend
+from assistant_runtime.scheduler import RequestScheduler, endpoint_class, parse_limits
+from assistant_runtime.sessions import SESSION_STORE_PATH, MemorySessionBackend, SessionStore, SQLiteSessionBackend
+from assistant_runtime.threads import WarmThreadPool
+from assistant_runtime.uploads import UploadCache
+
+# How long a retrieved assistant definition is reused before it is fetched again
+ASSISTANT_TTL = 600
+
+# Visitors may type in their own keys, so per-key clients are bounded: at most this many,
+# each dropped after an idle hour (the app's own key is simply rebuilt when it comes back)
+MAX_API_KEYS = 32
+API_KEY_TTL = 3600
+
+# SDK retries per request; with the scheduler holding every session back after a 429,
+# a retry waits for the shared cooldown instead of adding to the storm
+MAX_RETRIES = 5
+
+# Files converted and uploaded at once, across all sessions
+UPLOAD_WORKERS = 4
+
+# Object ids in API paths, folded out of the traced operation names
+API_ID = re.compile(r"/(?:asst|thread|msg|run|step|file|vs)_[A-Za-z0-9]+")
+
+
+class TracedHttpClient(DefaultHttpxClient):
+    """The OpenAI SDK's HTTP client, admitting every request through `scheduler` and recording it as an "openai" span.
+
+    Streamed responses are timed to their headers; the app times the stream itself.
+    """
+
+    def __init__(self, scheduler, **kwargs):
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+
+    def send(self, request, **kwargs):
+        path = request.url.path.removeprefix('/v1')
+        operation = f"{request.method} {API_ID.sub('/{id}', path)}"
+        cls = endpoint_class(request.method, path)
+        self.scheduler.acquire(cls)
+        nbytes = int(request.headers.get("content-length") or 0)
+        started = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            tracing.record("openai", operation, time.perf_counter() - started, "error", nbytes)
+            raise
+        self.scheduler.observe(cls, response.status_code, response.headers)
+        nbytes += int(response.headers.get("content-length") or 0)
+        outcome = "ok" if response.status_code < 400 else f"http_{response.status_code}"
+        tracing.record("openai", operation, time.perf_counter() - started, outcome, nbytes)
+        return response
+
+
+@st.cache_resource(max_entries=MAX_API_KEYS, ttl=API_KEY_TTL)
+def get_openai_client(api_key):
+    # One client per API key; its HTTP connection pool and TLS sessions are reused across reruns
+    return OpenAI(api_key=api_key, http_client=TracedHttpClient(get_request_scheduler(api_key)), max_retries=MAX_RETRIES)
+
+
+def rate_limits():
+    """Client-side request limits from the openai_rate_limits secret, then OPENAI_RATE_LIMITS, over the defaults."""
+    limits = {}
+    try:
+        limits.update(parse_limits(dict(st.secrets.get("openai_rate_limits", {}))))
+    except FileNotFoundError:
+        # No secrets file at all
+        pass
+    limits.update(parse_limits(os.environ.get("OPENAI_RATE_LIMITS", "")))
+    return limits
+
+
+# Twice the clients' bound, so a live client's scheduler is not evicted before the client itself
+@st.cache_resource(max_entries=2 * MAX_API_KEYS, ttl=2 * API_KEY_TTL)
+def get_request_scheduler(api_key):
+    # Rate limits apply per key, so every session and assistant using it shares one gate
+    return RequestScheduler(limits=rate_limits())
+
+
+@st.cache_resource
+def get_core_client(api_key):
+    # Students search the same topics, so one cached client per key serves every session. The pages
+    # only use fan_out_search and never page through results, so nothing is prefetched
+    return CoreClient(api_key)
+
+
+@st.cache_resource
+def get_s3_client(aws_access_key_id, aws_secret_access_key):
+    # boto3 is only loaded when the first piece of feedback is sent
+    import boto3
+
+    return boto3.client(
+        's3',
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key
+    )
+
+
+@st.cache_resource
+def get_feedback_writer(bucket_name, aws_access_key_id, aws_secret_access_key):
+    # One background writer per bucket batches every session's feedback into a few S3 objects
+    return FeedbackWriter(S3Backend(get_s3_client(aws_access_key_id, aws_secret_access_key), bucket_name))
+
+
+@st.cache_resource(max_entries=2 * MAX_API_KEYS, ttl=ASSISTANT_TTL)
+def retrieve_assistant(api_key, assistant_id):
+    # New sessions share the cached definition instead of paying a retrieve round trip
+    return get_openai_client(api_key).beta.assistants.retrieve(assistant_id=assistant_id)
+
+
+@st.cache_resource
+def get_run_executor():
+    return RunExecutor()
+
+
+@st.cache_resource
+def get_thread_pool():
+    return WarmThreadPool()
+
+
+@st.cache_resource
+def get_upload_cache():
+    return UploadCache()
+
+
+@st.cache_resource
+def get_response_cache():
+    # With RESPONSE_CACHE_PATH set, every server process on the host shares one SQLite cache
+    return ResponseCache(SQLiteBackend(RESPONSE_CACHE_PATH) if RESPONSE_CACHE_PATH else MemoryBackend())
+
+
+@st.cache_resource
+def get_asset_manifest():
+    # Written by `python -m assistant_runtime.assets`; empty (so pages fall back to st.image) until it has run
+    return load_manifest()
+
+
+@st.cache_resource
+def get_session_store():
+    # Local SQLite by default, so sessions also survive a server restart; SESSION_STORE_PATH="" keeps them in memory
+    return SessionStore(SQLiteSessionBackend(SESSION_STORE_PATH) if SESSION_STORE_PATH else MemorySessionBackend())
+
+
+@st.cache_resource
+def get_upload_pool():
+    # Conversions and files.create calls of every session share a few workers
+    return ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+
+@st.cache_resource
+def get_dispatch_pool():
+    # Workers for remote calls a turn issues concurrently (never for Streamlit calls)
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="dispatch")
+
+
+@st.cache_resource
+def get_metrics_server():
+    # One Prometheus endpoint per process; a second server on the same host just goes without
+    if not tracing.METRICS_PORT:
+        return None
+    try:
+        return tracing.serve_metrics(tracing.METRICS_PORT)
+    except OSError as e:
+        tracing.log_event("metrics.unavailable", logging.WARNING, port=tracing.METRICS_PORT, error=str(e))
+        return None
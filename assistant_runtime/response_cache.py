@@ -0,0 +1,150 @@
+# Shared cache of assistant replies to stateless study prompts (/plan, practice questions)
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from assistant_runtime import tracing
+from assistant_runtime.sqlite import LocalConnections
+
+# Entries live this long, and each backend keeps at most this many (least recently used go first)
+RESPONSE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", str(24 * 3600)))
+MAX_ENTRIES = 2048
+# Set to a file path to share the cache between processes (and keep it across restarts) in SQLite
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH")
+
+NUMBER_WORDS = {"one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+                "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10"}
+FILLER = re.compile(r"\b(please|pls|thanks|thank you|can you|could you|would you|will you|i want|i need|"
+                    r"i would like|give me|generate|write|create|make|some|me|a|an|the)\b")
+# Prompts whose answer depends only on the prompt and the student's settings
+STATELESS_PROMPTS = [
+    re.compile(r"^/plan \w"),
+    re.compile(r"\b(\d+ )?(practice|sample|test|exam|quiz|revision) questions? (on|about|for|covering) \w"),
+]
+# ...unless they point back into the conversation
+CONTEXT_WORDS = re.compile(r"\b(more|another|again|other|this|that|these|those|above|previous|last|it|my)\b")
+
+
+def normalise(prompt):
+    """Lower-cased, punctuation- and filler-free form of a prompt, so near-identical prompts share a key."""
+    text = unicodedata.normalize("NFKC", prompt).lower()
+    text = re.sub(r"[^\w\s/]", " ", text)
+    text = " ".join(NUMBER_WORDS.get(word, word) for word in text.split())
+    return " ".join(FILLER.sub(" ", text).split())
+
+
+def is_stateless(prompt):
+    text = normalise(prompt)
+    return any(pattern.search(text) for pattern in STATELESS_PROMPTS) and not CONTEXT_WORDS.search(text)
+
+
+def cache_key(assistant_id, settings, text):
+    return hashlib.sha256("\x00".join([assistant_id, settings or "", text]).encode()).hexdigest()
+
+
+class MemoryBackend:
+    """Process-local LRU of (created, value) by key."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, value, created):
+        with self._lock:
+            self._entries[key] = (created, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """LRU of (created, value) by key in a local SQLite file, shared by every process on the host."""
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._connection = LocalConnections(path)
+        with self._connection() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS responses "
+                       "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+
+    def get(self, key):
+        with self._connection() as db:
+            row = db.execute("SELECT created, value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                db.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+        return row
+
+    def put(self, key, value, created):
+        with self._connection() as db:
+            db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, created, created))
+            db.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                       (self.max_entries,))
+
+    def delete(self, key):
+        with self._connection() as db:
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """Replies keyed by (assistant id, the student's settings, prompt), matched exactly or after normalise().
+
+    Only stateless prompts (see is_stateless) are looked up or stored, so a reply is
+    never reused for a question that depends on the rest of the conversation. Entries
+    expire after `ttl` seconds; the backend evicts the least recently used beyond its
+    size limit.
+    """
+
+    def __init__(self, backend=None, ttl=RESPONSE_TTL):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+
+    def get(self, assistant_id, settings, prompt):
+        """The cached reply to `prompt`, or None."""
+        if not is_stateless(prompt):
+            return None
+        with tracing.span("cache", "lookup") as span:
+            for match, text in (("exact", prompt), ("normalised", normalise(prompt))):
+                key = cache_key(assistant_id, settings, text)
+                entry = self.backend.get(key)
+                if entry is None:
+                    continue
+                created, value = entry
+                if time.time() - created > self.ttl:
+                    self.backend.delete(key)
+                    continue
+                span.bytes = len(value)
+                tracing.TRACER.response_cache.inc(match)
+                return value
+            tracing.TRACER.response_cache.inc("miss")
+        return None
+
+    def put(self, assistant_id, settings, prompt, reply):
+        if not reply or not is_stateless(prompt):
+            return
+        now = time.time()
+        self.backend.put(cache_key(assistant_id, settings, prompt), reply, now)
+        self.backend.put(cache_key(assistant_id, settings, normalise(prompt)), reply, now)
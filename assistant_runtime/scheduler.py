@@ -0,0 +1,224 @@
+# Process-wide admission control for OpenAI requests: token buckets, Retry-After and priorities
+import contextlib
+import contextvars
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from assistant_runtime import tracing
+
+# Lower runs first: a student waiting on a reply beats run polling, which beats housekeeping
+INTERACTIVE, POLL, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", POLL: "poll", BACKGROUND: "background"}
+
+# (requests per second, burst) per endpoint class; sized for a low usage tier and overridable
+# with OPENAI_RATE_LIMITS or the openai_rate_limits secret (see parse_limits)
+DEFAULT_LIMITS = {
+    "runs": (5, 10),
+    "poll": (20, 40),
+    "messages": (10, 20),
+    # Transcript syncs list messages; they get their own bucket so they never hold up a student's send
+    "message_reads": (20, 40),
+    "threads": (5, 10),
+    "files": (1, 3),
+    "chat": (5, 10),
+    "other": (10, 20),
+}
+
+_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextlib.contextmanager
+def priority(level):
+    """Schedule OpenAI requests made inside the block at `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def prioritized(fn, level):
+    """Wrap `fn` so the OpenAI requests it makes, on whatever thread, are scheduled at `level`."""
+
+    def scheduled(*args, **kwargs):
+        with priority(level):
+            return fn(*args, **kwargs)
+
+    return scheduled
+
+
+def endpoint_class(method, path):
+    # path has the /v1 prefix stripped, e.g. "/threads/thread_x/runs/run_y"
+    parts = [p for p in path.split("/") if p]
+    if parts[:1] == ["threads"] and len(parts) >= 3 and parts[2] == "runs":
+        return "poll" if method == "GET" else "runs"
+    if parts[:1] == ["threads"] and len(parts) >= 3 and parts[2] == "messages":
+        return "message_reads" if method == "GET" else "messages"
+    if parts[:1] == ["chat"]:
+        return "chat"
+    if parts[:1] in (["threads"], ["files"]):
+        return parts[0]
+    return "other"
+
+
+def parse_limits(spec):
+    """{class: (rate, burst)} from "runs=50:100, files=5" (burst defaults to twice the rate) or a mapping."""
+    if isinstance(spec, str):
+        spec = dict(item.split("=", 1) for item in spec.replace(";", ",").split(",") if "=" in item)
+    limits = {}
+    for cls, value in (spec or {}).items():
+        if isinstance(value, str):
+            value = value.split(":")
+        elif not isinstance(value, (list, tuple)):
+            value = [value]
+        rate = float(value[0])
+        limits[cls.strip()] = (rate, float(value[1]) if len(value) > 1 else rate * 2)
+    return limits
+
+
+def parse_duration(value):
+    """Seconds in an OpenAI reset header such as "1s", "250ms" or "6m0s"; None if unparseable."""
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    matches = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value or "")
+    return sum(float(n) * units[u] for n, u in matches) if matches else None
+
+
+def retry_after(headers):
+    """Seconds the server asked us to wait, from retry-after-ms or retry-after (seconds or HTTP date)."""
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.cooldown_until = 0.0
+        self.throttles = 0
+        self.waiters = []
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RequestScheduler:
+    """Gate in front of every OpenAI request of one API key.
+
+    Requests take a token from their endpoint class's bucket; when tokens run short,
+    waiters are served in priority order and background work must leave a
+    `reserve` share of the burst for interactive turns. A 429 (or an exhausted
+    x-ratelimit-remaining header) closes the class until Retry-After or a jittered
+    exponential backoff has passed and cuts its rate by `decrease`; successes win the
+    rate back gradually, so throughput degrades smoothly instead of every session
+    retrying at once.
+    """
+
+    def __init__(self, limits=None, reserve=0.25, min_rate=1.0, decrease=0.75, recovery=0.1,
+                 base_backoff=0.5, max_backoff=30.0):
+        self.reserve = reserve
+        self.min_rate = min_rate
+        self.decrease = decrease
+        self.recovery = recovery
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in {**DEFAULT_LIMITS, **(limits or {})}.items()}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self.throttled_total = 0
+
+    def acquire(self, cls, level=None):
+        """Block until a request of class `cls` may go out. Returns the seconds waited."""
+        level = _priority.get() if level is None else level
+        bucket = self._buckets.get(cls) or self._buckets["other"]
+        entry = (level, next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(bucket.waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    wait = bucket.cooldown_until - now
+                    if wait <= 0 and bucket.waiters[0] == entry:
+                        needed = 1 + (self.reserve * bucket.burst if level >= BACKGROUND else 0)
+                        if bucket.tokens >= needed:
+                            bucket.tokens -= 1
+                            break
+                        wait = (needed - bucket.tokens) / bucket.rate
+                    self._cond.wait(max(wait, 0.01) if bucket.waiters[0] == entry else None)
+            finally:
+                bucket.waiters.remove(entry)
+                heapq.heapify(bucket.waiters)
+                self._cond.notify_all()
+        waited = time.monotonic() - started
+        tracing.TRACER.scheduler_wait.observe(waited, cls, PRIORITY_NAMES.get(level, str(level)))
+        return waited
+
+    def observe(self, cls, status, headers):
+        """Feed a response back: 429s and exhausted quotas close the class, successes restore its rate."""
+        bucket = self._buckets.get(cls) or self._buckets["other"]
+        if status == 429:
+            self.throttled(cls, retry_after(headers))
+            return
+        if status >= 400:
+            return
+        with self._cond:
+            bucket.throttles = 0
+            bucket.rate = min(bucket.base_rate, bucket.rate + bucket.base_rate * self.recovery)
+            if headers.get("x-ratelimit-remaining-requests") == "0":
+                reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+                if reset:
+                    bucket.cooldown_until = max(bucket.cooldown_until, time.monotonic() + reset)
+
+    def throttled(self, cls, delay=None):
+        """Back the class off after a rate limit; also used for runs that fail with rate_limit_exceeded."""
+        bucket = self._buckets.get(cls) or self._buckets["other"]
+        with self._cond:
+            if delay is None:
+                # No Retry-After: jittered exponential backoff over consecutive throttles
+                delay = min(self.max_backoff, self.base_backoff * 2 ** bucket.throttles) * random.uniform(0.5, 1.5)
+            now = time.monotonic()
+            bucket.cooldown_until = max(bucket.cooldown_until, now + delay)
+            bucket.tokens = 0
+            bucket.updated = now
+            bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+            bucket.throttles += 1
+            self.throttled_total += 1
+            self._cond.notify_all()
+        tracing.TRACER.throttles.inc(cls)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._cond:
+            return {
+                name: {
+                    "rate": round(bucket.rate, 2),
+                    "tokens": round(min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate), 1),
+                    "cooldown": round(max(bucket.cooldown_until - now, 0), 2),
+                    "waiting": len(bucket.waiters),
+                }
+                for name, bucket in self._buckets.items()
+            }
@@ -0,0 +1,173 @@
+# Durable sessions: a browser's thread, uploads, transcript and in-flight run survive refreshes and reconnects
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+
+from openai.types.beta import Thread
+from openai.types.beta.threads import Message, Run
+
+from assistant_runtime import tracing
+from assistant_runtime.sqlite import LocalConnections
+
+# Sessions untouched for this long are forgotten
+SESSION_TTL = int(os.environ.get("SESSION_TTL", str(7 * 24 * 3600)))
+# SQLite file shared by every server process on the host; set it empty to keep sessions in memory only
+SESSION_STORE_PATH = os.environ.get("SESSION_STORE_PATH", os.path.join(tempfile.gettempdir(), "assistant-sessions.db"))
+# The browser names its session with a cookie, when a proxy in front of Streamlit sets one, or else a URL parameter
+SESSION_COOKIE = "assistant_session"
+SESSION_PARAM = "session"
+# st.session_state entry holding the browser's token for every page of a multipage app
+SESSION_TOKEN_KEY = "assistant_session_token"
+
+# Session state entries saved as they are; the thread, assistant, run and transcript are handled separately
+PERSISTED = ["session_id", "turn", "file_ids", "last_message_id", "synced_run_id",
+             "thread_start", "memory", "carried_config", "compactions", "streaming", "settings", "run_options"]
+
+
+def new_token():
+    return secrets.token_urlsafe(16)
+
+
+def session_key(token, app):
+    return f"{app}:{token}"
+
+
+class MemorySessionBackend:
+    """Sessions held by this process only: they survive reconnects, not restarts."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        with self._lock:
+            entry = self._sessions.get(key)
+            return None if entry is None else (entry[0], entry[1], list(entry[2]))
+
+    def save(self, key, data, messages, start):
+        with self._lock:
+            _, _, stored = self._sessions.get(key, (None, None, []))
+            self._sessions[key] = (time.time(), data, stored[:start] + messages)
+
+    def delete(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def purge(self, before):
+        with self._lock:
+            for key in [key for key, (updated, _, _) in self._sessions.items() if updated < before]:
+                del self._sessions[key]
+
+
+class SQLiteSessionBackend:
+    """Sessions in a local SQLite file; each transcript message is its own row, so saves only write what is new."""
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = LocalConnections(path)
+        with self._connection() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS sessions (key TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+            db.execute("CREATE TABLE IF NOT EXISTS session_messages "
+                       "(key TEXT NOT NULL, seq INTEGER NOT NULL, body TEXT NOT NULL, PRIMARY KEY (key, seq))")
+
+    def load(self, key):
+        db = self._connection()
+        row = db.execute("SELECT updated, data FROM sessions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        bodies = db.execute("SELECT body FROM session_messages WHERE key = ? ORDER BY seq", (key,)).fetchall()
+        return row[0], json.loads(row[1]), [json.loads(body) for body, in bodies]
+
+    def save(self, key, data, messages, start):
+        with self._connection() as db:
+            db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (key, json.dumps(data), time.time()))
+            db.execute("DELETE FROM session_messages WHERE key = ? AND seq >= ?", (key, start))
+            db.executemany("INSERT INTO session_messages VALUES (?, ?, ?)",
+                           [(key, start + i, json.dumps(message)) for i, message in enumerate(messages)])
+
+    def delete(self, key):
+        with self._connection() as db:
+            db.execute("DELETE FROM sessions WHERE key = ?", (key,))
+            db.execute("DELETE FROM session_messages WHERE key = ?", (key,))
+
+    def purge(self, before):
+        with self._connection() as db:
+            db.execute("DELETE FROM session_messages WHERE key IN (SELECT key FROM sessions WHERE updated < ?)", (before,))
+            db.execute("DELETE FROM sessions WHERE updated < ?", (before,))
+
+
+def _dump(model):
+    return model.model_dump(mode="json") if hasattr(model, "model_dump") else None
+
+
+class SessionStore:
+    """Saves the parts of a session that are expensive to rebuild, keyed by (browser token, app).
+
+    That is the thread id, assistant id, uploaded file ids, last run (which may still be
+    in flight), compaction memory and the cached transcript. Saves are skipped when
+    nothing changed and append only new transcript messages. Restored models are
+    rebuilt locally, without an API call. Anyone holding the token can resume the
+    session, so tokens are long random strings.
+    """
+
+    def __init__(self, backend=None, ttl=SESSION_TTL):
+        self.backend = backend if backend is not None else MemorySessionBackend()
+        self.ttl = ttl
+        self._last_purge = 0.0
+
+    def load(self, token, app):
+        """The saved session as a dict of session state entries (plus "assistant_id"), or None."""
+        key = session_key(token, app)
+        with tracing.span("sessions", "load") as span:
+            entry = self.backend.load(key)
+            if entry is None:
+                span.outcome = "miss"
+                return None
+            updated, data, messages = entry
+            if time.time() - updated > self.ttl:
+                self.backend.delete(key)
+                span.outcome = "expired"
+                return None
+        restored = {name: data[name] for name in PERSISTED if name in data}
+        restored["assistant_id"] = data.get("assistant_id")
+        if data.get("thread_id"):
+            restored["thread"] = Thread.model_construct(id=data["thread_id"], object="thread")
+        restored["run"] = Run.model_construct(**data["run"]) if data.get("run") else {"status": None}
+        restored["messages"] = [Message.model_construct(**message) for message in messages]
+        # What is stored already, so the next save starts from here
+        restored["saved_session"] = (json.dumps(data, sort_keys=True), len(messages), messages[-1]["id"] if messages else None)
+        return restored
+
+    def save(self, token, app, session_state):
+        """Write the session's durable state if it changed since the last save. Returns True if it wrote."""
+        thread, assistant = session_state.get("thread"), session_state.get("assistant")
+        data = {name: session_state.get(name) for name in PERSISTED if name in session_state}
+        data["thread_id"] = getattr(thread, "id", None)
+        data["assistant_id"] = getattr(assistant, "id", None)
+        data["run"] = _dump(session_state.get("run"))
+        messages = session_state.get("messages", [])
+        fingerprint = json.dumps(data, sort_keys=True)
+
+        saved_data, saved_count, saved_last = session_state.get("saved_session", (None, 0, None))
+        # The transcript only grows, unless it was reset for a new thread
+        start = saved_count if saved_count <= len(messages) and (
+            not saved_count or messages[saved_count - 1].id == saved_last) else 0
+        if fingerprint == saved_data and start == len(messages):
+            return False
+        with tracing.span("sessions", "save"):
+            new_messages = [message.model_dump(mode="json") for message in messages[start:]]
+            self.backend.save(session_key(token, app), data, new_messages, start)
+        session_state.saved_session = (fingerprint, len(messages), messages[-1].id if messages else None)
+
+        now = time.time()
+        if now - self._last_purge > 3600:
+            self._last_purge = now
+            self.backend.purge(now - self.ttl)
+        return True
+
+    def delete(self, token, app):
+        self.backend.delete(session_key(token, app))
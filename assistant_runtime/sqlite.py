@@ -0,0 +1,23 @@
+# Local SQLite files shared by every server process on the host
+import sqlite3
+import threading
+
+
+class LocalConnections:
+    """Per-thread connections to the SQLite file at `path`; calling the object returns this thread's.
+
+    sqlite3 connections may not be shared between threads, so each thread opens its own,
+    in WAL mode so readers in one process do not hold up writers in another.
+    """
+
+    def __init__(self, path, timeout=5):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __call__(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=self.timeout)
+            db.execute("PRAGMA journal_mode=WAL")
+        return db
@@ -0,0 +1,44 @@
+# Per-assistant slices of st.session_state, so several assistants can share one browser session
+import streamlit as st
+
+
+class SessionNamespace:
+    """Attribute-style view of one assistant's entries in st.session_state.
+
+    Supports the same access patterns the apps use on st.session_state itself
+    (attributes, `in`, get/pop/setdefault), so helpers accept either.
+    """
+
+    def __init__(self, name):
+        object.__setattr__(self, "_key", f"assistant:{name}")
+
+    @property
+    def _data(self):
+        return st.session_state.setdefault(self._key, {})
+
+    def __getattr__(self, name):
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self._data[name] = value
+
+    def __delattr__(self, name):
+        try:
+            del self._data[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def get(self, name, default=None):
+        return self._data.get(name, default)
+
+    def pop(self, name, *default):
+        return self._data.pop(name, *default)
+
+    def setdefault(self, name, default=None):
+        return self._data.setdefault(name, default)
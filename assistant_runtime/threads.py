@@ -0,0 +1,90 @@
+# Pre-warmed pool of empty threads so a first message never waits on threads.create
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from assistant_runtime import tracing
+from assistant_runtime.scheduler import BACKGROUND, prioritized
+
+
+class WarmThreadPool:
+    """Keeps up to `size` ready threads per (API key, assistant id), each reused for at most `max_age` seconds.
+
+    Threads are handed out on a session's first prompt and the pool is topped up in
+    the background. Threads that sit unused past `max_age` are deleted rather than
+    handed out, so sessions never inherit stale threads.
+    """
+
+    def __init__(self, size=3, max_age=1800, max_workers=2):
+        self.size = size
+        self.max_age = max_age
+        self._ready = {}
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thread-warm")
+
+    def warm(self, client, assistant_id):
+        # Top up the pool for this assistant without blocking the caller
+        key = (client.api_key, assistant_id)
+        with self._lock:
+            if key in self._refilling or len(self._ready.get(key, ())) >= self.size:
+                return
+            self._refilling.add(key)
+        self._pool.submit(prioritized(self._refill, BACKGROUND), client, key)
+
+    def acquire(self, client, assistant_id, session_id):
+        key = (client.api_key, assistant_id)
+        thread = None
+        expired = []
+        with self._lock:
+            ready = self._ready.get(key, deque())
+            while ready:
+                created, candidate = ready.popleft()
+                if time.monotonic() - created < self.max_age:
+                    thread = candidate
+                    break
+                expired.append(candidate)
+
+        for stale in expired:
+            self._pool.submit(prioritized(self._delete, BACKGROUND), client, stale)
+
+        if thread is None:
+            thread = client.beta.threads.create(metadata={'session_id': session_id})
+        else:
+            # Tag the pooled thread with its session off the hot path
+            self._pool.submit(prioritized(self._tag, BACKGROUND), client, thread, session_id)
+        self.warm(client, assistant_id)
+        return thread
+
+    def stats(self):
+        with self._lock:
+            return {assistant_id: len(ready) for (_, assistant_id), ready in self._ready.items()}
+
+    def _refill(self, client, key):
+        try:
+            while True:
+                with self._lock:
+                    if len(self._ready.get(key, ())) >= self.size:
+                        return
+                thread = client.beta.threads.create(metadata={'prewarmed': 'true'})
+                with self._lock:
+                    self._ready.setdefault(key, deque()).append((time.monotonic(), thread))
+        except Exception as e:
+            tracing.log_event("threads.warm_error", logging.WARNING, error=str(e))
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+    def _tag(self, client, thread, session_id):
+        try:
+            client.beta.threads.update(thread.id, metadata={'session_id': session_id})
+        except Exception as e:
+            tracing.log_event("threads.tag_error", logging.WARNING, thread_id=thread.id, error=str(e))
+
+    def _delete(self, client, thread):
+        try:
+            client.beta.threads.delete(thread.id)
+        except Exception as e:
+            tracing.log_event("threads.delete_error", logging.WARNING, thread_id=thread.id, error=str(e))
@@ -0,0 +1,239 @@
+# Hot-path spans, Prometheus metrics and structured sampled logs for the assistant apps
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Share of routine (INFO) log events that are written; warnings and errors are always written
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.1"))
+# Port of the local /metrics endpoint; 0 disables it
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9464"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+POLL_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+logger = logging.getLogger("assistant_runtime")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# (session id, turn number) of the code running now; copied into background work with bind()
+_context = contextvars.ContextVar("assistant_trace", default=(None, None))
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            # [cumulative bucket counts, sum, count]
+            entry = self._values.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._values.items()):
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {n}")
+                lines.append(f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labels, labels)} {count}")
+        return lines
+
+
+class Span:
+    """One timed call; set `bytes` and, for calls that return rather than raise on failure, `outcome`."""
+
+    def __init__(self, service, operation):
+        self.service = service
+        self.operation = operation
+        self.bytes = 0
+        self.outcome = "ok"
+
+
+class Tracer:
+    """Process-wide metrics plus the recent spans of each session.
+
+    Metrics are labelled by service/operation/outcome only, so their cardinality stays
+    fixed; per-session and per-turn detail lives in a bounded in-memory trace that the
+    sidebar debug panel reads.
+    """
+
+    def __init__(self, session_spans=200, max_sessions=1000):
+        self.session_spans = session_spans
+        self.max_sessions = max_sessions
+        self.call_seconds = Histogram("assistant_call_duration_seconds", "Latency of external calls and hot-path steps",
+                                      ("service", "operation", "outcome"))
+        self.call_bytes = Counter("assistant_call_bytes_total", "Bytes sent and received by external calls and steps",
+                                  ("service", "operation"))
+        self.script_runs = Counter("assistant_script_runs_total", "Streamlit script runs (reruns)", ("app",))
+        self.turns = Counter("assistant_turns_total", "Prompts submitted", ("app",))
+        self.runs = Counter("assistant_runs_total", "Assistant runs that reached a final status", ("status",))
+        self.run_polls = Histogram("assistant_run_polls", "runs.retrieve calls per run", buckets=POLL_BUCKETS)
+        self.run_tokens = Counter("assistant_run_tokens_total", "Tokens used by completed runs", ("kind",))
+        self.scheduler_wait = Histogram("assistant_scheduler_wait_seconds", "Time OpenAI requests waited for admission",
+                                        ("endpoint_class", "priority"))
+        self.throttles = Counter("assistant_throttled_total", "Rate limits hit, per endpoint class", ("endpoint_class",))
+        self.response_cache = Counter("assistant_response_cache_total", "Response cache lookups by result", ("result",))
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, service, operation):
+        span = Span(service, operation)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.outcome = "error"
+            raise
+        finally:
+            self.record(service, operation, time.perf_counter() - started, span.outcome, span.bytes)
+
+    def record(self, service, operation, seconds, outcome="ok", nbytes=0):
+        self.call_seconds.observe(seconds, service, operation, outcome)
+        if nbytes:
+            self.call_bytes.inc(service, operation, amount=nbytes)
+        session_id, turn = _context.get()
+        if session_id is None:
+            return
+        entry = {"turn": turn, "service": service, "operation": operation,
+                 "ms": round(seconds * 1000, 1), "bytes": nbytes, "outcome": outcome}
+        with self._lock:
+            spans = self._sessions.get(session_id)
+            if spans is None:
+                spans = self._sessions[session_id] = deque(maxlen=self.session_spans)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            spans.append(entry)
+
+    def record_run(self, run, polls):
+        self.runs.inc(run.status)
+        self.run_polls.observe(polls)
+        usage = getattr(run, "usage", None)
+        if usage is not None:
+            self.run_tokens.inc("prompt", amount=usage.prompt_tokens or 0)
+            self.run_tokens.inc("completion", amount=usage.completion_tokens or 0)
+
+    def session_trace(self, session_id):
+        with self._lock:
+            return list(self._sessions.get(session_id, ()))
+
+    def prometheus(self):
+        metrics = [self.call_seconds, self.call_bytes, self.script_runs, self.turns,
+                   self.runs, self.run_polls, self.run_tokens, self.scheduler_wait, self.throttles,
+                   self.response_cache]
+        return "\n".join(line for metric in metrics for line in metric.exposition()) + "\n"
+
+
+TRACER = Tracer()
+span = TRACER.span
+record = TRACER.record
+
+
+@contextlib.contextmanager
+def context(session_id, turn):
+    """Attribute spans recorded inside the block to this session and turn."""
+    token = _context.set((session_id, turn))
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current():
+    return _context.get()
+
+
+def bind(fn):
+    """Wrap `fn` so it records into the caller's session and turn when run on another thread."""
+    session_id, turn = _context.get()
+
+    def traced(*args, **kwargs):
+        with context(session_id, turn):
+            return fn(*args, **kwargs)
+
+    return traced
+
+
+def log_event(event, level=logging.INFO, sample=None, **fields):
+    """Write one JSON log line; INFO events are sampled at LOG_SAMPLE_RATE unless `sample` is given."""
+    if sample is None:
+        sample = LOG_SAMPLE_RATE if level < logging.WARNING else 1.0
+    if sample < 1.0 and random.random() >= sample:
+        return
+    session_id, turn = _context.get()
+    record = {"ts": round(time.time(), 3), "level": logging.getLevelName(level), "event": event}
+    if session_id is not None:
+        record.update(session=session_id, turn=turn)
+    record.update(fields)
+    logger.log(level, json.dumps(record, default=str))
+
+
+def serve_metrics(port=METRICS_PORT, host="127.0.0.1", tracer=TRACER):
+    """Serve `tracer` as Prometheus text on http://host:port/metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = tracer.prometheus().encode()
+            self.send_response(200)
+            self.send_header("content-type", "text/plain; version=0.0.4")
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
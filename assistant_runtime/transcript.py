@@ -0,0 +1,34 @@
+# Incremental sync of thread messages into a per-session transcript cache
+
+
+def fetch_new_messages(client, thread_id, after=None, page_size=100):
+    """Return the messages added to a thread after message id `after`, oldest first.
+
+    Uses cursor pagination, so a sync only transfers the messages the session has not
+    seen yet and long threads are never cut off at the default page size.
+    """
+    params = {"thread_id": thread_id, "order": "asc", "limit": page_size}
+    if after:
+        params["after"] = after
+    return list(client.beta.threads.messages.list(**params))
+
+
+def sync_transcript(client, session_state):
+    """Bring `session_state.messages` up to date with the session's thread after a run."""
+    run_id = session_state.run.id
+    if session_state.get("synced_run_id") == run_id:
+        return session_state.messages
+
+    new_messages = fetch_new_messages(client, session_state.thread.id, session_state.get("last_message_id"))
+    if new_messages:
+        session_state.messages.extend(new_messages)
+        session_state.last_message_id = new_messages[-1].id
+    session_state.synced_run_id = run_id
+    return session_state.messages
+
+
+def reset_transcript(session_state):
+    """Forget the cached transcript, e.g. when the session switches to a new thread."""
+    session_state.messages = []
+    for key in ("last_message_id", "synced_run_id"):
+        session_state.pop(key, None)
@@ -0,0 +1,225 @@
+# Streaming conversion and content-addressed caching of spreadsheet uploads
+import hashlib
+import json
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from assistant_runtime import tracing
+from assistant_runtime.scheduler import BACKGROUND, priority
+
+EXCEL_TYPES = ["application/vnd.ms-excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"]
+XLSX_TYPE = EXCEL_TYPES[1]
+
+# Rows parsed and written per step; memory stays bounded by one chunk whatever the file size
+CHUNK_ROWS = 50_000
+# Rows of the converted output shown in the app
+PREVIEW_ROWS = 20
+# Converted output larger than this spills from memory to a temporary file
+SPOOL_BYTES = 8 * 1024 * 1024
+# Outputs up to this size are kept for the download button
+DOWNLOAD_BYTES = 2 * 1024 * 1024
+
+# What a converted upload leaves behind: a preview, the OpenAI file id and (small files only) the output
+Upload = namedtuple("Upload", ["digest", "preview", "file_id", "rows", "output_bytes", "download", "created"])
+
+
+def unique_columns(names):
+    """Header names made unique the way pd.read_excel does it: repeats become "name.1", "name.2", ...
+
+    A suffixed name that another column already has is skipped, so ["a", "a", "a.1"]
+    becomes ["a", "a.2", "a.1"].
+    """
+    names = list(names)
+    taken = set(names)
+    counts = {}
+    columns = []
+    for name in names:
+        original, count = name, counts.get(name, 0)
+        while count:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in taken else counts.get(name, 0)
+        counts[name] = count + 1
+        columns.append(name)
+    return columns
+
+
+def iter_chunks(source, file_type, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrames of at most `chunk_rows` rows from a CSV/XLS/XLSX file object."""
+    # pandas is only loaded once someone uploads a file, not on every cold start
+    import pandas as pd
+
+    if file_type == "text/csv":
+        yield from pd.read_csv(source, chunksize=chunk_rows)
+    elif file_type == XLSX_TYPE:
+        # openpyxl's read-only mode streams rows instead of loading the whole workbook
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = unique_columns(str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header))
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_rows:
+                    yield pd.DataFrame(chunk, columns=columns)
+                    chunk = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=columns)
+        finally:
+            workbook.close()
+    elif file_type in EXCEL_TYPES:
+        # Legacy .xls has no streaming reader, so it is parsed in one go and written in chunks
+        df = pd.read_excel(source)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def convert_spreadsheet(source, file_type, out, preview_rows=PREVIEW_ROWS, chunk_rows=CHUNK_ROWS, progress=None):
+    """Write a spreadsheet to `out` as compact JSON Lines, one record per row.
+
+    Returns a pretty-printed JSON preview of the first `preview_rows` records and the
+    number of rows written. `progress(fraction)`, if given, is called after each chunk
+    with the share of the source read so far.
+    """
+    preview = []
+    rows = 0
+    size = source.seek(0, 2) or 1
+    source.seek(0)
+    with tracing.span("pandas", "convert") as span:
+        for chunk in iter_chunks(source, file_type, chunk_rows):
+            if len(preview) < preview_rows:
+                preview.extend(json.loads(chunk.head(preview_rows - len(preview)).to_json(orient='records')))
+            lines = chunk.to_json(orient='records', lines=True).encode()
+            if lines and not lines.endswith(b"\n"):
+                lines += b"\n"
+            out.write(lines)
+            rows += len(chunk)
+            span.bytes += len(lines)
+            if progress is not None:
+                progress(min(source.tell() / size, 1.0))
+    return json.dumps(preview, indent=4), rows
+
+
+def file_digest(source, block_size=1024 * 1024):
+    """SHA-256 of a file object, read in blocks and rewound afterwards."""
+    digest = hashlib.sha256()
+    source.seek(0)
+    for block in iter(lambda: source.read(block_size), b""):
+        digest.update(block)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+class UploadProgress:
+    """Stage and completed fraction of one upload; its worker writes them, the script thread reads them."""
+
+    def __init__(self):
+        self.stage = "queued"
+        self.fraction = 0.0
+
+    def __call__(self, stage, fraction):
+        self.stage = stage
+        self.fraction = fraction
+
+
+class UploadCache:
+    """Converted uploads keyed by (API key, SHA-256 of the file bytes).
+
+    Reruns and other sessions that upload the same bytes reuse the preview and file
+    id, so each distinct file is converted and sent to `files.create` once. Entries
+    older than `max_age` are dropped, then the least recently used ones until the
+    cache fits in `max_entries` and `max_bytes`.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=256 * 1024 * 1024, max_age=24 * 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, client, digest):
+        """The cached Upload of the file with SHA-256 `digest` for `client`'s API key, or None."""
+        return self._get((client.api_key, digest))
+
+    def get_or_upload(self, client, source, file_type, progress=None, digest=None):
+        """The Upload for `source`, converting and uploading it unless it is cached.
+
+        `progress(stage, fraction)`, if given, follows the conversion and upload.
+        `digest` is the file's SHA-256 if the caller already has it.
+        """
+        progress = progress or (lambda stage, fraction: None)
+        digest = digest or file_digest(source)
+        key = (client.api_key, digest)
+        upload = self._get(key)
+        if upload is not None:
+            progress("cached", 1.0)
+            return upload
+
+        # Concurrent uploads of the same bytes wait for the first one instead of repeating it
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            upload = self._get(key)
+            if upload is None:
+                upload = self._convert_and_upload(client, source, file_type, digest, progress)
+                self._put(key, upload)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        progress("uploaded", 1.0)
+        return upload
+
+    def _convert_and_upload(self, client, source, file_type, digest, progress):
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as out:
+            # Conversion is most of the work; the upload fills the last tenth of the bar
+            progress("converting", 0.0)
+            preview, rows = convert_spreadsheet(source, file_type, out,
+                                                progress=lambda fraction: progress("converting", 0.9 * fraction))
+            output_bytes = out.tell()
+            download = None
+            if output_bytes <= DOWNLOAD_BYTES:
+                out.seek(0)
+                download = out.read()
+            out.seek(0)
+            # Uploads yield to chat turns when the API is busy
+            progress("uploading", 0.9)
+            with priority(BACKGROUND):
+                file_response = client.files.create(file=("converted.jsonl", out), purpose='assistants')
+        return Upload(digest, preview, file_response.id, rows, output_bytes, download, time.monotonic())
+
+    @staticmethod
+    def _size(upload):
+        return len(upload.preview) + len(upload.download or b"")
+
+    def _get(self, key):
+        with self._lock:
+            upload = self._entries.get(key)
+            if upload is None:
+                return None
+            if time.monotonic() - upload.created > self.max_age:
+                self._bytes -= self._size(self._entries.pop(key))
+                return None
+            self._entries.move_to_end(key)
+            return upload
+
+    def _put(self, key, upload):
+        with self._lock:
+            self._entries[key] = upload
+            self._bytes += self._size(upload)
+            now = time.monotonic()
+            for stale_key in [k for k, u in self._entries.items() if now - u.created > self.max_age]:
+                self._bytes -= self._size(self._entries.pop(stale_key))
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
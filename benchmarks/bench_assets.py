@@ -0,0 +1,104 @@
+"""Page-image cost with st.image vs the prebuilt static variants: server time per rerun and bytes per visit.
+
+For each app image it times --runs script runs that only render the image, once with
+st.image (as the pages used to) and once with the <picture> markup built from
+static/assets.json. It also reports the bytes Streamlit's media store sends for st.image,
+and the variant a browser picks at a few screen sizes and formats.
+
+    python -m assistant_runtime.assets      # build static/ first
+    python benchmarks/bench_assets.py --runs 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+
+# (label, CSS width of the page column, device pixel ratio)
+SCREENS = [("phone", 360, 2), ("laptop", 704, 1), ("laptop hi-dpi", 704, 2)]
+APPS = [("chem-helper.py", "science.png", {"width": 300}), ("dynamic-app.py", "companion.png", {"caption": "Your Extended Essay Companion"})]
+
+
+def image_script():
+    # AppTest runs a copy of this function's source, so it imports what it needs itself
+    import streamlit as st
+
+    from assistant_runtime.assets import picture_html
+
+    spec = st.session_state["spec"]
+    if spec["mode"] == "st.image":
+        st.image(spec["path"], **spec["options"])
+    else:
+        st.markdown(picture_html(spec["entry"], spec["options"].get("width"), spec["options"].get("caption")),
+                    unsafe_allow_html=True)
+
+
+def time_runs(spec, runs):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_function(image_script, default_timeout=60)
+    at.session_state["spec"] = spec
+    at.run()
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def media_bytes():
+    # What st.image registered with the media file manager, i.e. what the browser downloads
+    from streamlit.runtime import Runtime
+
+    storage = Runtime.instance().media_file_mgr._storage
+    return max((len(f.content) for f in storage._files_by_id.values()), default=0)
+
+
+def picked(entry, css_width, dpr, mime):
+    # The browser takes the smallest variant at least css_width * dpr wide, else the largest
+    variants = sorted((v for v in entry["sources"] if v["type"] == mime), key=lambda v: v["width"])
+    return next((v for v in variants if v["width"] >= css_width * dpr), variants[-1]) if variants else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    from bench_load import share_runtime
+
+    from assistant_runtime.assets import STATIC_DIR, load_manifest
+
+    share_runtime()
+    manifest = load_manifest()
+    if not manifest:
+        sys.exit("static/assets.json not found; run `python -m assistant_runtime.assets` first")
+
+    for app, image, options in APPS:
+        entry = manifest[image]
+        spec = {"path": os.path.join(ROOT, image), "options": options, "entry": entry}
+        before = time_runs(dict(spec, mode="st.image"), args.runs)
+        sent = media_bytes()
+        after = time_runs(dict(spec, mode="picture"), args.runs)
+        print(f"{app}: {image} ({os.path.getsize(os.path.join(ROOT, image)) / 1024:.0f} KB)")
+        print(f"  script run   st.image {before * 1000:6.1f} ms   <picture> {after * 1000:6.1f} ms")
+        print(f"  st.image sends {sent / 1024:.0f} KB per visit (and hashes it on every rerun)")
+        for label, column, dpr in SCREENS:
+            css_width = min(column, options.get("width", column))
+            sizes = []
+            for mime in ("image/avif", "image/webp", "image/jpeg"):
+                variant = picked(entry, css_width, dpr, mime)
+                if variant:
+                    size = os.path.getsize(os.path.join(STATIC_DIR, variant["file"]))
+                    sizes.append(f"{mime.split('/')[1]} {variant['width']}w {size / 1024:4.0f} KB")
+            print(f"  {label:14s} " + "   ".join(sizes))
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Cost of /config and /plan in chem-helper with the slash-command router on and off.
+
+--students chem-helper sessions (against benchmarks/fake_api.py) each send a /config,
+a /plan and a follow-up question, first with AppConfig.slash_commands off (every command
+is a full Assistants run) and then on (/config is answered in-app and /plan runs from its
+template). The report gives turn latency and API calls per command, the runs and prompt
+tokens spent, and how many follow-up runs carried the settings as run-level instructions.
+
+    python benchmarks/bench_commands.py
+    python benchmarks/bench_commands.py --students 8 --run-seconds 2
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+
+TURNS = [
+    ("/config", "/config depth: Undergraduate, learning style: Visual, tone: Friendly, language: English"),
+    ("/plan", "/plan stoichiometry"),
+    ("question", "How do I find the limiting reagent in a reaction?"),
+]
+
+
+def chem_page():
+    # AppTest runs a copy of this function's source: chem-helper's config with the router switched per session
+    import streamlit as st
+
+    from assistant_runtime import AppConfig, run_app
+
+    run_app(AppConfig(name="chem", page_title="Queen of Science", title="Queen of Science",
+                      assistant_secret="CHEM_HELPER", response_cache=True,
+                      slash_commands=st.session_state["slash_commands"]))
+
+
+def student(api, slash_commands):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_function(chem_page, default_timeout=120)
+    at.session_state["slash_commands"] = slash_commands
+    at.run()
+    results = {}
+    for label, prompt in TURNS:
+        calls = api.total_calls()
+        started = time.perf_counter()
+        at.chat_input[0].set_value(prompt).run()
+        results[label] = (time.perf_counter() - started, api.total_calls() - calls)
+    at.run()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--run-seconds", type=float, default=1.0)
+    parser.add_argument("--reply-words", type=int, default=200)
+    args = parser.parse_args()
+
+    from bench_load import share_runtime
+    from fake_api import FakeAssistantsAPI
+
+    share_runtime()
+    for slash_commands in (False, True):
+        api = FakeAssistantsAPI(latency=args.latency, run_seconds=args.run_seconds, token_delay=0.002,
+                                reply_words=args.reply_words, seed=0)
+        os.environ["OPENAI_BASE_URL"] = api.start()
+        from assistant_runtime import get_openai_client, get_response_cache
+
+        # Each mode starts with cold clients (new base URL) and an empty response cache
+        get_openai_client.clear()
+        get_response_cache.clear()
+        sessions = [student(api, slash_commands) for _ in range(args.students)]
+
+        runs = list(api.runs.values())
+        configured = sum("Depth: Undergraduate" in (run["additional_instructions"] or "") for run in runs)
+        print(f"slash commands {'on' if slash_commands else 'off'}: {args.students} students")
+        for label, _ in TURNS:
+            latencies = [session[label][0] for session in sessions]
+            calls = [session[label][1] for session in sessions]
+            print(f"  {label:9s} latency mean {statistics.mean(latencies) * 1000:6.0f} ms   "
+                  f"API calls mean {statistics.mean(calls):4.1f}")
+        print(f"  runs {len(runs)}, prompt tokens {sum(run['prompt_tokens'] for run in runs)}, "
+              f"runs carrying the settings as instructions {configured}")
+        api.stop()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Run latency and prompt tokens over long sessions, with and without thread compaction.
+
+Drives --students concurrent 50-turn chem-helper sessions against benchmarks/fake_api.py,
+whose runs take --context-seconds longer per 1000 prompt tokens, as a model that
+re-reads the whole thread does. Each session opens with a /config message, which
+chem-helper answers in-app; the report checks that every later run, on the original
+and on the compacted threads, still carries the settings in its additional_instructions.
+Every session is run twice, in
+a child process per mode: once with compaction off (CONTEXT_TOKEN_BUDGET=0) and once
+with --budget.
+
+    python benchmarks/bench_compaction.py
+    python benchmarks/bench_compaction.py --turns 50 --budget 4000 --context-seconds 0.2
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+
+CONFIG_PROMPT = "/config depth: university, learning style: visual, tone: encouraging, language: English"
+# How the settings appear in each run's additional_instructions (commands.format_settings)
+CONFIG_INSTRUCTIONS = "Depth: university; Learning style: visual; Tone style: encouraging; Language: English"
+TOPICS = ["ionic bonding", "enthalpy changes", "reaction rates", "equilibrium constants", "acids and bases",
+          "redox titrations", "organic functional groups", "electrochemical cells", "atomic structure"]
+
+
+def prompts(turns):
+    questions = [f"Can you explain {TOPICS[i % len(TOPICS)]} again, with an example? (question {i})" for i in range(turns)]
+    return [CONFIG_PROMPT] + questions[:turns - 1]
+
+
+def session(turns, think):
+    from bench_load import open_page
+
+    at = open_page("chem-helper.py")
+    results = []
+    for prompt in prompts(turns):
+        time.sleep(think)
+        started = time.perf_counter()
+        at.chat_input[0].set_value(prompt).run()
+        latency = time.perf_counter() - started
+        run = at.session_state["assistant:chem"]["run"]
+        results.append((latency, run.usage.prompt_tokens if getattr(run, "usage", None) else 0))
+    # One last rerun so the final reply is synced and any pending compaction is applied
+    at.run()
+    return results, at.session_state["assistant:chem"].get("compactions", 0)
+
+
+def child(args):
+    from bench_load import share_runtime
+    from fake_api import FakeAssistantsAPI
+
+    api = FakeAssistantsAPI(latency=args.latency, run_seconds=args.run_seconds, token_delay=args.token_delay,
+                            reply_words=args.reply_words, context_seconds=args.context_seconds, seed=0)
+    os.environ["OPENAI_BASE_URL"] = api.start()
+    share_runtime()
+    with ThreadPoolExecutor(max_workers=args.students) as pool:
+        sessions = list(pool.map(lambda _: session(args.turns, args.think), range(args.students)))
+    # A compacted thread opens with the memory message; the settings must ride on the runs made there too
+    compacted = {thread_id for thread_id, messages in api.threads.items()
+                 if messages and messages[0]["content"][0]["text"]["value"].startswith("Memory of our conversation")}
+    configured = [CONFIG_INSTRUCTIONS in (run["additional_instructions"] or "") for run in api.runs.values()]
+    after = [CONFIG_INSTRUCTIONS in (run["additional_instructions"] or "") for run in api.runs.values()
+             if run["thread_id"] in compacted]
+    print(json.dumps({
+        "turns": [results for results, _ in sessions],
+        "compactions": sum(compactions for _, compactions in sessions),
+        "summaries": api.calls["POST /chat/completions"],
+        "runs": len(configured),
+        "runs_configured": sum(configured),
+        "compacted_runs": len(after),
+        "compacted_runs_configured": sum(after),
+    }))
+    api.stop()
+    os._exit(0)
+
+
+def run_mode(args, budget):
+    env = dict(os.environ, CONTEXT_TOKEN_BUDGET=str(budget), METRICS_PORT="0", PYTHONWARNINGS="ignore")
+    argv = [sys.executable, __file__, "--child"] + [a for a in sys.argv[1:] if a != "--child"]
+    out = subprocess.run(argv, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def report(label, result, bucket):
+    turns = list(zip(*result["turns"]))
+    print(f"{label}: {result['compactions']} compactions, {result['summaries']} summary calls, "
+          f"settings on {result['runs_configured']} of {result['runs']} runs "
+          f"({result['compacted_runs_configured']} of {result['compacted_runs']} on compacted threads)")
+    print("  turns      latency (mean)   prompt tokens (mean)")
+    for start in range(0, len(turns), bucket):
+        window = [turn for at_turn in turns[start:start + bucket] for turn in at_turn]
+        print(f"  {start + 1:3d}-{min(start + bucket, len(turns)):<3d}   {statistics.mean(t[0] for t in window) * 1000:8.0f} ms"
+              f"   {statistics.mean(t[1] for t in window):12.0f}")
+    every = [turn for at_turn in turns for turn in at_turn]
+    print(f"  all        {statistics.mean(t[0] for t in every) * 1000:8.0f} ms   {statistics.mean(t[1] for t in every):12.0f}"
+          f"   (total prompt tokens {sum(t[1] for t in every)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--budget", type=int, default=4000, help="CONTEXT_TOKEN_BUDGET of the compacting run")
+    parser.add_argument("--think", type=float, default=0.5, help="seconds between a student's turns")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--run-seconds", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    parser.add_argument("--reply-words", type=int, default=200)
+    parser.add_argument("--context-seconds", type=float, default=0.15, help="extra run seconds per 1000 prompt tokens")
+    parser.add_argument("--bucket", type=int, default=10, help="turns per report line")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    report("no compaction", run_mode(args, 0), args.bucket)
+    report(f"budget {args.budget}", run_mode(args, args.budget), args.bucket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Latency and relevance of one broad OR query versus the fan-out CORE search.
+
+Runs --searches multi-term searches against the CORE stub in benchmarks/fake_api.py,
+whose OR queries are slower per term and return the first term's works mixed with
+loosely related records, and where a fraction of queries hit a slow shard. Each
+search is made twice on a fresh CoreClient: as the single "a OR b OR c" query the
+apps used to send, and with CoreClient.fan_out_search under --deadline.
+
+Relevance is measured on the top 5: precision is the share of results whose title
+names one of the terms, coverage the share of terms with at least one result.
+
+    python benchmarks/bench_core_search.py --searches 60 --tail-rate 0.1
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+
+from fake_api import FakeAssistantsAPI  # noqa: E402
+
+TOPICS = ["acid rain", "ocean acidification", "buffer solutions", "enzyme kinetics", "polymer recycling",
+          "hydrogen fuel cells", "water hardness", "vitamin c oxidation", "biodiesel yield", "soil ph"]
+
+
+def searches(n):
+    # Two or three terms each; the index keeps every query distinct so the result cache never answers
+    return [[f"{TOPICS[(i + j * 3) % len(TOPICS)]} {i}" for j in range(2 + i % 2)] for i in range(n)]
+
+
+def relevance(articles, terms):
+    titles = [(article.get("title") or "").lower() for article in articles]
+    precision = sum(any(term.lower() in title for term in terms) for title in titles) / max(len(titles), 1)
+    coverage = sum(any(term.lower() in title for title in titles) for term in terms) / len(terms)
+    return precision, coverage
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--searches", type=int, default=60)
+    parser.add_argument("--core-latency", type=float, default=0.2, help="seconds per OR'd term")
+    parser.add_argument("--tail-rate", type=float, default=0.1)
+    parser.add_argument("--tail-latency", type=float, default=3.0)
+    parser.add_argument("--deadline", type=float, default=1.5)
+    args = parser.parse_args()
+
+    from assistant_runtime.core import CoreClient
+
+    api = FakeAssistantsAPI(core_latency=args.core_latency, core_tail_rate=args.tail_rate,
+                            core_tail_latency=args.tail_latency, seed=0)
+    api.start()
+    modes = {
+        "single OR query": lambda client, terms: client.search("works", " OR ".join(terms), limit=5),
+        f"fan-out, {args.deadline:.1f} s deadline": lambda client, terms: client.fan_out_search(
+            "works", " OR ".join(terms), limit=5, deadline=args.deadline),
+    }
+    print(f"{args.searches} searches of 2-3 terms; CORE {args.core_latency:.2f} s per term, "
+          f"{args.tail_rate:.0%} of queries +{args.tail_latency:.1f} s")
+    for label, search in modes.items():
+        client = CoreClient("fake", base_url=api.core_url)
+        latencies, precisions, coverages = [], [], []
+        calls = api.total_calls("GET /core")
+        for terms in searches(args.searches):
+            started = time.perf_counter()
+            articles = search(client, terms)
+            latencies.append(time.perf_counter() - started)
+            precision, coverage = relevance(articles, terms)
+            precisions.append(precision)
+            coverages.append(coverage)
+        print(f"  {label:26s} p50 {percentile(latencies, 50) * 1000:6.0f} ms   p95 {percentile(latencies, 95) * 1000:6.0f} ms   "
+              f"max {max(latencies) * 1000:6.0f} ms   precision {statistics.mean(precisions):.2f}   "
+              f"coverage {statistics.mean(coverages):.2f}   CORE calls/search "
+              f"{(api.total_calls('GET /core') - calls) / args.searches:.1f}")
+    api.stop()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Scan time of feedback queries on the raw one-object-per-event layout vs. the compacted index.
+
+Generates synthetic feedback in the old feedback/{type}/{timestamp}.json layout in a
+local directory, then answers "up/down ratio per day" and "down-votes for message X"
+by listing and reading every raw object, and again through FeedbackIndex after
+compaction. --object-latency-ms adds a per-request delay to approximate S3.
+
+    python benchmarks/bench_feedback_index.py --events 5000 --object-latency-ms 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+from assistant_runtime.feedback import FileBackend  # noqa: E402
+from assistant_runtime.feedback_index import COMPACTED_PREFIX, FeedbackIndex, compact, read_source  # noqa: E402
+
+
+class SlowBackend:
+    """Wraps a backend and sleeps per request, like a round trip to S3."""
+
+    def __init__(self, backend, latency):
+        self.backend = backend
+        self.latency = latency
+        self.requests = 0
+
+    def _wait(self):
+        self.requests += 1
+        time.sleep(self.latency)
+
+    def put(self, key, body):
+        self._wait()
+        self.backend.put(key, body)
+
+    def get(self, key):
+        self._wait()
+        return self.backend.get(key)
+
+    def list(self, prefix):
+        # One request per 1000 keys, like list_objects_v2 pages
+        for i, key in enumerate(self.backend.list(prefix)):
+            if i % 1000 == 0:
+                self._wait()
+            yield key
+
+    def delete(self, key):
+        self._wait()
+        self.backend.delete(key)
+
+
+def generate(root, events, days, messages):
+    rng = random.Random(0)
+    start = datetime(2024, 3, 1)
+    for i in range(events):
+        stamp = start + timedelta(seconds=rng.randrange(days * 86400))
+        general = rng.random() < 0.1
+        feedback_type = 'general_feedback' if general else 'assistant_message'
+        event = {
+            'message_id': None if general else f"msg_{rng.randrange(messages)}",
+            'message_content': "Some assistant answer about stoichiometry" * 3,
+            'feedback': 'n/a' if general else rng.choice(['up', 'up', 'down']),
+            'feedback_type': feedback_type,
+        }
+        path = os.path.join(root, "feedback", feedback_type)
+        os.makedirs(path, exist_ok=True)
+        # Same-second events overwrite each other, exactly as they did with the old log_feedback
+        with open(os.path.join(path, f"{stamp:%Y-%m-%d_%H-%M-%S}.json"), "w") as f:
+            json.dump(event, f)
+
+
+def raw_scan(backend):
+    keys = [k for k in backend.list("feedback/") if not k.startswith(COMPACTED_PREFIX)]
+    return pd.DataFrame([event for key in keys for event in read_source(backend, key)])
+
+
+def timed(label, backend, fn):
+    before = backend.requests
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<40} {time.perf_counter() - started:8.3f}s {backend.requests - before:7d} requests")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--object-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate(root, args.events, args.days, args.messages)
+        backend = SlowBackend(FileBackend(root), args.object_latency_ms / 1000)
+        print(f"{sum(1 for _ in FileBackend(root).list('feedback/'))} raw objects")
+
+        def raw_ratio():
+            df = raw_scan(backend)
+            df = df[df['feedback_type'] == 'assistant_message']
+            return df.groupby(['date', 'feedback']).size().unstack(fill_value=0)
+
+        def raw_down():
+            df = raw_scan(backend)
+            return df[(df['message_id'] == 'msg_7') & (df['feedback'] == 'down')]
+
+        timed("raw: up/down per day", backend, raw_ratio)
+        timed("raw: down-votes for one message", backend, raw_down)
+        timed("compaction", backend, lambda: compact(backend))
+        timed("index: up/down per day", backend, lambda: FeedbackIndex(backend).up_down_by_day())
+        timed("index: up/down for one week", backend,
+              lambda: FeedbackIndex(backend).up_down_by_day('2024-03-04', '2024-03-10'))
+        timed("index: down-votes for one message", backend, lambda: FeedbackIndex(backend).down_votes('msg_7'))
+
+
+if __name__ == "__main__":
+    main()
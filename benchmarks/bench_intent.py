@@ -0,0 +1,77 @@
+"""Accuracy and latency of the EE Companion search-intent classifier tiers.
+
+Runs the labelled prompts through the local rule tier and, with --remote, through the
+original gpt-3.5-turbo classifier and the tiered classifier the app uses (local first,
+remote fallback). The rule weights and thresholds were tuned on intent_prompts.jsonl;
+intent_prompts_holdout.jsonl was written separately and never used for tuning, so its
+scores are the ones to trust. --remote needs OPENAI_API_KEY (and honours OPENAI_BASE_URL).
+
+    python benchmarks/bench_intent.py [--remote]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from assistant_runtime.intent import is_search_query, local_is_search_query, remote_is_search_query  # noqa: E402
+
+PROMPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_prompts.jsonl")
+HOLDOUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_prompts_holdout.jsonl")
+
+
+def load_prompts(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(name, classify, prompts, repeat=1):
+    correct = undecided = 0
+    latencies = []
+    for item in prompts:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                is_search, _ = classify(item["prompt"])
+            latencies.append(time.perf_counter() - started)
+        if is_search is None:
+            undecided += 1
+        elif is_search == item["search"]:
+            correct += 1
+    decided = len(prompts) - undecided
+    latencies.sort()
+    print(f"{name:>8}: accuracy {correct}/{decided} decided ({correct / max(decided, 1):.1%}), "
+          f"{undecided} deferred, "
+          f"p50 {statistics.median(latencies) * 1e6:.0f}us, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1e6:.0f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prompts", default=PROMPTS, help="the prompts the rules were tuned on")
+    parser.add_argument("--holdout", default=HOLDOUT, help="prompts never used for tuning")
+    parser.add_argument("--remote", action="store_true", help="also measure the remote and tiered classifiers")
+    args = parser.parse_args()
+
+    client = None
+    if args.remote:
+        from openai import OpenAI
+
+        client = OpenAI()
+    for label, path in (("tuning set", args.prompts), ("held-out set", args.holdout)):
+        prompts = load_prompts(path)
+        print(f"{label}: {len(prompts)} labelled prompts ({sum(p['search'] for p in prompts)} searches)")
+        evaluate("local", local_is_search_query, prompts, repeat=100)
+        if client is not None:
+            evaluate("remote", lambda prompt: remote_is_search_query(client, prompt), prompts)
+            evaluate("tiered", lambda prompt: is_search_query(client, prompt), prompts)
+
+
+if __name__ == "__main__":
+    main()
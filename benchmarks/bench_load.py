@@ -0,0 +1,215 @@
+"""Simulated classroom against the fake Assistants API: turn latency, API calls and reruns per turn.
+
+Starts benchmarks/fake_api.py in-process, then drives N concurrent students through an
+app with Streamlit's AppTest. Every student is its own session in this one process, so
+they share the app's cached clients, pools and executor as they would on one server.
+Each student opens the page and then sends --turns prompts taken from
+intent_prompts.jsonl. The search prompts go to the CORE stub on apps that search.
+
+Turn latency runs from submitting the prompt to the assistant's reply being on screen,
+including any "Thinking" reruns. Script reruns are counted by wrapping Streamlit's
+script runner.
+
+    python benchmarks/bench_load.py --app dynamic-app.py --students 8 --turns 3 --latency 0.05
+    python benchmarks/bench_load.py --app chem-helper.py --rate-limit 0.05 --failure-rate 0.02
+    python benchmarks/bench_load.py --app chem-helper.py --students 12 --rps 8
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+
+from fake_api import FakeAssistantsAPI  # noqa: E402
+
+PROMPTS = os.path.join(BENCHMARKS, "intent_prompts.jsonl")
+SECRETS = {
+    "OPENAI_API_KEY": "sk-fake",
+    "OPENAI_ASSISTANT": "asst_fake",
+    "CHEM_HELPER": "asst_fake",
+    "CORE_API": "fake",
+    "aws": {"aws_access_key_id": "fake", "aws_secret_access_key": "fake"},
+}
+
+script_runs = 0
+_script_runs_lock = threading.Lock()
+
+
+def count_script_runs():
+    from streamlit.runtime.scriptrunner import script_runner
+
+    run_script = script_runner.ScriptRunner._run_script
+
+    def counted(self, *args, **kwargs):
+        global script_runs
+        with _script_runs_lock:
+            script_runs += 1
+        return run_script(self, *args, **kwargs)
+
+    script_runner.ScriptRunner._run_script = counted
+
+
+def share_runtime():
+    """Give every AppTest session the same runtime and secrets, as sessions on one server have.
+
+    AppTest installs a fresh mock Runtime (and its secrets) around each run and clears
+    them afterwards, which breaks sessions running at the same time in one process.
+    """
+    from unittest.mock import MagicMock
+
+    import streamlit as st
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    # No browser behind the sessions, so st.context has no cookies or headers
+    runtime.get_client.return_value = None
+    Runtime._instance = runtime
+
+    class PerRunRuntime:
+        # AppTest's per-run install/clear lands here instead of on the shared Runtime
+        _instance = None
+
+    app_test.Runtime = PerRunRuntime
+
+    st.secrets = Secrets()
+    st.secrets._secrets = SECRETS
+
+
+def rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def open_page(app):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=120)
+    at.run()
+    return at
+
+
+def thinking(at):
+    return any("Thinking" in str(element.value) for element in at.markdown)
+
+
+def student(app, prompts, think, poll_interval):
+    at = open_page(app)
+    latencies, errors = [], 0
+    for prompt in prompts:
+        time.sleep(think)
+        started = time.perf_counter()
+        try:
+            at.chat_input[0].set_value(prompt).run()
+            # Polled runs show "Thinking" until the browser's fragment timer reruns the page
+            while thinking(at):
+                time.sleep(poll_interval)
+                at.run()
+        except Exception as e:
+            print(f"turn failed: {e}", file=sys.stderr)
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+        errors += len(at.exception) + len(at.error)
+    return latencies, errors
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="dynamic-app.py")
+    parser.add_argument("--students", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--think", type=float, default=0.2, help="seconds between a student's turns")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="fragment rerun period while a run is polled")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--run-seconds", type=float, default=1.0)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--run-failure-rate", type=float, default=0.0)
+    parser.add_argument("--core-latency", type=float, default=0.1)
+    parser.add_argument("--rps", type=float, default=None, help="OpenAI quota in requests per second")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    api = FakeAssistantsAPI(
+        latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+        rate_limit_rate=args.rate_limit, retry_after=args.retry_after, run_seconds=args.run_seconds,
+        token_delay=args.token_delay, run_failure_rate=args.run_failure_rate,
+        core_latency=args.core_latency, requests_per_second=args.rps, seed=args.seed,
+    )
+    os.environ["OPENAI_BASE_URL"] = api.start()
+    os.environ["CORE_API_URL"] = api.core_url
+    share_runtime()
+    count_script_runs()
+
+    with open(PROMPTS) as f:
+        prompts = [json.loads(line)["prompt"] for line in f if line.strip()]
+    # The file is grouped by label; shuffle so every student mixes search and support prompts
+    random.Random(args.seed).shuffle(prompts)
+    plans = [
+        [prompts[(s * args.turns + t) % len(prompts)] for t in range(args.turns)]
+        for s in range(args.students)
+    ]
+
+    # One page load first, so module imports and cached resources are not charged to the turns
+    open_page(args.app)
+    baseline_rss = rss_mb()
+    api.reset_calls()
+    global script_runs
+    script_runs = 0
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.students) as pool:
+        results = list(pool.map(
+            lambda plan: student(args.app, plan, args.think, args.poll_interval), plans
+        ))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for student_latencies, _ in results for latency in student_latencies]
+    errors = sum(student_errors for _, student_errors in results)
+    turns = max(len(latencies), 1)
+    # Page loads (one per student) are reported apart from the turns
+    page_loads = args.students
+    turn_runs = script_runs - page_loads
+
+    print(f"{args.app}: {args.students} students x {args.turns} turns in {elapsed:.1f} s")
+    if latencies:
+        print(f"  turn latency    p50 {percentile(latencies, 50) * 1000:7.0f} ms   "
+              f"p95 {percentile(latencies, 95) * 1000:7.0f} ms   mean {statistics.mean(latencies) * 1000:7.0f} ms")
+    print(f"  turns           {len(latencies)} ok, {errors} errors")
+    print(f"  API calls/turn  {api.total_calls() / turns:7.2f}   (incl. page loads; CORE {api.total_calls('GET /core') / turns:.2f})")
+    print(f"  injected        {api.faults[429]} x 429, {api.faults[500]} x 500")
+    print(f"  reruns/turn     {turn_runs / turns:7.2f}")
+    print(f"  peak RSS        {rss_mb():7.1f} MB   (after warm-up {baseline_rss:.1f} MB)")
+    for endpoint, calls in api.calls.most_common():
+        print(f"    {calls:6d}  {endpoint}")
+    api.stop()
+    # Background pools (warm threads, feedback writer) would otherwise keep the process alive
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Wall time of uploading several spreadsheets one after another versus side by side.
+
+Generates --files CSVs of increasing size, then converts and uploads them through
+UploadCache against benchmarks/fake_api.py (whose files.create takes
+--upload-seconds-per-mb), first one at a time and then all at once on a pool of
+UPLOAD_WORKERS threads, as the app's uploader does. Each pass starts from an empty
+cache. Requests go through the same scheduler-gated HTTP client the apps use.
+
+    python benchmarks/bench_multi_upload.py --files 4 --mb 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+
+from bench_upload_conversion import make_csv  # noqa: E402
+from fake_api import FakeAssistantsAPI  # noqa: E402
+
+
+def client(base_url):
+    from openai import OpenAI
+
+    from assistant_runtime.resources import MAX_RETRIES, TracedHttpClient
+    from assistant_runtime.scheduler import RequestScheduler
+
+    return OpenAI(api_key="sk-fake", base_url=base_url, http_client=TracedHttpClient(RequestScheduler()),
+                  max_retries=MAX_RETRIES)
+
+
+def upload(cache, openai_client, path):
+    started = time.perf_counter()
+    with open(path, "rb") as source:
+        cache.get_or_upload(openai_client, source, "text/csv")
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--mb", type=int, default=2, help="size of the smallest file; file i is i times this")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--upload-seconds-per-mb", type=float, default=0.5)
+    args = parser.parse_args()
+
+    from assistant_runtime.resources import UPLOAD_WORKERS
+    from assistant_runtime.uploads import UploadCache
+
+    api = FakeAssistantsAPI(latency=args.latency, upload_seconds_per_mb=args.upload_seconds_per_mb)
+    openai_client = client(api.start())
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(1, args.files + 1):
+            paths.append(os.path.join(tmp, f"lab{i}.csv"))
+            make_csv(paths[-1], args.mb * i)
+
+        cache = UploadCache()
+        alone = [upload(cache, openai_client, path) for path in paths]
+
+        cache = UploadCache()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+            together = list(pool.map(lambda path: upload(cache, openai_client, path), paths))
+        wall = time.perf_counter() - started
+
+    print(f"{args.files} CSVs of {', '.join(str(args.mb * i) for i in range(1, args.files + 1))} MB, "
+          f"{UPLOAD_WORKERS} upload workers")
+    print(f"  one after another  {sum(alone):6.2f} s   (slowest file alone {max(alone):.2f} s)")
+    print(f"  side by side       {wall:6.2f} s   (per file {', '.join(f'{t:.2f}' for t in together)} s)")
+    api.stop()
+
+
+if __name__ == "__main__":
+    main()
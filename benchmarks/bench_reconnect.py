@@ -0,0 +1,107 @@
+"""Time to resume a session after a refresh, from the session store vs rebuilt through the API.
+
+A chem-helper student (against benchmarks/fake_api.py) holds a --turns conversation,
+then reconnects: a new AppTest session opens the page with the same ?session= token.
+The report gives the reconnect's page-load time, API calls and SessionStore.load time
+with the SQLite and in-memory session stores. For comparison it also times rebuilding
+the same state through the API: retrieving the assistant and listing the thread's whole
+history, which is what a reconnect costs without the store even when the thread id is known.
+Once a long conversation has been compacted, the API can only give back the current
+thread, while the store still holds the whole transcript.
+
+    python benchmarks/bench_reconnect.py
+    python benchmarks/bench_reconnect.py --turns 50 --latency 0.1
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+
+
+def converse(turns):
+    from bench_load import open_page
+
+    at = open_page("chem-helper.py")
+    for i in range(turns):
+        at.chat_input[0].set_value(f"Explain the next idea in reaction kinetics, part {i}").run()
+    at.run()
+    return at.session_state["assistant:chem"]
+
+
+def reconnect(token):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "chem-helper.py"), default_timeout=120)
+    at.query_params["session"] = token
+    started = time.perf_counter()
+    at.run()
+    return time.perf_counter() - started, at.session_state["assistant:chem"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=25)
+    parser.add_argument("--reconnects", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--reply-words", type=int, default=200)
+    args = parser.parse_args()
+
+    from bench_load import share_runtime
+    from fake_api import FakeAssistantsAPI
+
+    import assistant_runtime.app as app_module
+    from assistant_runtime import MemorySessionBackend, SessionStore, SQLiteSessionBackend
+    from assistant_runtime.transcript import fetch_new_messages
+
+    api = FakeAssistantsAPI(latency=args.latency, run_seconds=0.2, token_delay=0.001,
+                            reply_words=args.reply_words, seed=0)
+    os.environ["OPENAI_BASE_URL"] = api.start()
+    share_runtime()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {"sqlite": SessionStore(SQLiteSessionBackend(os.path.join(tmp, "sessions.db"))),
+                  "memory": SessionStore(MemorySessionBackend())}
+        print(f"chem-helper: reconnect after {args.turns} turns, API latency {args.latency * 1000:.0f} ms")
+        for label, store in stores.items():
+            # The page takes its store from the cached resource; hand it this one instead
+            app_module.get_session_store = lambda store=store: store
+            state = converse(args.turns)
+            api.reset_calls()
+            latencies = []
+            for _ in range(args.reconnects):
+                latency, resumed = reconnect(state["session_token"])
+                latencies.append(latency)
+            assert len(resumed["messages"]) == len(state["messages"]) and resumed["thread"].id == state["thread"].id
+            calls = api.total_calls() / args.reconnects
+            started = time.perf_counter()
+            for _ in range(args.reconnects):
+                store.load(state["session_token"], "chem")
+            load = (time.perf_counter() - started) / args.reconnects
+            print(f"  {label + ' store':14s} load {load * 1000:6.1f} ms   API calls per reconnect {calls:4.1f}   "
+                  f"page load {statistics.mean(latencies) * 1000:6.0f} ms   ({len(resumed['messages'])} messages resumed)")
+
+        from openai import OpenAI
+
+        client = OpenAI(api_key="sk-fake", max_retries=0)
+        api.reset_calls()
+        latencies = []
+        for _ in range(args.reconnects):
+            started = time.perf_counter()
+            client.beta.assistants.retrieve(assistant_id="asst_fake")
+            messages = fetch_new_messages(client, state["thread"].id)
+            latencies.append(time.perf_counter() - started)
+        print(f"  {'API rebuild':14s} load {statistics.mean(latencies) * 1000:6.1f} ms   "
+              f"API calls per reconnect {api.total_calls() / args.reconnects:4.1f}   "
+              f"({len(messages)} messages listed, before rendering the page)")
+    api.stop()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
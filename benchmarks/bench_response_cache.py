@@ -0,0 +1,90 @@
+"""Turn latency of repeated study prompts with the response cache cold and warm.
+
+A class of --students chem-helper sessions (against benchmarks/fake_api.py) each send
+the same mix of /plan and practice-question prompts, phrased slightly differently per
+student. The first student to ask fills the cache; later students are answered from
+it, so the report splits turns into misses and hits. It also times ResponseCache.get
+on the in-memory and SQLite backends directly.
+
+    python benchmarks/bench_response_cache.py
+    python benchmarks/bench_response_cache.py --students 10 --run-seconds 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+
+# Each student picks the variant at their index, so the cache has to match normalised text
+PROMPTS = [
+    ["/plan stoichiometry", "/plan Stoichiometry", "/plan stoichiometry please", "/plan  STOICHIOMETRY!"],
+    ["Give me 5 practice questions on moles", "give me five practice questions on moles, please",
+     "5 practice questions on moles?", "Can you give me 5 practice questions on moles"],
+    ["/plan chemical equilibrium", "/plan Chemical equilibrium.", "please /plan chemical equilibrium",
+     "/plan chemical Equilibrium"],
+]
+
+
+def backend_lookup_us(backend, n=2000):
+    from assistant_runtime.response_cache import ResponseCache
+
+    cache = ResponseCache(backend)
+    cache.put("asst_1", None, PROMPTS[1][0], "x" * 2000)
+    started = time.perf_counter()
+    for i in range(n):
+        cache.get("asst_1", None, PROMPTS[1][i % len(PROMPTS[1])])
+    return (time.perf_counter() - started) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--run-seconds", type=float, default=2.0)
+    parser.add_argument("--reply-words", type=int, default=200)
+    args = parser.parse_args()
+
+    from bench_load import open_page, share_runtime
+    from fake_api import FakeAssistantsAPI
+
+    from assistant_runtime import TRACER, MemoryBackend, SQLiteBackend
+
+    api = FakeAssistantsAPI(latency=args.latency, run_seconds=args.run_seconds, token_delay=0.005,
+                            reply_words=args.reply_words, seed=0)
+    os.environ["OPENAI_BASE_URL"] = api.start()
+    share_runtime()
+
+    misses, hits = [], []
+    for student in range(args.students):
+        at = open_page("chem-helper.py")
+        for variants in PROMPTS:
+            before = dict(TRACER.response_cache._values)
+            started = time.perf_counter()
+            at.chat_input[0].set_value(variants[student % len(variants)]).run()
+            latency = time.perf_counter() - started
+            hit = any(TRACER.response_cache._values.get(k, 0) > before.get(k, 0) for k in [("exact",), ("normalised",)])
+            (hits if hit else misses).append(latency)
+        # The next prompt's rerun makes sure the cached exchanges reached the thread
+        at.run()
+
+    print(f"chem-helper: {args.students} students x {len(PROMPTS)} repeated study prompts")
+    for label, latencies in (("miss (full run)", misses), ("hit (cache)", hits)):
+        if latencies:
+            print(f"  {label:16s} {len(latencies):3d} turns   mean {statistics.mean(latencies) * 1000:7.0f} ms   "
+                  f"max {max(latencies) * 1000:7.0f} ms")
+    print(f"  lookups by result: {dict((k[0], v) for k, v in TRACER.response_cache._values.items())}")
+    print(f"  runs created: {api.calls['POST /threads/{id}/runs']}")
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"  ResponseCache.get  memory {backend_lookup_us(MemoryBackend()):6.1f} us   "
+              f"sqlite {backend_lookup_us(SQLiteBackend(os.path.join(tmp, 'responses.db'))):6.1f} us")
+    api.stop()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Cold-start cost of the apps: import-time breakdown, time to first render and baseline RSS.
+
+Each run starts a fresh interpreter with `-X importtime`, renders the app's first page
+once with Streamlit's AppTest against a local stub of the two Assistants API calls a
+first render makes (retrieve the assistant, warm a thread), and reports:
+
+- the import time of the runtime and of the heaviest top-level packages,
+- the time from interpreter start-up to the end of the first script run,
+- resident memory after that run,
+- which heavy optional dependencies (pandas, boto3, requests, ...) got imported.
+
+None of those should be imported before a visitor uploads, gives feedback or searches;
+`--check` exits non-zero if one is.
+
+    python benchmarks/bench_startup.py --apps base-app.py,chem-helper.py --runs 5 --check
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Only loaded on the code paths that need them: upload, feedback and CORE search.
+# numpy is left out because st.image itself imports it.
+HEAVY = ["pandas", "pyarrow", "openpyxl", "boto3", "botocore", "requests"]
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def serve_stub():
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import threading
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _json(self, body):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            assistant_id = self.path.rstrip("/").split("/")[-1]
+            self._json({"id": assistant_id, "object": "assistant", "created_at": 0, "model": "stub",
+                        "tools": [], "name": "stub", "description": None, "instructions": "", "metadata": {}})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("content-length") or 0))
+            self._json({"id": f"thread_{time.monotonic_ns()}", "object": "thread", "created_at": 0, "metadata": {}})
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return None
+
+
+def child(app):
+    """Render `app` once and print the measurements as JSON (runs in the fresh interpreter)."""
+    server = serve_stub()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=60)
+    at.secrets["OPENAI_API_KEY"] = "sk-bench"
+    at.secrets["OPENAI_ASSISTANT"] = at.secrets["CHEM_HELPER"] = "asst_bench"
+    at.secrets["CORE_API"] = "bench"
+    at.secrets["aws"] = {"aws_access_key_id": "bench", "aws_secret_access_key": "bench"}
+    at.run()
+    first_render = time.perf_counter() - STARTED
+    print(json.dumps({
+        "exception": [str(e.value) for e in at.exception],
+        "first_render": first_render,
+        "rss_kb": rss_kb(),
+        "heavy": [name for name in HEAVY if name in sys.modules],
+    }), flush=True)
+    # Skip interpreter teardown (and the warm-pool threads) so it does not count against the next run
+    os._exit(0)
+
+
+def parse_importtime(stderr):
+    """Cumulative microseconds per top-level package, plus the runtime package itself."""
+    totals = {}
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and not match.group(3):
+            package = match.group(4).split(".")[0]
+            totals[package] = totals.get(package, 0) + int(match.group(2))
+    return totals
+
+
+def measure(app):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", __file__, "--child", app],
+        capture_output=True, text=True, cwd=ROOT, env={**os.environ, "PYTHONWARNINGS": "ignore"},
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode or not lines:
+        raise SystemExit(f"{app} failed to render:\n{result.stderr[-2000:]}")
+    report = json.loads(lines[-1])
+    if report["exception"]:
+        raise SystemExit(f"{app} raised: {report['exception']}")
+    report["imports"] = parse_importtime(result.stderr)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", default="base-app.py,dynamic-app.py,chem-helper.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="heaviest top-level imports to list")
+    parser.add_argument("--check", action="store_true", help="fail if a heavy dependency is imported at start-up")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child)
+
+    failed = False
+    for app in args.apps.split(","):
+        reports = [measure(app) for _ in range(args.runs)]
+        imports = {
+            package: statistics.median(r["imports"].get(package, 0) for r in reports)
+            for package in reports[0]["imports"]
+        }
+        heavy = sorted({name for r in reports for name in r["heavy"]})
+        print(f"== {app} ({args.runs} runs, medians)")
+        print(f"  first render      {statistics.median(r['first_render'] for r in reports) * 1000:8.0f} ms")
+        print(f"  RSS after render  {statistics.median(r['rss_kb'] for r in reports) / 1024:8.1f} MB")
+        print(f"  assistant_runtime {imports.get('assistant_runtime', 0) / 1000:8.1f} ms import")
+        print(f"  heavy imports     {', '.join(heavy) or 'none'}")
+        for package, micros in sorted(imports.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {package:<24} {micros / 1000:8.1f} ms")
+        failed |= bool(heavy)
+
+    if args.check and failed:
+        raise SystemExit("heavy dependencies were imported at start-up")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Render time and payload size of the chat transcript at 10, 100 and 1000 messages.
+
+Renders a synthetic chem-helper transcript (columns plus two feedback buttons per
+message) with the original render-everything loop and with render_transcript, using
+Streamlit's AppTest. Payload is the serialised size of the ForwardMsgs one script
+run sends to the browser.
+
+    python benchmarks/bench_transcript_render.py --sizes 10,100,1000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit.testing.v1.local_script_runner as local_script_runner  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP = '''
+import os
+import sys
+from types import SimpleNamespace
+
+import streamlit as st
+
+sys.path.insert(0, {root!r})
+from assistant_runtime import message_markdown, render_transcript
+
+MODE = {mode!r}
+SIZE = {size}
+
+if "messages" not in st.session_state:
+    text = "**Stoichiometry** works from the balanced equation: $2H_2 + O_2 \\\\rightarrow 2H_2O$. " * 6
+    st.session_state.messages = [
+        SimpleNamespace(
+            id=f"msg_{{i}}",
+            role="user" if i % 2 == 0 else "assistant",
+            content=[SimpleNamespace(type="text", text=SimpleNamespace(value=f"{{i}}: {{text}}"))],
+        )
+        for i in range(SIZE)
+    ]
+
+
+def render_message(message, message_text):
+    with st.chat_message(message.role):
+        with st.container():
+            col1, col2, col3 = st.columns([0.8, 0.1, 0.1])
+            with col1:
+                st.markdown(message_text)
+            with col2:
+                st.button("👍", key=f"up_{{message.id}}")
+            with col3:
+                st.button("👎", key=f"down_{{message.id}}")
+
+
+if MODE == "naive":
+    for message in st.session_state.messages:
+        render_message(message, message.content[0].text.value)
+else:
+    render_transcript(st.session_state.messages, lambda m: render_message(m, message_markdown(m)))
+'''
+
+payloads = []
+_parse_tree = local_script_runner.parse_tree_from_messages
+
+
+def _capture(messages):
+    payloads.append(sum(m.ByteSize() for m in messages))
+    return _parse_tree(messages)
+
+
+local_script_runner.parse_tree_from_messages = _capture
+
+
+def measure(mode, size, reruns):
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+        f.write(APP.format(root=ROOT, mode=mode, size=size))
+    try:
+        at = AppTest.from_file(f.name, default_timeout=120)
+        times = []
+        for _ in range(reruns + 1):
+            payloads.clear()
+            started = time.perf_counter()
+            at.run()
+            times.append(time.perf_counter() - started)
+        assert not at.exception, at.exception
+        # The first run builds the session; reruns are what polling and clicks pay for
+        return statistics.median(times[1:]), payloads[-1]
+    finally:
+        os.remove(f.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--reruns", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'messages':>8} {'mode':>9} {'rerun ms':>9} {'payload KB':>11}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for mode in ("naive", "windowed"):
+            seconds, payload = measure(mode, size, args.reruns)
+            print(f"{size:>8} {mode:>9} {seconds * 1000:>9.1f} {payload / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
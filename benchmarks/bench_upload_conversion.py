@@ -0,0 +1,100 @@
+"""Peak RSS and wall time of the spreadsheet upload conversion for growing CSV sizes.
+
+Compares the streaming JSON Lines conversion in assistant_runtime.uploads with the
+previous whole-file `df.to_json(indent=4)` path. Each measurement runs in a fresh
+subprocess so peak RSS is not shared between runs.
+
+    python benchmarks/bench_upload_conversion.py --sizes 10,100,1000
+"""
+import argparse
+import io
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_csv(path, size_mb):
+    # Mixed numeric/text columns, roughly what students upload from lab sheets
+    target = size_mb * 1024 * 1024
+    rng = random.Random(0)
+    with open(path, "w") as f:
+        f.write("trial,compound,mass_g,volume_ml,temperature_c,notes\n")
+        i = 0
+        while f.tell() < target:
+            rows = []
+            for _ in range(10_000):
+                i += 1
+                rows.append(
+                    f"{i},C{rng.randint(1, 12)}H{rng.randint(1, 24)}O{rng.randint(0, 6)},"
+                    f"{rng.uniform(0, 100):.4f},{rng.uniform(0, 500):.2f},{rng.uniform(-10, 110):.1f},"
+                    f"sample run {rng.randint(0, 999)}\n"
+                )
+            f.write("".join(rows))
+
+
+def convert_streaming(path):
+    from assistant_runtime.uploads import SPOOL_BYTES, convert_spreadsheet
+
+    with open(path, "rb") as source, tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as out:
+        preview, rows = convert_spreadsheet(source, "text/csv", out)
+        return rows, out.tell()
+
+
+def convert_legacy(path):
+    import assistant_runtime.uploads  # noqa: F401 - same imports as the streaming worker
+    import pandas as pd
+
+    with open(path, "rb") as source:
+        df = pd.read_csv(source)
+    json_str = df.to_json(orient='records', indent=4)
+    file_stream = io.BytesIO(json_str.encode())
+    return len(df), len(file_stream.getvalue())
+
+
+def worker(mode, path):
+    convert = convert_streaming if mode == "streaming" else convert_legacy
+    started = time.perf_counter()
+    rows, output_bytes = convert(path)
+    elapsed = time.perf_counter() - started
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{rows} {output_bytes} {elapsed:.3f} {peak_mb:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000", help="comma separated input sizes in MB")
+    parser.add_argument("--modes", default="streaming,legacy")
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(*args.worker)
+        return
+
+    print(f"{'input':>8} {'mode':>10} {'rows':>10} {'output':>10} {'seconds':>8} {'peak RSS':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in [int(s) for s in args.sizes.split(",")]:
+            path = os.path.join(tmp, f"{size_mb}mb.csv")
+            make_csv(path, size_mb)
+            for mode in args.modes.split(","):
+                result = subprocess.run(
+                    [sys.executable, __file__, "--worker", mode, path],
+                    capture_output=True, text=True,
+                )
+                if result.returncode != 0:
+                    print(f"{size_mb:>6}MB {mode:>10} failed: {result.stderr.strip().splitlines()[-1]}")
+                    continue
+                rows, output_bytes, seconds, peak_mb = result.stdout.split()
+                print(f"{size_mb:>6}MB {mode:>10} {rows:>10} {int(output_bytes) // 2**20:>8}MB {seconds:>8} {peak_mb:>7}MB")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,487 @@
+"""Local stand-in for the parts of the OpenAI Assistants API and CORE search the apps use.
+
+Implements assistants.retrieve, threads create/update/delete, messages create/list/delete,
+runs create (streamed or polled)/retrieve/cancel, files.create, chat.completions (the
+search-intent classifier and the compaction summariser) and CORE's /search/{entity} under /core. Latency, 5xx failures,
+429s with Retry-After and failed runs can be injected, and every call is counted. Runs
+can be made to slow down as their thread grows, and report token usage.
+
+Run it standalone and point an app at it:
+
+    python benchmarks/fake_api.py --port 8010 --latency 0.05 --rate-limit 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8010/v1 CORE_API_URL=http://127.0.0.1:8010/core streamlit run dynamic-app.py
+
+or use FakeAssistantsAPI in-process, as bench_load.py does.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# The classifier stub answers like gpt-3.5 does for prompts that ask for literature
+SEARCH_WORDS = re.compile(r"\b(articles?|papers?|sources?|studies|journals?|literature|references?)\b", re.I)
+TOPIC = re.compile(r"\b(?:on|about|regarding|for)\s+(?:the\s+)?(.+?)[?.!]*$", re.I)
+# Path segments that name a resource; every other segment is an id
+RESOURCES = {"assistants", "threads", "messages", "runs", "cancel", "files", "chat", "completions"}
+REPLY = ("Here is a structured answer to your question, with some points to consider "
+         "and a suggestion for what to look at next. ")
+
+
+def object_id(prefix):
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+
+class FakeAssistantsAPI:
+    """In-process HTTP server; `start()` returns the OpenAI base URL, `calls` counts requests per endpoint.
+
+    `latency` (+ up to `jitter`) seconds is added to every OpenAI call. A fraction
+    `failure_rate` of them answer 500 and `rate_limit_rate` answer 429 with a
+    `retry_after` header. With `requests_per_second` set, calls beyond that quota
+    (bursts of up to one second's worth) are also refused with a 429 whose Retry-After
+    is the time until the quota refills, as a real rate limit would. Runs finish
+    `run_seconds` after they are created, plus `context_seconds` per 1000 prompt
+    tokens (about four characters of thread text each), as a model reading the whole
+    thread would; streamed runs emit their reply word by word, `token_delay` apart. A
+    fraction `run_failure_rate` ends as "failed". File uploads take
+    `upload_seconds_per_mb` per MB sent. CORE searches take `core_latency` per OR'd
+    term, plus `core_tail_latency` for a fraction `core_tail_rate` of them.
+    """
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, failure_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1.0, run_seconds=0.5, token_delay=0.01, run_failure_rate=0.0,
+                 core_latency=0.0, reply_words=40, requests_per_second=None, context_seconds=0.0,
+                 upload_seconds_per_mb=0.0, core_tail_rate=0.0, core_tail_latency=0.0, seed=None):
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.run_seconds = run_seconds
+        self.token_delay = token_delay
+        self.run_failure_rate = run_failure_rate
+        self.core_latency = core_latency
+        self.reply_words = reply_words
+        self.requests_per_second = requests_per_second
+        self.context_seconds = context_seconds
+        self.upload_seconds_per_mb = upload_seconds_per_mb
+        self.core_tail_rate = core_tail_rate
+        self.core_tail_latency = core_tail_latency
+        self._quota = requests_per_second or 0
+        self._quota_updated = time.monotonic()
+        self.calls = Counter()
+        # Injected 429/500 responses, by status code
+        self.faults = Counter()
+        self.threads = {}
+        self.runs = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), _handler(self))
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="fake-api").start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    @property
+    def core_url(self):
+        return f"http://127.0.0.1:{self.port}/core"
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+            self.faults.clear()
+
+    def total_calls(self, prefix=""):
+        with self._lock:
+            return sum(n for endpoint, n in self.calls.items() if endpoint.startswith(prefix))
+
+    # -- state helpers, called from the handler threads --
+
+    def _count(self, endpoint):
+        with self._lock:
+            self.calls[endpoint] += 1
+
+    def _roll(self, rate):
+        with self._lock:
+            return self._random.random() < rate
+
+    def _take_quota(self):
+        """None if the call fits the per-second quota, else the seconds until it would."""
+        if not self.requests_per_second:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            self._quota = min(self.requests_per_second,
+                              self._quota + (now - self._quota_updated) * self.requests_per_second)
+            self._quota_updated = now
+            if self._quota >= 1:
+                self._quota -= 1
+                return None
+            return (1 - self._quota) / self.requests_per_second
+
+    def _fault(self, status):
+        with self._lock:
+            self.faults[status] += 1
+
+    def _reply(self):
+        words = (REPLY * (self.reply_words // len(REPLY.split()) + 1)).split()[:self.reply_words]
+        return " ".join(words)
+
+    def _message(self, thread_id, role, text, run_id=None, attachments=None):
+        message = {
+            "id": object_id("msg"), "object": "thread.message", "created_at": int(time.time()),
+            "thread_id": thread_id, "role": role, "status": "completed",
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+            "assistant_id": None, "run_id": run_id, "attachments": attachments or [], "metadata": {},
+        }
+        with self._lock:
+            self.threads.setdefault(thread_id, []).append(message)
+        return message
+
+    def _prompt_tokens(self, thread_id):
+        with self._lock:
+            return sum(len(m["content"][0]["text"]["value"]) // 4 + 1 for m in self.threads.get(thread_id, []))
+
+    def _run_seconds(self, run):
+        return self.run_seconds + run["prompt_tokens"] / 1000 * self.context_seconds
+
+    def _run(self, run):
+        completion_tokens = self.reply_words * 4 // 3
+        return {
+            "id": run["id"], "object": "thread.run", "created_at": int(run["created"]),
+            "thread_id": run["thread_id"], "assistant_id": run["assistant_id"], "status": run["status"],
+            "instructions": "", "model": "fake", "tools": [], "metadata": {}, "parallel_tool_calls": True,
+            # Failed runs fail the way throttled ones do in production
+            "last_error": {"code": "rate_limit_exceeded", "message": "Rate limit reached"} if run["status"] == "failed" else None,
+            "usage": {"prompt_tokens": run["prompt_tokens"], "completion_tokens": completion_tokens,
+                      "total_tokens": run["prompt_tokens"] + completion_tokens} if run["status"] == "completed" else None,
+        }
+
+    def _core_work(self, terms, i):
+        # A single-term query ranks that term's works in order; an OR query mixes the
+        # first term's works with loosely related records and misses the other terms
+        if len(terms) > 1 and i % 2:
+            return {"title": f"Proceedings of a general science meeting, part {i}", "doi": None,
+                    "authors": [{"name": "Various"}], "publishedDate": "2015-01-01",
+                    "sourceFulltextUrls": [], "abstract": "Collected abstracts. " * 5}
+        term, n = terms[0], i // 2 if len(terms) > 1 else i
+        slug = re.sub(r"[^a-z0-9]+", "-", term.lower())
+        return {"title": f"{term.capitalize()}: a review, part {n + 1}", "doi": f"10.5555/{slug}.{n}",
+                "authors": [{"name": "A. Author"}], "publishedDate": "2020-01-01",
+                "sourceFulltextUrls": [f"https://example.org/{slug}/{n}"],
+                "abstract": f"We review {term} for students. " * 3}
+
+    def _advance(self, run):
+        # Polled runs move from queued to in_progress to their outcome as time passes
+        with self._lock:
+            if run["status"] not in ("queued", "in_progress"):
+                return run
+            elapsed = time.monotonic() - run["created_monotonic"]
+            if elapsed < self._run_seconds(run):
+                run["status"] = "in_progress" if elapsed > self._run_seconds(run) / 4 else "queued"
+                return run
+            run["status"] = run["outcome"]
+        if run["status"] == "completed":
+            self._message(run["thread_id"], "assistant", self._reply(), run_id=run["id"])
+        return run
+
+
+def _handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        # -- plumbing --
+
+        def _send(self, status, body, headers=()):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            raw = self.rfile.read(int(self.headers.get("content-length") or 0))
+            if "json" not in (self.headers.get("content-type") or ""):
+                return {}
+            return json.loads(raw or b"{}")
+
+        def _route(self, method):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            body = self._body() if method == "POST" else {}
+
+            if parts[:1] == ["core"]:
+                return self._core(parts, query)
+
+            # Endpoints are counted without ids, e.g. "POST /threads/{id}/runs"
+            endpoint = f"{method} /" + "/".join(p if p in RESOURCES else "{id}" for p in parts[1:])
+            api._count(endpoint)
+
+            time.sleep(api.latency + api._random.random() * api.jitter)
+            wait = api._take_quota()
+            if wait is not None:
+                api._fault(429)
+                return self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                                  [("retry-after-ms", str(int(wait * 1000) + 1))])
+            if api._roll(api.rate_limit_rate):
+                api._fault(429)
+                return self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                                  [("retry-after", str(api.retry_after))])
+            if api._roll(api.failure_rate):
+                api._fault(500)
+                return self._send(500, {"error": {"message": "Injected failure", "type": "server_error"}})
+
+            handler = getattr(self, "_" + "_".join([method.lower()] + [p for p in parts[1:] if p in RESOURCES]), None)
+            if handler is None:
+                return self._send(404, {"error": {"message": f"No fake for {endpoint}"}})
+            return handler(parts[1:], query, body)
+
+        def do_GET(self):
+            self._route("GET")
+
+        def do_POST(self):
+            self._route("POST")
+
+        def do_DELETE(self):
+            self._route("DELETE")
+
+        # -- assistants, threads, messages --
+
+        def _get_assistants(self, parts, query, body):
+            self._send(200, {"id": parts[1], "object": "assistant", "created_at": 0, "model": "fake",
+                             "name": "Fake assistant", "description": None, "instructions": "",
+                             "tools": [], "metadata": {}})
+
+        def _post_threads(self, parts, query, body):
+            if len(parts) == 1:
+                thread_id = object_id("thread")
+                with api._lock:
+                    api.threads[thread_id] = []
+                for message in body.get("messages", []):
+                    api._message(thread_id, message.get("role", "user"), message.get("content", ""))
+            else:
+                thread_id = parts[1]
+            self._send(200, {"id": thread_id, "object": "thread", "created_at": int(time.time()),
+                             "metadata": body.get("metadata", {})})
+
+        def _delete_threads(self, parts, query, body):
+            with api._lock:
+                api.threads.pop(parts[1], None)
+            self._send(200, {"id": parts[1], "object": "thread.deleted", "deleted": True})
+
+        def _post_threads_messages(self, parts, query, body):
+            content = body.get("content")
+            text = content if isinstance(content, str) else json.dumps(content)
+            self._send(200, api._message(parts[1], body.get("role", "user"), text, attachments=body.get("attachments")))
+
+        def _get_threads_messages(self, parts, query, body):
+            with api._lock:
+                messages = list(api.threads.get(parts[1], []))
+            if query.get("order", "desc") == "desc":
+                messages.reverse()
+            if "after" in query:
+                ids = [m["id"] for m in messages]
+                messages = messages[ids.index(query["after"]) + 1:] if query["after"] in ids else []
+            limit = int(query.get("limit", 20))
+            page = messages[:limit]
+            self._send(200, {"object": "list", "data": page, "has_more": len(messages) > limit,
+                             "first_id": page[0]["id"] if page else None,
+                             "last_id": page[-1]["id"] if page else None})
+
+        def _delete_threads_messages(self, parts, query, body):
+            with api._lock:
+                api.threads[parts[1]] = [m for m in api.threads.get(parts[1], []) if m["id"] != parts[3]]
+            self._send(200, {"id": parts[3], "object": "thread.message.deleted", "deleted": True})
+
+        # -- runs --
+
+        def _post_threads_runs(self, parts, query, body):
+            run = {
+                "id": object_id("run"), "thread_id": parts[1], "assistant_id": body.get("assistant_id"),
+                "status": "queued", "created": time.time(), "created_monotonic": time.monotonic(),
+                "outcome": "failed" if api._roll(api.run_failure_rate) else "completed",
+                "prompt_tokens": api._prompt_tokens(parts[1]) + len(body.get("additional_instructions") or "") // 4,
+                "additional_instructions": body.get("additional_instructions"),
+            }
+            with api._lock:
+                api.runs[run["id"]] = run
+            if body.get("stream"):
+                return self._stream(run)
+            self._send(200, api._run(run))
+
+        def _get_threads_runs(self, parts, query, body):
+            if len(parts) == 3:
+                # runs.list, newest first
+                with api._lock:
+                    runs = sorted((run for run in api.runs.values() if run["thread_id"] == parts[1]),
+                                  key=lambda run: run["created"], reverse=True)
+                runs = [api._run(api._advance(run)) for run in runs]
+                page = runs[:int(query.get("limit", 20))]
+                return self._send(200, {"object": "list", "data": page, "has_more": len(runs) > len(page),
+                                        "first_id": page[0]["id"] if page else None,
+                                        "last_id": page[-1]["id"] if page else None})
+            with api._lock:
+                run = api.runs.get(parts[3])
+            if run is None:
+                return self._send(404, {"error": {"message": "No such run"}})
+            self._send(200, api._run(api._advance(run)))
+
+        def _post_threads_runs_cancel(self, parts, query, body):
+            with api._lock:
+                run = api.runs.get(parts[3])
+                if run is None:
+                    return self._send(404, {"error": {"message": "No such run"}})
+                if run["status"] in ("queued", "in_progress"):
+                    run["status"] = "cancelled"
+            self._send(200, api._run(run))
+
+        def _stream(self, run):
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.send_header("connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            def event(name, data):
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode())
+                self.wfile.flush()
+
+            run["status"] = "in_progress"
+            event("thread.run.created", api._run(run))
+            if run["outcome"] == "failed":
+                time.sleep(api._run_seconds(run))
+                run["status"] = "failed"
+                event("thread.run.failed", api._run(run))
+            else:
+                text = api._reply()
+                # The model reads the whole thread before its first token
+                time.sleep(run["prompt_tokens"] / 1000 * api.context_seconds)
+                message_id = object_id("msg")
+                event("thread.message.created", {
+                    "id": message_id, "object": "thread.message", "created_at": int(time.time()),
+                    "thread_id": run["thread_id"], "role": "assistant", "status": "in_progress", "content": [],
+                    "assistant_id": run["assistant_id"], "run_id": run["id"], "attachments": [], "metadata": {},
+                })
+                for i, word in enumerate(text.split(" ")):
+                    time.sleep(api.token_delay)
+                    event("thread.message.delta", {"id": message_id, "object": "thread.message.delta", "delta": {
+                        "content": [{"index": 0, "type": "text", "text": {"value": (" " if i else "") + word}}],
+                    }})
+                message = api._message(run["thread_id"], "assistant", text, run_id=run["id"])
+                event("thread.message.completed", message)
+                run["status"] = "completed"
+                event("thread.run.completed", api._run(run))
+            self.wfile.write(b"event: done\ndata: [DONE]\n\n")
+            self.wfile.flush()
+
+        # -- files and chat completions --
+
+        def _post_files(self, parts, query, body):
+            size = int(self.headers.get("content-length") or 0)
+            # Uploads take time in proportion to their size, as ingestion does on the real API
+            time.sleep(size / 1024 / 1024 * api.upload_seconds_per_mb)
+            self._send(200, {"id": object_id("file"), "object": "file", "bytes": size,
+                             "created_at": int(time.time()), "filename": "converted.jsonl",
+                             "purpose": "assistants", "status": "processed"})
+
+        def _post_chat_completions(self, parts, query, body):
+            prompt = next((m["content"] for m in reversed(body.get("messages", [])) if m["role"] == "user"), "")
+            system = next((m["content"] for m in body.get("messages", []) if m["role"] == "system"), "")
+            topic = TOPIC.search(prompt)
+            if "summary" in system.lower():
+                # Summaries cost time in proportion to what they read, like a run does
+                time.sleep((len(prompt) // 4) / 1000 * api.context_seconds)
+                content = " ".join(REPLY.split() * 5)
+            elif SEARCH_WORDS.search(prompt) and topic:
+                # "x and y" topics come back as one term each, as gpt-3.5 tends to list them
+                terms = "\n".join(f"- {term}" for term in re.split(r"\s+and\s+|,\s*", topic.group(1)) if term)
+                content = f"This is a search query. The key search terms are:\n{terms}"
+            else:
+                content = "This is not a search query; it is a general support question."
+            self._send(200, {"id": object_id("chatcmpl"), "object": "chat.completion", "created": int(time.time()),
+                             "model": body.get("model", "fake"), "choices": [{
+                                 "index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content},
+                             }]})
+
+        # -- CORE --
+
+        def _core(self, parts, query):
+            api._count("GET /core/search")
+            terms = [term.strip() for term in re.split(r"\s+OR\s+", query.get("q", "")) if term.strip()] or [""]
+            # Broad OR queries cost CORE more, and now and then a query lands on a slow shard
+            delay = api.core_latency * len(terms)
+            if api._roll(api.core_tail_rate):
+                delay += api.core_tail_latency
+            time.sleep(delay)
+            limit, offset = int(query.get("limit", 10)), int(query.get("offset", 0))
+            results = [api._core_work(terms, i) for i in range(offset, offset + limit)]
+            self._send(200, {"totalHits": 1000, "results": results})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--run-seconds", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--run-failure-rate", type=float, default=0.0)
+    parser.add_argument("--core-latency", type=float, default=0.0)
+    parser.add_argument("--rps", type=float, default=None, help="requests per second before the fake answers 429")
+    parser.add_argument("--context-seconds", type=float, default=0.0, help="extra run seconds per 1000 prompt tokens")
+    parser.add_argument("--upload-seconds-per-mb", type=float, default=0.0)
+    parser.add_argument("--core-tail-rate", type=float, default=0.0)
+    parser.add_argument("--core-tail-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    api = FakeAssistantsAPI(
+        port=args.port, latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+        rate_limit_rate=args.rate_limit, retry_after=args.retry_after, run_seconds=args.run_seconds,
+        token_delay=args.token_delay, run_failure_rate=args.run_failure_rate, core_latency=args.core_latency,
+        requests_per_second=args.rps, context_seconds=args.context_seconds,
+        upload_seconds_per_mb=args.upload_seconds_per_mb, core_tail_rate=args.core_tail_rate,
+        core_tail_latency=args.core_tail_latency,
+    )
+    api.start()
+    print(f"OPENAI_BASE_URL={api.base_url} CORE_API_URL={api.core_url}")
+    try:
+        while True:
+            time.sleep(60)
+            print(dict(api.calls))
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
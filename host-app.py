@@ -0,0 +1,8 @@
+ # One Streamlit server for every assistant: the pages share OpenAI/CORE clients, caches and the run executor
+import streamlit as st
+
+st.navigation([
+    st.Page("base-app.py", title="Assistant Playground"),
+    st.Page("dynamic-app.py", title="EE Companion Tool"),
+    st.Page("chem-helper.py", title="Queen of Science"),
+]).run()
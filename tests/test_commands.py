@@ -0,0 +1,65 @@
+from assistant_runtime.commands import RUN_TEMPLATES, parse_settings, route_command, run_instructions
+
+
+def test_parse_settings_resolves_aliases_and_keeps_unknown_parts():
+    settings, unknown = parse_settings("level: university, tone=friendly; Language: English, colour: blue, whatever")
+    assert settings == {"depth": "university", "tone style": "friendly", "language": "English"}
+    assert unknown == ["colour: blue", "whatever"]
+
+
+def test_config_without_arguments_shows_the_settings():
+    command = route_command("/config", {"depth": "Graduate"})
+    assert command.name == "config" and command.instructions is None and not command.cacheable
+    assert "Graduate" in command.reply
+    assert command.settings == {"depth": "Graduate"}
+
+
+def test_config_updates_the_settings():
+    command = route_command("/config depth: Undergraduate, emoji: off", {"depth": "Graduate", "language": "English"})
+    assert command.settings == {"depth": "Undergraduate", "emojis": "off", "language": "English"}
+    assert command.reply.startswith("Settings updated")
+
+
+def test_config_reports_what_it_did_not_recognise():
+    command = route_command("/config depth: Graduate, mood: sunny")
+    assert command.settings == {"depth": "Graduate"}
+    assert "mood: sunny" in command.reply
+
+
+def test_config_reset():
+    assert route_command("/config reset", {"depth": "Graduate"}).settings == {}
+
+
+def test_free_text_config_goes_to_the_assistant():
+    assert route_command("/config make it simpler") is None
+
+
+def test_help():
+    command = route_command("/HELP")
+    assert command.name == "help" and "/plan" in command.reply
+
+
+def test_plan_runs_with_its_template():
+    command = route_command("/plan stoichiometry", {"depth": "Graduate"})
+    assert command.reply is None
+    assert command.instructions == RUN_TEMPLATES["plan"].instructions
+    assert command.cacheable
+    assert command.settings == {"depth": "Graduate"}
+
+
+def test_plan_without_a_topic_shows_its_usage():
+    command = route_command("/plan")
+    assert command.reply == "Usage: `/plan <topic>`" and not command.cacheable
+
+
+def test_other_prompts_are_not_routed():
+    assert route_command("What is a mole?") is None
+    assert route_command("/quiz acids") is None
+
+
+def test_run_instructions():
+    assert run_instructions({}) is None
+    instructions = run_instructions({"language": "English", "depth": "Graduate"}, "Make a plan.")
+    assert instructions.startswith("The student's /config settings")
+    assert "Depth: Graduate; Language: English" in instructions
+    assert instructions.endswith("\n\nMake a plan.")
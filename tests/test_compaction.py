@@ -0,0 +1,136 @@
+import itertools
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+from openai.types.beta.threads import Message
+
+from assistant_runtime.commands import local_message
+from assistant_runtime.compaction import (
+    MEMORY_HEADER,
+    catch_up,
+    compact_thread,
+    estimate_tokens,
+    keep_tokens,
+    message_text,
+    thread_start,
+)
+
+_ids = itertools.count()
+
+
+def message(thread_id, role, text):
+    return Message.model_construct(
+        id=f"msg_{next(_ids)}", object="thread.message", created_at=0, thread_id=thread_id, role=role,
+        status="completed", content=[{"type": "text", "text": {"value": text, "annotations": []}}],
+        attachments=None, metadata={},
+    )
+
+
+class Page(list):
+    @property
+    def data(self):
+        return list(self)
+
+
+class FakeClient:
+    """Just the Assistants and chat calls compaction makes, on in-memory threads."""
+
+    def __init__(self):
+        self.threads = {}
+        self.summaries = []
+        self.beta = SimpleNamespace(threads=SimpleNamespace(create=self._create_thread, messages=SimpleNamespace(
+            list=self._list_messages, create=self._create_message)))
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._summarise))
+
+    def thread(self, turns, words=50):
+        thread_id = f"thread_{next(_ids)}"
+        self.threads[thread_id] = []
+        for i in range(turns):
+            self._create_message(thread_id, "user", f"question {i} " + "word " * 5)
+            self._create_message(thread_id, "assistant", f"answer {i} " + "word " * words)
+        return thread_id
+
+    def _create_thread(self, messages, metadata, tool_resources=None):
+        thread_id = f"thread_{next(_ids)}"
+        self.threads[thread_id] = [message(thread_id, m["role"], m["content"]) for m in messages]
+        return SimpleNamespace(id=thread_id)
+
+    def _create_message(self, thread_id, role, content, attachments=None):
+        created = message(thread_id, role, content)
+        self.threads[thread_id].append(created)
+        return created
+
+    def _list_messages(self, thread_id, order="asc", limit=100, after=None):
+        messages = self.threads[thread_id]
+        if after:
+            messages = messages[[m.id for m in messages].index(after) + 1:]
+        return Page((messages if order == "asc" else messages[::-1])[:limit])
+
+    def _summarise(self, model, messages, max_tokens):
+        self.summaries.append(messages[1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"summary {len(self.summaries)}"))])
+
+
+def done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_copied_tail_fits_the_token_budget_and_starts_on_a_question():
+    client = FakeClient()
+    old = client.thread(10)
+    messages = client.threads[old]
+    keep = 200
+    compaction = compact_thread(client, "session", old, messages[:14], after=messages[13].id, keep=keep)
+
+    new = client.threads[compaction.thread.id]
+    assert message_text(new[0]).startswith(MEMORY_HEADER) and "summary 1" in message_text(new[0])
+    copied = new[1:]
+    assert copied[0].role == "user"
+    assert sum(estimate_tokens(message_text(m)) for m in copied) <= keep
+    assert [message_text(m) for m in copied] == [message_text(m) for m in messages[-compaction.kept:]]
+    # Messages the session had not seen yet were fetched and summarised or copied too
+    assert "answer 9" in message_text(copied[-1])
+    assert "question 0" in client.summaries[0] and "answer 9" not in client.summaries[0]
+    assert compaction.last_message_id == copied[-1].id
+    assert compaction.source_message_id == messages[-1].id
+
+
+def test_memory_accumulates_across_compactions():
+    client = FakeClient()
+    old = client.thread(6)
+    compaction = compact_thread(client, "session", old, client.threads[old], memory="earlier notes", keep=0)
+    assert compaction.kept == 0 and "earlier notes" in client.summaries[0]
+
+
+def test_keep_tokens_leaves_room_for_the_memory():
+    assert keep_tokens(8000) == 4000 - 600
+    assert keep_tokens(1000) == 0
+
+
+def test_catch_up_copies_what_reached_the_old_thread_since():
+    client = FakeClient()
+    old = client.thread(6)
+    compaction = compact_thread(client, "session", old, client.threads[old], keep=100)
+    client._create_message(old, "user", "a later question")
+    client._create_message(old, "assistant", "a later answer")
+
+    caught_up = catch_up(client, done(compaction), old)
+    new = client.threads[compaction.thread.id]
+    assert [message_text(m) for m in new[-2:]] == ["a later question", "a later answer"]
+    assert caught_up.kept == compaction.kept + 2
+    assert caught_up.last_message_id == new[-1].id
+    assert caught_up.source_message_id == client.threads[old][-1].id
+    # Nothing new: unchanged
+    assert catch_up(client, done(caught_up), old) == caught_up
+
+
+def test_thread_start_skips_session_only_messages():
+    thread_messages = [message("t", role, text) for role, text in [("user", "q1"), ("assistant", "a1"),
+                                                                   ("user", "q2"), ("assistant", "a2")]]
+    transcript = thread_messages[:3] + [local_message("user", "/config depth: Graduate"),
+                                        local_message("assistant", "Settings updated.")] + thread_messages[3:]
+    # The last two thread messages (q2, a2) were copied; the local /config exchange sits between them
+    assert transcript[thread_start(transcript, 2)] is thread_messages[2]
+    assert thread_start(transcript, 0) == len(transcript)
@@ -0,0 +1,43 @@
+from assistant_runtime.core import article_key, fan_out_queries, rank_articles, split_terms
+
+
+def test_split_terms():
+    assert split_terms('"photosynthesis" OR light reactions OR photosynthesis OR ') == ["photosynthesis", "light reactions"]
+    assert split_terms("enzymes") == ["enzymes"]
+    assert split_terms(None) == []
+
+
+def test_fan_out_queries():
+    assert fan_out_queries(["a"]) == ["a"]
+    assert fan_out_queries(["a", "b"]) == ["a", "b", "a OR b"]
+
+
+def test_article_key_prefers_the_doi():
+    assert article_key({"doi": "https://doi.org/10.1/ABC", "title": "x"}) == "doi:10.1/abc"
+    assert article_key({"title": "Enzyme Kinetics: a Review"}) == "title:enzymekineticsareview"
+
+
+def test_rank_articles_merges_duplicates():
+    shared = {"doi": "10.1/shared", "title": "Enzyme kinetics"}
+    results = {
+        "enzymes": [dict(shared), {"title": "Enzymes in industry"}],
+        "enzymes OR kinetics": [{"doi": "https://doi.org/10.1/SHARED", "title": "Enzyme kinetics (preprint)"}],
+    }
+    ranked = rank_articles(results, ["enzymes", "kinetics"], 10)
+    assert len(ranked) == 2
+    assert ranked[0]["doi"] == "10.1/shared"
+
+
+def test_rank_articles_gives_every_term_a_turn():
+    results = {
+        "acids": [{"title": f"Acids and bases part {i}"} for i in range(5)],
+        "redox": [{"title": "Redox reactions"}],
+    }
+    ranked = rank_articles(results, ["acids", "redox"], 2)
+    assert {article["title"] for article in ranked} == {"Acids and bases part 0", "Redox reactions"}
+
+
+def test_rank_articles_puts_unmatched_records_last():
+    results = {"titration": [{"title": "Unrelated survey"}, {"title": "Titration curves"}]}
+    ranked = rank_articles(results, ["titration"], 5)
+    assert [article["title"] for article in ranked] == ["Titration curves", "Unrelated survey"]
@@ -0,0 +1,99 @@
+import threading
+from types import SimpleNamespace
+
+from assistant_runtime.executor import RunExecutor
+
+
+def run(run_id, status, thread_id="thread_1"):
+    return SimpleNamespace(id=run_id, thread_id=thread_id, status=status)
+
+
+class FakeRuns:
+    """runs.retrieve walking each run through a scripted list of statuses (or exceptions)."""
+
+    def __init__(self, scripts):
+        self.scripts = {run_id: list(statuses) for run_id, statuses in scripts.items()}
+        self.retrieved = []
+        self._lock = threading.Lock()
+
+    def retrieve(self, thread_id, run_id):
+        with self._lock:
+            self.retrieved.append(run_id)
+            status = self.scripts[run_id].pop(0) if len(self.scripts[run_id]) > 1 else self.scripts[run_id][0]
+        if isinstance(status, Exception):
+            raise status
+        return run(run_id, status, thread_id)
+
+
+def client(scripts):
+    runs = FakeRuns(scripts)
+    return SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(runs=runs))), runs
+
+
+def executor(**kwargs):
+    return RunExecutor(max_workers=2, min_interval=0.01, max_interval=0.05, **kwargs)
+
+
+def test_runs_are_polled_until_they_finish():
+    fake, runs = client({"run_1": ["in_progress", "in_progress", "completed"]})
+    handle = executor().submit(fake, "s1", run("run_1", "queued"))
+    assert handle.wait(5)
+    assert handle.status == "completed" and handle.polls == 3
+    assert runs.retrieved == ["run_1"] * 3
+
+
+def test_terminal_runs_finish_without_polling():
+    fake, runs = client({})
+    handle = executor().submit(fake, "s1", run("run_1", "requires_action"))
+    assert handle.done() and handle.polls == 0
+    assert runs.retrieved == []
+
+
+def test_callbacks_run_once_the_run_is_done():
+    fake, _ = client({"run_1": ["in_progress", "completed"]})
+    finished = []
+    called = threading.Event()
+    handle = RunExecutor(min_interval=0.2).submit(fake, "s1", run("run_1", "queued"))
+    handle.add_done_callback(lambda h: (finished.append(("early", h.status)), called.set()))
+    assert called.wait(5)
+    handle.add_done_callback(lambda h: finished.append(("late", h.status)))
+    assert finished == [("early", "completed"), ("late", "completed")]
+
+
+def test_a_failing_callback_does_not_stop_the_others():
+    fake, _ = client({"run_1": ["completed"]})
+    called = threading.Event()
+    handle = RunExecutor(min_interval=0.2).submit(fake, "s1", run("run_1", "queued"))
+    handle.add_done_callback(lambda h: 1 / 0)
+    handle.add_done_callback(lambda h: called.set())
+    assert called.wait(5)
+
+
+def test_poll_errors_are_retried_then_given_up():
+    fake, _ = client({"run_1": [OSError("timeout"), "completed"], "run_2": [OSError("down")]})
+    runs = executor(max_errors=3)
+    recovered = runs.submit(fake, "s1", run("run_1", "queued"))
+    failed = runs.submit(fake, "s2", run("run_2", "queued"))
+    assert recovered.wait(5) and failed.wait(5)
+    assert recovered.status == "completed" and recovered.errors == 0
+    assert failed.status == "queued" and failed.errors == 3 and isinstance(failed.error, OSError)
+
+
+def test_intervals_back_off_to_the_maximum():
+    fake, _ = client({"run_1": ["in_progress"] * 6 + ["completed"]})
+    runs = RunExecutor(max_workers=1, min_interval=0.01, max_interval=0.02, backoff=2)
+    handle = runs.submit(fake, "s1", run("run_1", "queued"))
+    assert handle.wait(5)
+    assert handle.interval == 0.02
+
+
+def test_stats_count_in_flight_runs_and_sessions():
+    fake, _ = client({"run_1": ["in_progress"], "run_2": ["in_progress"], "run_3": ["completed"]})
+    runs = executor()
+    handles = [runs.submit(fake, session, run(run_id, "queued"))
+               for session, run_id in [("s1", "run_1"), ("s1", "run_2"), ("s2", "run_3")]]
+    assert handles[2].wait(5)
+    stats = runs.stats()
+    assert stats["in_flight_runs"] == 2 and stats["sessions"] == 1
+    assert stats["completed_runs"] == 1 and stats["workers"] == 2
+    assert stats["retrieve_latency"] is not None and stats["run_capacity"] > 0
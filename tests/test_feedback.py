@@ -0,0 +1,109 @@
+import os
+import time
+
+from assistant_runtime.feedback import CLAIM_MARKER, CLAIM_TIMEOUT, FeedbackWriter, FileBackend, decode_batch
+
+
+class FailingBackend:
+    def put(self, key, body):
+        raise OSError("backend down")
+
+
+def event(n):
+    return {'event_id': str(n), 'feedback': 'up'}
+
+
+def stored_events(backend):
+    keys = sorted(backend.list("feedback/batches"))
+    return keys, [e['event_id'] for key in keys for e in decode_batch(backend.get(key))]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_full_batches_are_written_and_the_rest_flushed_on_close(tmp_path):
+    backend = FileBackend(str(tmp_path / "store"))
+    writer = FeedbackWriter(backend, batch_size=3, flush_interval=60, spool_dir=str(tmp_path / "spool"))
+    for n in range(7):
+        writer.submit(event(n))
+    assert wait_for(lambda: writer.batches_written == 2)
+    writer.close()
+
+    keys, ids = stored_events(backend)
+    assert len(keys) == 3 and writer.batches_written == 3
+    assert sorted(ids) == [str(n) for n in range(7)]
+    assert all(key.endswith(".jsonl.gz") and "/dt=" in key for key in keys)
+
+
+def test_partial_batch_is_flushed_after_the_interval(tmp_path):
+    backend = FileBackend(str(tmp_path / "store"))
+    writer = FeedbackWriter(backend, batch_size=100, flush_interval=0.2, spool_dir=str(tmp_path / "spool"))
+    writer.submit(event(1))
+    assert wait_for(lambda: writer.batches_written == 1)
+    writer.close()
+    assert stored_events(backend)[1] == ["1"]
+
+
+def test_failed_batches_are_spooled_and_resent_by_the_next_writer(tmp_path):
+    spool = str(tmp_path / "spool")
+    failing = FeedbackWriter(FailingBackend(), batch_size=2, flush_interval=60, max_retries=0, spool_dir=spool)
+    for n in range(3):
+        failing.submit(event(n))
+    assert wait_for(lambda: os.path.isdir(spool) and os.listdir(spool))
+    failing.close()
+    assert failing.batches_written == 0
+    spooled = os.listdir(spool)
+    assert len(spooled) == 2 and not any(name.endswith(".tmp") for name in spooled)
+
+    backend = FileBackend(str(tmp_path / "store"))
+    writer = FeedbackWriter(backend, spool_dir=spool)
+    assert wait_for(lambda: not os.listdir(spool))
+    writer.close()
+    keys, ids = stored_events(backend)
+    assert sorted(ids) == ["0", "1", "2"]
+    assert sorted(key.replace("/", "__") for key in keys) == sorted(spooled)
+
+
+def test_failed_resend_hands_the_batch_back(tmp_path):
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    (spool / "feedback__batches__b1.jsonl.gz").write_bytes(b"body")
+    writer = FeedbackWriter(FailingBackend(), spool_dir=str(spool))
+    writer.close()
+    assert os.listdir(spool) == ["feedback__batches__b1.jsonl.gz"]
+
+
+def test_a_batch_is_claimed_by_one_writer_only(tmp_path):
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    writer = FeedbackWriter(FileBackend(str(tmp_path / "store")), spool_dir=str(spool))
+    other = FeedbackWriter(FileBackend(str(tmp_path / "store")), spool_dir=str(spool))
+    writer.close()
+    other.close()
+    (spool / "b1.jsonl.gz").write_bytes(b"body")
+    (spool / "b2.jsonl.gz.tmp").write_bytes(b"half")
+
+    claimed = writer._claim("b1.jsonl.gz")
+    assert os.path.basename(claimed).startswith("b1.jsonl.gz" + CLAIM_MARKER)
+    assert other._claim("b1.jsonl.gz") is None
+    assert other._claim(os.path.basename(claimed)) is None
+    assert writer._claim("b2.jsonl.gz.tmp") is None
+
+
+def test_abandoned_claims_are_taken_over(tmp_path):
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    abandoned = spool / f"b1.jsonl.gz{CLAIM_MARKER}1-dead"
+    abandoned.write_bytes(b"body")
+    stale = time.time() - CLAIM_TIMEOUT - 1
+    os.utime(abandoned, (stale, stale))
+
+    backend = FileBackend(str(tmp_path / "store"))
+    writer = FeedbackWriter(backend, spool_dir=str(spool))
+    assert wait_for(lambda: not os.listdir(spool))
+    writer.close()
+    assert backend.get("b1.jsonl.gz") == b"body"
@@ -0,0 +1,28 @@
+import pytest
+
+from assistant_runtime.intent import extract_topic, local_is_search_query
+
+
+@pytest.mark.parametrize("prompt", [
+    "search for climate change and coral reefs",
+    "look up research on deforestation in the Amazon",
+    "Can you find me some peer reviewed work on microplastics?",
+    "I want references about the French revolution",
+    "Hi!",
+])
+def test_prompts_without_evidence_are_deferred(prompt):
+    assert local_is_search_query(prompt) == (None, None)
+
+
+def test_search_without_a_topic_is_deferred():
+    assert extract_topic("give me sources") is None
+    assert local_is_search_query("Give me some sources please") == (None, None)
+
+
+def test_clear_searches_are_settled_with_their_topic():
+    assert local_is_search_query("Find me articles about climate change impact on coral reefs") == (
+        True, "climate change impact on coral reefs")
+
+
+def test_clear_support_questions_are_settled():
+    assert local_is_search_query("How do I cite a journal article in MLA format?") == (False, None)
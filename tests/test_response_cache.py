@@ -0,0 +1,31 @@
+from assistant_runtime.response_cache import cache_key, is_stateless, normalise
+
+
+def test_normalise_drops_case_punctuation_and_filler():
+    assert normalise("Can you PLEASE give me five practice questions on Moles?!") == "5 practice questions on moles"
+    assert normalise("five practice questions on moles") == normalise("Give me 5 practice questions on moles, thanks")
+
+
+def test_normalise_keeps_slash_commands():
+    assert normalise("/plan Stoichiometry.") == "/plan stoichiometry"
+
+
+def test_stateless_prompts():
+    assert is_stateless("/plan stoichiometry")
+    assert is_stateless("Could you write 3 practice questions about redox?")
+    assert is_stateless("quiz questions for organic chemistry")
+
+
+def test_prompts_that_depend_on_the_conversation_are_not_stateless():
+    assert not is_stateless("What is a mole?")
+    assert not is_stateless("Give me more practice questions on this")
+    assert not is_stateless("practice questions on my essay")
+    assert not is_stateless("plan stoichiometry")
+
+
+def test_cache_key_depends_on_assistant_settings_and_text():
+    key = cache_key("asst_1", "Depth: Graduate", "/plan redox")
+    assert key == cache_key("asst_1", "Depth: Graduate", "/plan redox")
+    assert key != cache_key("asst_2", "Depth: Graduate", "/plan redox")
+    assert key != cache_key("asst_1", None, "/plan redox")
+    assert key != cache_key("asst_1", "Depth: Graduate", "/plan acids")
@@ -0,0 +1,115 @@
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+
+from assistant_runtime.scheduler import (BACKGROUND, INTERACTIVE, RequestScheduler, TokenBucket, endpoint_class,
+                                         parse_duration, parse_limits, retry_after)
+
+
+def drained(cls="runs", rate=20, burst=2, **options):
+    # A scheduler whose `cls` bucket has just been emptied
+    scheduler = RequestScheduler(limits={cls: (rate, burst)}, **options)
+    for _ in range(burst):
+        scheduler.acquire(cls, INTERACTIVE)
+    return scheduler
+
+
+def test_token_bucket_refills_up_to_its_burst():
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.tokens = 0
+    bucket.refill(bucket.updated + 0.2)
+    assert bucket.tokens == pytest.approx(2)
+    bucket.refill(bucket.updated + 10)
+    assert bucket.tokens == 5
+
+
+def test_endpoint_class():
+    assert endpoint_class("POST", "/threads/thread_1/runs") == "runs"
+    assert endpoint_class("GET", "/threads/thread_1/runs/run_1") == "poll"
+    assert endpoint_class("POST", "/threads/thread_1/messages") == "messages"
+    assert endpoint_class("GET", "/threads/thread_1/messages") == "message_reads"
+    assert endpoint_class("POST", "/threads") == "threads"
+    assert endpoint_class("POST", "/files") == "files"
+    assert endpoint_class("POST", "/chat/completions") == "chat"
+    assert endpoint_class("GET", "/assistants/asst_1") == "other"
+
+
+def test_parse_limits():
+    assert parse_limits("runs=50:100, files=5") == {"runs": (50.0, 100.0), "files": (5.0, 10.0)}
+    assert parse_limits({"poll": [30, 45], "chat": 4}) == {"poll": (30.0, 45.0), "chat": (4.0, 8.0)}
+    assert parse_limits("") == {}
+
+
+def test_parse_duration():
+    assert parse_duration("1s") == 1
+    assert parse_duration("250ms") == 0.25
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("soon") is None
+
+
+def test_retry_after():
+    assert retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+    assert retry_after({"retry-after": "2"}) == 2
+    assert retry_after({"retry-after": formatdate(time.time() + 30, usegmt=True)}) == pytest.approx(30, abs=2)
+    assert retry_after({"retry-after": "whenever"}) is None
+    assert retry_after({}) is None
+
+
+def test_acquire_is_immediate_within_the_burst():
+    scheduler = RequestScheduler(limits={"runs": (1, 3)})
+    assert sum(scheduler.acquire("runs") for _ in range(3)) < 0.05
+
+
+def test_waiters_are_served_in_priority_order():
+    scheduler = drained(reserve=0)
+    order = []
+
+    def request(level, name):
+        scheduler.acquire("runs", level)
+        order.append(name)
+
+    background = threading.Thread(target=request, args=(BACKGROUND, "background"))
+    background.start()
+    time.sleep(0.01)
+    interactive = threading.Thread(target=request, args=(INTERACTIVE, "interactive"))
+    interactive.start()
+    background.join(5)
+    interactive.join(5)
+    assert order == ["interactive", "background"]
+
+
+def test_background_leaves_the_reserve_for_interactive_requests():
+    scheduler = RequestScheduler(limits={"runs": (1, 4)}, reserve=0.5)
+    scheduler.acquire("runs", BACKGROUND)
+    scheduler.acquire("runs", BACKGROUND)
+    # Two tokens left, and background work needs one plus half the burst
+    assert scheduler.acquire("runs", INTERACTIVE) < 0.05
+    assert scheduler.acquire("runs", BACKGROUND) > 0.5
+
+
+def test_retry_after_closes_the_class():
+    scheduler = RequestScheduler(limits={"runs": (100, 10)})
+    scheduler.observe("runs", 429, {"retry-after-ms": "300"})
+    assert scheduler.acquire("runs") >= 0.25
+    # Other classes are not held up
+    assert scheduler.acquire("poll") < 0.05
+
+
+def test_throttles_cut_the_rate_and_successes_restore_it():
+    scheduler = RequestScheduler(limits={"runs": (10, 10)}, decrease=0.5, recovery=0.25)
+    scheduler.throttled("runs", 0)
+    assert scheduler.stats()["runs"]["rate"] == 5
+    scheduler.observe("runs", 200, {})
+    assert scheduler.stats()["runs"]["rate"] == 7.5
+    scheduler.observe("runs", 200, {})
+    scheduler.observe("runs", 200, {})
+    assert scheduler.stats()["runs"]["rate"] == 10
+
+
+def test_exhausted_quota_header_closes_the_class_until_reset():
+    scheduler = RequestScheduler(limits={"messages": (100, 10)})
+    scheduler.observe("messages", 200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "200ms"})
+    assert scheduler.stats()["messages"]["cooldown"] > 0
+    assert scheduler.acquire("messages") >= 0.15
@@ -0,0 +1,122 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from openai.types.beta.threads import Message
+
+from assistant_runtime.compaction import message_text
+from assistant_runtime.sessions import MemorySessionBackend, SessionStore, SQLiteSessionBackend, session_key
+
+_ids = itertools.count()
+
+
+def message(role, text):
+    return Message.model_construct(
+        id=f"msg_{next(_ids)}", object="thread.message", created_at=0, thread_id="thread_1", role=role,
+        status="completed", content=[{"type": "text", "text": {"value": text, "annotations": []}}],
+        attachments=None, metadata={},
+    )
+
+
+class State(dict):
+    """Like st.session_state: a mapping whose entries are also attributes."""
+
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+class CountingBackend:
+    def __init__(self, backend):
+        self.backend = backend
+        self.saves = []
+
+    def save(self, key, data, messages, start):
+        self.saves.append((len(messages), start))
+        self.backend.save(key, data, messages, start)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return CountingBackend(MemorySessionBackend())
+    return CountingBackend(SQLiteSessionBackend(str(tmp_path / "sessions.db")))
+
+
+def session(messages):
+    return State(thread=SimpleNamespace(id="thread_1"), assistant=SimpleNamespace(id="asst_1"),
+                 run={"status": None}, session_id="s1", turn=len(messages), messages=messages)
+
+
+def transcript(store, token="tok"):
+    return [message_text(m) for m in store.load(token, "app")["messages"]]
+
+
+def test_unchanged_sessions_are_not_saved_again(backend):
+    store = SessionStore(backend)
+    state = session([message("user", "hi"), message("assistant", "hello")])
+    assert store.save("tok", "app", state)
+    assert not store.save("tok", "app", state)
+    assert backend.saves == [(2, 0)]
+
+
+def test_saves_append_only_new_messages(backend):
+    store = SessionStore(backend)
+    state = session([message("user", "hi"), message("assistant", "hello")])
+    store.save("tok", "app", state)
+    state.messages = state.messages + [message("user", "more")]
+    state.turn = 3
+    assert store.save("tok", "app", state)
+    assert backend.saves == [(2, 0), (1, 2)]
+    assert transcript(store) == ["hi", "hello", "more"]
+
+
+def test_settings_changes_are_saved_without_rewriting_the_transcript(backend):
+    store = SessionStore(backend)
+    state = session([message("user", "hi")])
+    store.save("tok", "app", state)
+    state.settings = {"tone": "formal"}
+    assert store.save("tok", "app", state)
+    assert backend.saves == [(1, 0), (0, 1)]
+    assert store.load("tok", "app")["settings"] == {"tone": "formal"}
+
+
+def test_a_new_thread_rewrites_the_transcript(backend):
+    store = SessionStore(backend)
+    state = session([message("user", "hi"), message("assistant", "hello")])
+    store.save("tok", "app", state)
+    state.messages = [message("user", "fresh start")]
+    assert store.save("tok", "app", state)
+    assert backend.saves[-1] == (1, 0)
+    assert transcript(store) == ["fresh start"]
+
+
+def test_a_restored_session_continues_incrementally(backend):
+    store = SessionStore(backend)
+    store.save("tok", "app", session([message("user", "hi"), message("assistant", "hello")]))
+    restored = State(store.load("tok", "app"))
+    restored.assistant = SimpleNamespace(id=restored.pop("assistant_id"))
+    assert restored.thread.id == "thread_1"
+    assert not store.save("tok", "app", restored)
+    restored.messages = restored.messages + [message("user", "again")]
+    assert store.save("tok", "app", restored)
+    assert backend.saves[-1] == (1, 2)
+    assert transcript(store) == ["hi", "hello", "again"]
+
+
+def test_sessions_are_separate_per_token_and_app(backend):
+    store = SessionStore(backend)
+    store.save("tok", "app", session([message("user", "hi")]))
+    assert store.load("other", "app") is None
+    assert store.load("tok", "other-app") is None
+
+
+def test_expired_sessions_are_dropped(backend):
+    store = SessionStore(backend, ttl=60)
+    store.save("tok", "app", session([message("user", "hi")]))
+    assert store.load("tok", "app") is not None
+    store.ttl = -1
+    assert store.load("tok", "app") is None
+    assert backend.load(session_key("tok", "app")) is None
@@ -0,0 +1,109 @@
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+from assistant_runtime.threads import WarmThreadPool
+
+
+class FakeThreads:
+    def __init__(self):
+        self.created = []
+        self.updated = {}
+        self.deleted = []
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def create(self, metadata):
+        with self._lock:
+            thread = SimpleNamespace(id=f"thread_{next(self._ids)}", metadata=metadata)
+            self.created.append(thread)
+        return thread
+
+    def update(self, thread_id, metadata):
+        self.updated[thread_id] = metadata
+
+    def delete(self, thread_id):
+        self.deleted.append(thread_id)
+
+
+def client(api_key="sk-own"):
+    return SimpleNamespace(api_key=api_key, beta=SimpleNamespace(threads=FakeThreads()))
+
+
+def settle(pool):
+    # One worker runs background jobs in submission order, so a no-op job finishes after all of them
+    pool._pool.submit(lambda: None).result(5)
+
+
+def test_warm_fills_the_pool_in_the_background():
+    pool = WarmThreadPool(size=3, max_workers=1)
+    fake = client()
+    pool.warm(fake, "asst_1")
+    settle(pool)
+    assert pool.stats() == {"asst_1": 3}
+    assert all(t.metadata == {'prewarmed': 'true'} for t in fake.beta.threads.created)
+    pool.warm(fake, "asst_1")
+    settle(pool)
+    assert len(fake.beta.threads.created) == 3
+
+
+def test_acquire_hands_out_a_warm_thread_and_tags_it():
+    pool = WarmThreadPool(size=2, max_workers=1)
+    fake = client()
+    pool.warm(fake, "asst_1")
+    settle(pool)
+    thread = pool.acquire(fake, "asst_1", "session_1")
+    settle(pool)
+    assert thread is fake.beta.threads.created[0]
+    assert fake.beta.threads.updated == {thread.id: {'session_id': 'session_1'}}
+    assert pool.stats() == {"asst_1": 2}
+
+
+def test_acquire_on_an_empty_pool_creates_the_thread_directly():
+    pool = WarmThreadPool(size=1, max_workers=1)
+    fake = client()
+    thread = pool.acquire(fake, "asst_1", "session_1")
+    assert thread.metadata == {'session_id': 'session_1'}
+    settle(pool)
+    assert pool.stats() == {"asst_1": 1}
+
+
+def test_expired_threads_are_deleted_not_handed_out():
+    pool = WarmThreadPool(size=2, max_age=0.05, max_workers=1)
+    fake = client()
+    pool.warm(fake, "asst_1")
+    settle(pool)
+    stale = [t.id for t in fake.beta.threads.created]
+    time.sleep(0.1)
+    thread = pool.acquire(fake, "asst_1", "session_1")
+    settle(pool)
+    assert thread.id not in stale and thread.metadata == {'session_id': 'session_1'}
+    assert sorted(fake.beta.threads.deleted) == sorted(stale)
+    assert not fake.beta.threads.updated
+
+
+def test_threads_are_pooled_per_api_key():
+    pool = WarmThreadPool(size=1, max_workers=1)
+    own, visitor = client("sk-own"), client("sk-visitor")
+    pool.warm(own, "asst_1")
+    settle(pool)
+    thread = pool.acquire(visitor, "asst_1", "session_1")
+    assert thread in visitor.beta.threads.created
+    assert thread.metadata == {'session_id': 'session_1'}
+    settle(pool)
+    assert pool.acquire(own, "asst_1", "session_2") is own.beta.threads.created[0]
+
+
+def test_a_failed_refill_can_be_retried():
+    pool = WarmThreadPool(size=1, max_workers=1)
+    fake = client()
+    create = fake.beta.threads.create
+    fake.beta.threads.create = lambda metadata: 1 / 0
+    pool.warm(fake, "asst_1")
+    settle(pool)
+    assert pool.stats() == {}
+    fake.beta.threads.create = create
+    pool.warm(fake, "asst_1")
+    settle(pool)
+    assert pool.stats() == {"asst_1": 1}
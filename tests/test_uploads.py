@@ -0,0 +1,117 @@
+import io
+import itertools
+import json
+from types import SimpleNamespace
+
+from assistant_runtime.uploads import XLSX_TYPE, UploadCache, convert_spreadsheet, file_digest, iter_chunks
+
+CSV = "text/csv"
+
+
+class FakeFiles:
+    def __init__(self):
+        self.created = 0
+        self._ids = itertools.count()
+
+    def create(self, file, purpose):
+        self.created += 1
+        return SimpleNamespace(id=f"file_{next(self._ids)}")
+
+
+def fake_client(api_key="sk-test"):
+    return SimpleNamespace(api_key=api_key, files=FakeFiles())
+
+
+def csv_file(rows, width=1):
+    return io.BytesIO(("value\n" + "".join(f"{i:0{width}d}\n" for i in range(rows))).encode())
+
+
+def test_same_bytes_are_uploaded_once():
+    cache, client = UploadCache(), fake_client()
+    first = cache.get_or_upload(client, csv_file(3), CSV)
+    second = cache.get_or_upload(client, csv_file(3), CSV)
+    assert first.file_id == second.file_id and client.files.created == 1
+    assert first.rows == 3
+
+
+def test_entries_are_per_api_key():
+    cache = UploadCache()
+    cache.get_or_upload(fake_client("sk-a"), csv_file(3), CSV)
+    other = fake_client("sk-b")
+    cache.get_or_upload(other, csv_file(3), CSV)
+    assert other.files.created == 1
+
+
+def test_old_entries_expire():
+    cache, client = UploadCache(), fake_client()
+    cache.get_or_upload(client, csv_file(3), CSV)
+    cache.max_age = 0
+    cache.get_or_upload(client, csv_file(3), CSV)
+    assert client.files.created == 2
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache, client = UploadCache(max_entries=2), fake_client()
+    for rows in (1, 2):
+        cache.get_or_upload(client, csv_file(rows), CSV)
+    cache.get_or_upload(client, csv_file(1), CSV)  # now the most recent
+    cache.get_or_upload(client, csv_file(3), CSV)  # evicts 2 rows
+    assert client.files.created == 3
+    cache.get_or_upload(client, csv_file(1), CSV)
+    assert client.files.created == 3
+    cache.get_or_upload(client, csv_file(2), CSV)
+    assert client.files.created == 4
+
+
+def test_byte_budget_evicts_entries():
+    # Room for the larger of the two files, not for both
+    large = UploadCache().get_or_upload(fake_client(), csv_file(6, width=100), CSV)
+    budget = len(large.preview) + len(large.download) + 1
+    cache, client = UploadCache(max_bytes=budget), fake_client()
+    cache.get_or_upload(client, csv_file(5, width=100), CSV)
+    cache.get_or_upload(client, csv_file(6, width=100), CSV)
+    cache.get_or_upload(client, csv_file(5, width=100), CSV)
+    assert client.files.created == 3
+
+
+def test_get_only_looks_up_the_cache():
+    cache, client = UploadCache(), fake_client()
+    source = csv_file(3)
+    digest = file_digest(source)
+    assert cache.get(client, digest) is None
+    upload = cache.get_or_upload(client, source, CSV, digest=digest)
+    assert cache.get(client, digest) == upload
+    assert cache.get(fake_client("sk-other"), digest) is None
+    assert client.files.created == 1
+
+
+def xlsx_file(header, rows):
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    source = io.BytesIO()
+    workbook.save(source)
+    source.seek(0)
+    return source
+
+
+def test_duplicate_xlsx_headers_are_renamed_like_pandas():
+    import pandas as pd
+
+    header = ["Date", "Value", "Date", "Date.1", "Date", None]
+    source = xlsx_file(header, [["2024-01-01", 1, "2024-01-02", "x", "2024-01-03", "y"]])
+    chunk = next(iter_chunks(source, XLSX_TYPE))
+    source.seek(0)
+    assert list(chunk.columns) == list(pd.read_excel(source).columns)
+    assert list(chunk.columns) == ["Date", "Value", "Date.2", "Date.1", "Date.3", "Unnamed: 5"]
+
+
+def test_xlsx_with_duplicate_headers_converts():
+    source = xlsx_file(["Date", "Date"], [["a", "b"], ["c", "d"]])
+    preview, rows = convert_spreadsheet(source, XLSX_TYPE, io.BytesIO())
+    assert rows == 2
+    assert json.loads(preview)[0] == {"Date": "a", "Date.1": "b"}